@@ -0,0 +1,85 @@
+# app/api/auth.py
+# Version async de app/router/router_login.py y app/router/router_user.py (se usa con DB_MODO=async)
+
+from fastapi import APIRouter, HTTPException, Depends, status
+from fastapi.security import HTTPAuthorizationCredentials
+from starlette.status import HTTP_201_CREATED
+from typing import List
+from sqlalchemy.ext.asyncio import AsyncConnection
+from app.database.connection import get_async_connection, ejecutar_async, ejecutar_en_transaccion_async, obtener_async_engine
+from app.router import router_login, router_user
+from app.router.router_login import UserLogin, UserResponse, Token, verify_token, get_user_by_email
+from app.schema.user_schema import UserSchema, UserSchemaOut
+from app.utils import cache_usuarios, passwords
+
+auth_async_router = APIRouter()
+
+# Versión async de get_current_user
+async def get_current_user_async(email: str = Depends(verify_token)):
+    user = cache_usuarios.usuario_por_email(email)
+    if user is None:
+        async with obtener_async_engine().connect() as connection:
+            user = await connection.run_sync(cache_usuarios.leer_usuario, email)
+        cache_usuarios.guardar_usuario(user)
+    if user is None:
+        raise HTTPException(
+            status_code=status.HTTP_401_UNAUTHORIZED,
+            detail="Usuario no encontrado"
+        )
+    return user
+
+# Sin Depends(get_async_connection) en los endpoints que esperan al pool de hash:
+# la conexion se pide despues del hash (o se suelta antes) en una transaccion corta
+@auth_async_router.post("/lanaapp/user", status_code=HTTP_201_CREATED, tags=["Usuarios"])
+async def create_user(data_user: UserSchema):
+    password_hash = await passwords.hashear_async(data_user.password)
+    return await ejecutar_en_transaccion_async(router_user.insertar_usuario, data_user, password_hash)
+
+@auth_async_router.get("/lanaapp/user/{user_id}", response_model=UserSchemaOut, tags=["Usuarios"])
+async def obtener_solo_un_usuario(user_id: int, connection: AsyncConnection = Depends(get_async_connection)):
+    return await ejecutar_async(connection, router_user.obtener_solo_un_usuario, user_id)
+
+@auth_async_router.get("/lanaapp/user", response_model=List[UserSchemaOut], tags=["Usuarios"])
+async def obtener_usuarios(connection: AsyncConnection = Depends(get_async_connection)):
+    return await ejecutar_async(connection, router_user.obtener_usuarios)
+
+@auth_async_router.put("/lanaapp/user/{user_id}", tags=["Usuarios"])
+async def update_user(user_id: int, data: UserSchema):
+    password_hash = await passwords.hashear_async(data.password)
+    return await ejecutar_en_transaccion_async(router_user.actualizar_usuario, user_id, data, password_hash)
+
+@auth_async_router.delete("/lanaapp/user/{user_id}", tags=["Usuarios"])
+async def delete_user(user_id: int, connection: AsyncConnection = Depends(get_async_connection)):
+    return await ejecutar_async(connection, router_user.delete_user, user_id)
+
+@auth_async_router.post("/login", response_model=Token, tags=["Autenticación"])
+async def login(user_data: UserLogin):
+    """
+    Endpoint para iniciar sesión
+    """
+    user = await ejecutar_en_transaccion_async(get_user_by_email, email=user_data.email.lower().strip())
+    if not user or not await passwords.verificar_async(user.password_hash, user_data.password):
+        raise router_login.credenciales_invalidas()
+    if passwords.necesita_rehash(user.password_hash):
+        nuevo_hash = await passwords.hashear_async(user_data.password)
+        await ejecutar_en_transaccion_async(router_login.guardar_rehash, user.id, nuevo_hash)
+    return router_login.emitir_token(user)
+
+@auth_async_router.get("/verify-token", response_model=UserResponse, tags=["Autenticación"])
+async def verify_user_token(current_user = Depends(get_current_user_async)):
+    """
+    Endpoint para verificar si el token JWT es válido y obtener datos del usuario
+    """
+    return await router_login.verify_user_token(current_user)
+
+@auth_async_router.get("/usuario-actual", response_model=UserResponse, tags=["Autenticación"])
+async def get_current_user_info(current_user = Depends(get_current_user_async)):
+    """
+    Endpoint para obtener información del usuario actual
+    """
+    return await router_login.get_current_user_info(current_user)
+
+@auth_async_router.post("/logout", tags=["Autenticación"])
+async def logout(credentials: HTTPAuthorizationCredentials = Depends(router_login.security), connection: AsyncConnection = Depends(get_async_connection)):
+    # decodificar y revisar el filtro no bloquea; la escritura va por run_sync
+    return await ejecutar_async(connection, router_login.logout, credentials)
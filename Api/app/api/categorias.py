@@ -0,0 +1,33 @@
+# app/api/categorias.py
+# Version async de app/router/router_categoria.py (se usa con DB_MODO=async)
+
+from fastapi import APIRouter, Depends, Header
+from starlette.status import HTTP_201_CREATED
+from typing import List, Optional
+from sqlalchemy.ext.asyncio import AsyncConnection
+from app.database.connection import get_async_connection, ejecutar_async
+from app.router import router_categoria as sync
+from app.schema.categoria_schema import CategoriaSchema, CategoriaSchemaOut
+from app.utils import catalogo_categorias
+
+categorias_async_router = APIRouter()
+
+@categorias_async_router.post("/lanaapp/categorias", status_code=HTTP_201_CREATED, tags=["Categorías"])
+async def crear_categoria(data: CategoriaSchema, connection: AsyncConnection = Depends(get_async_connection)):
+    return await ejecutar_async(connection, sync.crear_categoria, data)
+
+@categorias_async_router.get("/lanaapp/categorias", response_model=List[CategoriaSchemaOut], tags=["Categorías"])
+async def obtener_categorias(if_none_match: Optional[str] = Header(None)):
+    return catalogo_categorias.responder(await catalogo_categorias.obtener_catalogo_async(), if_none_match)
+
+@categorias_async_router.get("/lanaapp/categorias/{categoria_id}", response_model=CategoriaSchemaOut, tags=["Categorías"])
+async def obtener_categoria(categoria_id: int, connection: AsyncConnection = Depends(get_async_connection)):
+    return await ejecutar_async(connection, sync.obtener_categoria, categoria_id)
+
+@categorias_async_router.put("/lanaapp/categorias/{categoria_id}", tags=["Categorías"])
+async def actualizar_categoria(categoria_id: int, data: CategoriaSchema, connection: AsyncConnection = Depends(get_async_connection)):
+    return await ejecutar_async(connection, sync.actualizar_categoria, categoria_id, data)
+
+@categorias_async_router.delete("/lanaapp/categorias/{categoria_id}", tags=["Categorías"])
+async def eliminar_categoria(categoria_id: int, connection: AsyncConnection = Depends(get_async_connection)):
+    return await ejecutar_async(connection, sync.eliminar_categoria, categoria_id)
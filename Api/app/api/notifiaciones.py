@@ -0,0 +1,61 @@
+# app/api/notifiaciones.py
+# Version async de app/router/router_notificaciones.py (se usa con DB_MODO=async)
+
+from fastapi import APIRouter, Depends, Query
+from starlette.status import HTTP_201_CREATED
+from typing import List, Optional
+from sqlalchemy.ext.asyncio import AsyncConnection
+from app.database.connection import get_async_connection, ejecutar_async, obtener_async_engine
+from app.router import router_notificaciones as sync
+from app.schema.notificaciones_schema import NotificacionSchema, NotificacionSchemaOut
+from app.utils import no_leidas
+
+notificaciones_async_router = APIRouter()
+
+@notificaciones_async_router.get("/lanaapp/notificaciones", response_model=List[NotificacionSchemaOut], tags=["Notificaciones"])
+async def obtener_todas(
+    fields: Optional[str] = Query(None, description="Campos a incluir separados por coma, p. ej. id,mensaje"),
+    connection: AsyncConnection = Depends(get_async_connection),
+):
+    return await ejecutar_async(connection, sync.obtener_todas, fields)
+
+@notificaciones_async_router.get("/lanaapp/notificaciones/usuario/{usuario_id}", response_model=List[NotificacionSchemaOut], tags=["Notificaciones"])
+async def obtener_por_usuario(
+    usuario_id: int,
+    fields: Optional[str] = Query(None, description="Campos a incluir separados por coma, p. ej. id,mensaje"),
+    connection: AsyncConnection = Depends(get_async_connection),
+):
+    return await ejecutar_async(connection, sync.obtener_por_usuario, usuario_id, fields)
+
+# Igual que en sync: en un hit del cache no se pide conexion
+@notificaciones_async_router.get("/lanaapp/notificaciones/usuario/{usuario_id}/no-leidas/count", tags=["Notificaciones"])
+async def contar_no_leidas(usuario_id: int):
+    total = no_leidas.no_leidas_en_cache(usuario_id)
+    if total is None:
+        async with obtener_async_engine().connect() as connection:
+            total = await connection.run_sync(no_leidas.recalcular_no_leidas, usuario_id)
+    return {"usuario_id": usuario_id, "no_leidas": total}
+
+@notificaciones_async_router.post("/lanaapp/notificaciones", status_code=HTTP_201_CREATED, tags=["Notificaciones"])
+async def crear_notificacion(data: NotificacionSchema, connection: AsyncConnection = Depends(get_async_connection)):
+    return await ejecutar_async(connection, sync.crear_notificacion, data)
+
+@notificaciones_async_router.get("/lanaapp/notificaciones/{notificacion_id}", response_model=NotificacionSchemaOut, tags=["Notificaciones"])
+async def obtener_por_id(notificacion_id: int, connection: AsyncConnection = Depends(get_async_connection)):
+    return await ejecutar_async(connection, sync.obtener_por_id, notificacion_id)
+
+@notificaciones_async_router.put("/lanaapp/notificaciones/{notificacion_id}", tags=["Notificaciones"])
+async def actualizar_notificacion(notificacion_id: int, data: NotificacionSchema, connection: AsyncConnection = Depends(get_async_connection)):
+    return await ejecutar_async(connection, sync.actualizar_notificacion, notificacion_id, data)
+
+@notificaciones_async_router.delete("/lanaapp/notificaciones/{notificacion_id}", tags=["Notificaciones"])
+async def eliminar_notificacion(notificacion_id: int, connection: AsyncConnection = Depends(get_async_connection)):
+    return await ejecutar_async(connection, sync.eliminar_notificacion, notificacion_id)
+
+@notificaciones_async_router.put("/lanaapp/notificaciones/{notificacion_id}/leida", tags=["Notificaciones"])
+async def marcar_como_leida(notificacion_id: int, connection: AsyncConnection = Depends(get_async_connection)):
+    return await ejecutar_async(connection, sync.marcar_como_leida, notificacion_id)
+
+@notificaciones_async_router.put("/lanaapp/notificaciones/usuario/{usuario_id}/marcar-leidas", tags=["Notificaciones"])
+async def marcar_todas_como_leidas(usuario_id: int, connection: AsyncConnection = Depends(get_async_connection)):
+    return await ejecutar_async(connection, sync.marcar_todas_como_leidas, usuario_id)
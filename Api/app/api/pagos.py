@@ -0,0 +1,39 @@
+# app/api/pagos.py
+# Version async de app/router/router_pagos_programados.py (se usa con DB_MODO=async)
+
+from fastapi import APIRouter, Depends, Query
+from starlette.status import HTTP_201_CREATED
+from typing import List, Optional
+from sqlalchemy.ext.asyncio import AsyncConnection
+from app.database.connection import get_async_connection, ejecutar_async
+from app.router import router_pagos_programados as sync
+from app.schema.pagos_programados_schema import PagoProgramadoSchema, PagoProgramadoSchemaOut
+
+pagos_async_router = APIRouter()
+
+@pagos_async_router.get("/lanaapp/pagos-fijos", response_model=List[PagoProgramadoSchemaOut], tags=["Pagos Fijos"])
+async def obtener_pagos_programados(
+    fields: Optional[str] = Query(None, description="Campos a incluir separados por coma, p. ej. id,monto"),
+    connection: AsyncConnection = Depends(get_async_connection),
+):
+    return await ejecutar_async(connection, sync.obtener_pagos_programados, fields)
+
+@pagos_async_router.post("/lanaapp/pagos-fijos", status_code=HTTP_201_CREATED, tags=["Pagos Fijos"])
+async def crear_pago_programado(data: PagoProgramadoSchema, connection: AsyncConnection = Depends(get_async_connection)):
+    return await ejecutar_async(connection, sync.crear_pago_programado, data)
+
+@pagos_async_router.put("/lanaapp/pagos-fijos/{pago_id}", tags=["Pagos Fijos"])
+async def actualizar_pago_programado(pago_id: int, data: PagoProgramadoSchema, connection: AsyncConnection = Depends(get_async_connection)):
+    return await ejecutar_async(connection, sync.actualizar_pago_programado, pago_id, data)
+
+@pagos_async_router.delete("/lanaapp/pagos-fijos/{pago_id}", tags=["Pagos Fijos"])
+async def eliminar_pago_programado(pago_id: int, connection: AsyncConnection = Depends(get_async_connection)):
+    return await ejecutar_async(connection, sync.eliminar_pago_programado, pago_id)
+
+@pagos_async_router.get("/lanaapp/pagos-fijos/upcoming", response_model=List[PagoProgramadoSchemaOut], tags=["Pagos Fijos"])
+async def obtener_pagos_proximos(
+    usuario_id: Optional[int] = None,
+    fields: Optional[str] = Query(None, description="Campos a incluir separados por coma, p. ej. id,monto"),
+    connection: AsyncConnection = Depends(get_async_connection),
+):
+    return await ejecutar_async(connection, sync.obtener_pagos_proximos, usuario_id, fields)
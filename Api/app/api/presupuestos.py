@@ -0,0 +1,40 @@
+# app/api/presupuestos.py
+# Version async de app/router/router_presupuesto.py (se usa con DB_MODO=async)
+
+from fastapi import APIRouter, Depends, Query
+from starlette.status import HTTP_201_CREATED
+from typing import List, Optional
+from sqlalchemy.ext.asyncio import AsyncConnection
+from app.database.connection import get_async_connection, ejecutar_async
+from app.router import router_presupuesto as sync
+from app.schema.presupuesto_schema import PresupuestoSchema, PresupuestoSchemaOut, EstadoPresupuestoSchemaOut
+
+presupuestos_async_router = APIRouter()
+
+@presupuestos_async_router.get("/lanaapp/presupuesto", response_model=List[PresupuestoSchemaOut], tags=["Presupuesto"])
+async def obtener_presupuestos(
+    fields: Optional[str] = Query(None, description="Campos a incluir separados por coma, p. ej. id,monto"),
+    connection: AsyncConnection = Depends(get_async_connection),
+):
+    return await ejecutar_async(connection, sync.obtener_presupuestos, fields)
+
+@presupuestos_async_router.get("/lanaapp/presupuesto/estado", response_model=EstadoPresupuestoSchemaOut, tags=["Presupuesto"])
+async def obtener_estado_presupuesto(
+    usuario_id: int,
+    anio: int,
+    mes: int = Query(..., ge=1, le=12),
+    connection: AsyncConnection = Depends(get_async_connection),
+):
+    return await ejecutar_async(connection, sync.obtener_estado_presupuesto, usuario_id, anio, mes)
+
+@presupuestos_async_router.post("/lanaapp/presupuesto", status_code=HTTP_201_CREATED, tags=["Presupuesto"])
+async def crear_presupuesto(data: PresupuestoSchema, connection: AsyncConnection = Depends(get_async_connection)):
+    return await ejecutar_async(connection, sync.crear_presupuesto, data)
+
+@presupuestos_async_router.put("/lanaapp/presupuesto/{presupuesto_id}", tags=["Presupuesto"])
+async def actualizar_presupuesto(presupuesto_id: int, data: PresupuestoSchema, connection: AsyncConnection = Depends(get_async_connection)):
+    return await ejecutar_async(connection, sync.actualizar_presupuesto, presupuesto_id, data)
+
+@presupuestos_async_router.delete("/lanaapp/presupuesto/{presupuesto_id}", tags=["Presupuesto"])
+async def eliminar_presupuesto(presupuesto_id: int, connection: AsyncConnection = Depends(get_async_connection)):
+    return await ejecutar_async(connection, sync.eliminar_presupuesto, presupuesto_id)
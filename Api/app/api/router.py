@@ -0,0 +1,24 @@
+# app/api/router.py
+# Router principal del modo async (DB_MODO=async), equivalente a app/router/router.py
+
+from fastapi import APIRouter
+from app.api.auth import auth_async_router
+from app.api.transacciones import transacciones_async_router
+from app.api.presupuestos import presupuestos_async_router
+from app.api.pagos import pagos_async_router
+from app.api.notifiaciones import notificaciones_async_router
+from app.api.categorias import categorias_async_router
+from app.api.sync import sync_async_router
+from app.router.router_stream import stream_router
+
+api_router = APIRouter()
+
+api_router.include_router(auth_async_router)
+api_router.include_router(transacciones_async_router)
+api_router.include_router(presupuestos_async_router)
+api_router.include_router(pagos_async_router)
+# El stream ya es async y no usa la conexion del request, se comparte con el modo sync
+api_router.include_router(stream_router)
+api_router.include_router(notificaciones_async_router)
+api_router.include_router(categorias_async_router)
+api_router.include_router(sync_async_router)
@@ -0,0 +1,14 @@
+# app/api/sync.py
+# Version async de app/router/router_sync.py (se usa con DB_MODO=async)
+
+from fastapi import APIRouter, Depends
+from sqlalchemy.ext.asyncio import AsyncConnection
+from app.database.connection import get_async_connection, ejecutar_async
+from app.router import router_sync as sync
+from app.schema.sync_schema import SyncSchema
+
+sync_async_router = APIRouter()
+
+@sync_async_router.post("/lanaapp/sync", tags=["Sincronización"])
+async def sincronizar(data: SyncSchema, connection: AsyncConnection = Depends(get_async_connection)):
+    return await ejecutar_async(connection, sync.sincronizar, data)
@@ -0,0 +1,76 @@
+# app/api/transacciones.py
+# Version async de app/router/router_transaccion.py (se usa con DB_MODO=async)
+
+from datetime import date
+from fastapi import APIRouter, Depends, Query, Body, Header
+from starlette.status import HTTP_201_CREATED
+from typing import Any, List, Optional
+from sqlalchemy.ext.asyncio import AsyncConnection
+from app.database.connection import get_async_connection, ejecutar_async
+from app.router import router_transaccion as sync
+from app.schema.transaccion_schema import TransaccionSchema, TransaccionSchemaOut, TransaccionPaginaOut, ResumenMensualSchemaOut
+from app.utils import catalogo_categorias
+
+transacciones_async_router = APIRouter()
+
+@transacciones_async_router.get("/lanaapp/transacciones", response_model=TransaccionPaginaOut, tags=["Transacciones"])
+async def get_transacciones(
+    usuario_id: int,
+    cursor: Optional[str] = None,
+    limit: int = Query(50, ge=1, le=sync.LIMITE_PAGINA_MAXIMO),
+    fecha_desde: Optional[date] = None,
+    fecha_hasta: Optional[date] = None,
+    categoria_id: Optional[int] = None,
+    monto_min: Optional[float] = None,
+    monto_max: Optional[float] = None,
+    fields: Optional[str] = Query(None, description="Campos a incluir separados por coma, p. ej. id,monto"),
+    connection: AsyncConnection = Depends(get_async_connection),
+):
+    return await ejecutar_async(
+        connection, sync.get_transacciones, usuario_id, cursor, limit,
+        fecha_desde, fecha_hasta, categoria_id, monto_min, monto_max, fields,
+    )
+
+@transacciones_async_router.get("/lanaapp/transacciones/resumen", response_model=List[ResumenMensualSchemaOut], tags=["Transacciones"])
+async def get_resumen_mensual(
+    usuario_id: int,
+    anio: int,
+    mes: Optional[int] = Query(None, ge=1, le=12),
+    connection: AsyncConnection = Depends(get_async_connection),
+):
+    return await ejecutar_async(connection, sync.get_resumen_mensual, usuario_id, anio, mes)
+
+# El stream abre su propia conexion y se itera en el threadpool, no necesita version async
+@transacciones_async_router.get("/lanaapp/transactions/export", tags=["Transacciones"])
+async def export_transacciones(
+    usuario_id: int,
+    formato: str = Query("ndjson", pattern="^(ndjson|csv)$"),
+    gzip: bool = False,
+    fecha_desde: Optional[date] = None,
+    fecha_hasta: Optional[date] = None,
+):
+    return sync.export_transacciones(usuario_id, formato, gzip, fecha_desde, fecha_hasta)
+
+@transacciones_async_router.post("/lanaapp/transactions/", status_code=HTTP_201_CREATED, tags=["Transacciones"])
+async def create_transaccion(data: TransaccionSchema, connection: AsyncConnection = Depends(get_async_connection)):
+    return await ejecutar_async(connection, sync.create_transaccion, data)
+
+@transacciones_async_router.post("/lanaapp/transactions/bulk", status_code=HTTP_201_CREATED, tags=["Transacciones"])
+async def create_transacciones_bulk(items: List[Any] = Body(...), connection: AsyncConnection = Depends(get_async_connection)):
+    return await ejecutar_async(connection, sync.create_transacciones_bulk, items)
+
+@transacciones_async_router.get("/lanaapp/transactions/{transaction_id}", response_model=TransaccionSchemaOut, tags=["Transacciones"])
+async def get_transaccion(transaction_id: int, connection: AsyncConnection = Depends(get_async_connection)):
+    return await ejecutar_async(connection, sync.get_transaccion, transaction_id)
+
+@transacciones_async_router.put("/lanaapp/transactions/{transaction_id}", tags=["Transacciones"])
+async def update_transaccion(transaction_id: int, data: TransaccionSchema, connection: AsyncConnection = Depends(get_async_connection)):
+    return await ejecutar_async(connection, sync.update_transaccion, transaction_id, data)
+
+@transacciones_async_router.delete("/lanaapp/transactions/{transaction_id}", tags=["Transacciones"])
+async def delete_transaccion(transaction_id: int, connection: AsyncConnection = Depends(get_async_connection)):
+    return await ejecutar_async(connection, sync.delete_transaccion, transaction_id)
+
+@transacciones_async_router.get("/lanaapp/transactions/categories/list", tags=["Transacciones"])
+async def get_categories(if_none_match: Optional[str] = Header(None)):
+    return catalogo_categorias.responder(await catalogo_categorias.obtener_catalogo_async(), if_none_match)
@@ -0,0 +1,26 @@
+# app/create_tables.py
+# Crea las tablas que falten y tambien los indices nuevos en tablas que ya existen
+# (meta_data.create_all solo crea indices cuando crea la tabla).
+# Uso: python -m app.create_tables
+from sqlalchemy import inspect
+from app.config.db import engine, meta_data
+from app.model import (
+    users, transaccion, tokensJWTInvalido, presupuestos,
+    prefereciasNotificacionesUsuarios, pagosProgramados,
+    notificaciones, categorias, registrosEliminados, resumenMensual
+)
+
+
+def crear_tablas_e_indices():
+    meta_data.create_all(engine)
+    inspector = inspect(engine)
+    for tabla in meta_data.sorted_tables:
+        existentes = {indice["name"] for indice in inspector.get_indexes(tabla.name)}
+        for indice in tabla.indexes:
+            if indice.name not in existentes:
+                indice.create(engine)
+                print(f"Se creo el indice {indice.name} en {tabla.name}")
+
+
+if __name__ == "__main__":
+    crear_tablas_e_indices()
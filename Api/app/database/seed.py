@@ -0,0 +1,441 @@
+# app/database/seed.py
+# Datos sinteticos con volumen de produccion para pruebas locales y benchmarks.
+#
+# Genera N usuarios con sus preferencias, presupuestos mensuales, pagos fijos y
+# varios años de transacciones y notificaciones. Las distribuciones imitan el
+# uso real: pocos usuarios muy activos y muchos con pocas transacciones
+# (lognormal), montos lognormales por categoria, una quincena o un salario
+# mensual de ingreso, y notificaciones viejas leidas.
+#
+# Es determinista: cada usuario usa su propio Random(semilla, numero de
+# usuario), asi que la misma semilla y la misma fecha --hasta dan exactamente
+# los mismos datos (y agregar usuarios no cambia los anteriores).
+#
+# Velocidad: las filas se generan como tuplas y se insertan por lotes con
+# executemany del driver (pymysql lo convierte en INSERT de varias filas;
+# sqlite3 lo ejecuta en C), con un commit por lote. En SQLite se apaga el
+# fsync y en MySQL las revisiones de llaves durante la carga. Al final
+# resumen_mensual se reconstruye con un solo INSERT ... SELECT.
+#
+# Cada siembra deja una marca en la tabla semillas (parametros y rango de ids
+# de los usuarios creados) para que benchmarks/bench_carga.py sepa que usuarios
+# sembro y no vuelva a sembrar una base que ya tiene datos.
+#
+# Uso: python -m app.database.seed --usuarios 1000 --anios 3 --semilla 42
+# Todos los usuarios tienen la contraseña --password (por defecto "password123").
+# python -m app.database.seed --estado imprime en JSON cuantos usuarios hay y la
+# ultima marca, sin sembrar nada.
+import argparse
+import json
+import random
+import time
+from datetime import date, timedelta
+from typing import Dict, List, Optional
+from sqlalchemy import Column, Date, Integer, MetaData, Table, TIMESTAMP, func, inspect, select
+from sqlalchemy.engine import Connection
+from werkzeug.security import generate_password_hash
+from app.model.categorias import categorias
+from app.model.notificaciones import notificaciones
+from app.model.pagosProgramados import pagos_programados
+from app.model.prefereciasNotificacionesUsuarios import preferencias_notificacion
+from app.model.presupuestos import presupuestos
+from app.model.transaccion import transacciones
+from app.model.users import users
+from app.utils import resumen_mensual
+from app.utils.pagos_recurrentes import primer_vencimiento
+from app.utils.passwords import PASSWORD_HASH_METODO, PASSWORD_SALT_LENGTH
+
+LOTE = 20000
+DOMINIO_EMAIL = "seed.lanaapp.mx"
+
+# Fuera de meta_data: la app no la necesita, solo la crea el seed
+meta_semillas = MetaData()
+semillas = Table("semillas", meta_semillas,
+    Column("id", Integer, primary_key=True),
+    Column("usuarios", Integer, nullable=False),
+    Column("anios", Integer, nullable=False),
+    Column("semilla", Integer, nullable=False),
+    Column("hasta", Date, nullable=False),
+    Column("primer_id", Integer, nullable=False),
+    Column("ultimo_id", Integer, nullable=False),
+    Column("fecha_creacion", TIMESTAMP, nullable=False, server_default=func.now()),
+)
+
+# nombre, tipo, peso (que tan seguido se usa), mediana del monto, dispersion
+CATEGORIAS = [
+    ("Salario", "ingreso", 0, 15000, 0.5),
+    ("Freelance", "ingreso", 0, 3000, 0.8),
+    ("Supermercado", "gasto", 22, 650, 0.7),
+    ("Restaurantes", "gasto", 18, 280, 0.6),
+    ("Transporte", "gasto", 20, 90, 0.8),
+    ("Servicios", "gasto", 4, 550, 0.5),
+    ("Entretenimiento", "gasto", 7, 350, 0.8),
+    ("Salud", "gasto", 3, 700, 1.0),
+    ("Educación", "gasto", 2, 1500, 0.9),
+    ("Ropa", "gasto", 4, 800, 0.7),
+    ("Suscripciones", "gasto", 3, 180, 0.4),
+    ("Viajes", "gasto", 1, 5000, 0.9),
+    ("Regalos", "gasto", 2, 600, 0.8),
+    ("Otros", "gasto", 5, 250, 1.0),
+    ("Renta", "gasto", 0, 8000, 0.4),
+]
+
+# descripcion, categoria, frecuencia, probabilidad de que el usuario lo tenga
+PAGOS_FIJOS = [
+    ("Renta", "Renta", "mensual", 0.6),
+    ("Internet", "Servicios", "mensual", 0.8),
+    ("Luz", "Servicios", "mensual", 0.7),
+    ("Streaming", "Suscripciones", "mensual", 0.7),
+    ("Gimnasio", "Salud", "mensual", 0.3),
+    ("Seguro del auto", "Otros", "anual", 0.3),
+    ("Colegiatura", "Educación", "mensual", 0.15),
+    ("Transporte semanal", "Transporte", "semanal", 0.2),
+]
+
+DESCRIPCIONES = {
+    "Supermercado": ["Walmart", "Soriana", "Chedraui", "Costco", "Oxxo", "Mercado"],
+    "Restaurantes": ["Tacos", "Comida corrida", "Cafetería", "Pizza", "Sushi"],
+    "Transporte": ["Uber", "Gasolina", "Metro", "Estacionamiento", "Caseta"],
+    "Entretenimiento": ["Cine", "Concierto", "Videojuego", "Bar"],
+}
+
+NOTIFICACIONES = [
+    ("push", "Pago próximo", "Tu pago fijo vence en 3 días"),
+    ("email", "Presupuesto excedido", "Superaste tu presupuesto del mes"),
+    ("push", "Resumen semanal", "Revisa en qué gastaste esta semana"),
+    ("sms", "Pago registrado", "Se registró tu pago fijo"),
+    ("email", "Presupuesto al 80%", "Llevas el 80% de tu presupuesto"),
+]
+
+
+def _meses(desde: date, hasta: date):
+    anio, mes = desde.year, desde.month
+    while (anio, mes) <= (hasta.year, hasta.month):
+        yield anio, mes
+        anio, mes = (anio + 1, 1) if mes == 12 else (anio, mes + 1)
+
+
+def _dias_del_mes(anio: int, mes: int, hasta: date) -> int:
+    siguiente = date(anio + 1, 1, 1) if mes == 12 else date(anio, mes + 1, 1)
+    ultimo = (siguiente - timedelta(days=1)).day
+    if (anio, mes) == (hasta.year, hasta.month):
+        return hasta.day
+    return ultimo
+
+
+def _fecha(anio: int, mes: int, dia: int) -> str:
+    return f"{anio:04d}-{mes:02d}-{dia:02d}"
+
+
+def _monto(valor: float) -> str:
+    # Como texto para que ni MySQL ni SQLite redondeen por float
+    return f"{max(valor, 1.0):.2f}"
+
+
+class Cargador:
+    """
+    Acumula filas por tabla y las inserta por lotes con executemany del driver.
+    """
+
+    def __init__(self, connection: Connection, lote: int = LOTE):
+        self.connection = connection
+        self.lote = lote
+        self._sql: Dict[str, str] = {}
+        self._filas: Dict[str, list] = {}
+        self.totales: Dict[str, int] = {}
+        self.inicio = time.perf_counter()
+        self._marcador = "?" if connection.dialect.paramstyle == "qmark" else "%s"
+
+    def registrar(self, tabla, columnas: List[str]):
+        quote = self.connection.dialect.identifier_preparer.quote
+        self._sql[tabla.name] = (
+            f"INSERT INTO {quote(tabla.name)} ({', '.join(quote(c) for c in columnas)}) "
+            f"VALUES ({', '.join([self._marcador] * len(columnas))})"
+        )
+        self._filas[tabla.name] = []
+        self.totales[tabla.name] = 0
+
+    def agregar(self, tabla, fila: tuple):
+        filas = self._filas[tabla.name]
+        filas.append(fila)
+        if len(filas) >= self.lote:
+            self._vaciar(tabla.name)
+
+    def _vaciar(self, nombre: str):
+        filas = self._filas[nombre]
+        if not filas:
+            return
+        self.connection.exec_driver_sql(self._sql[nombre], filas)
+        self.connection.commit()
+        self.totales[nombre] += len(filas)
+        self._filas[nombre] = []
+
+    def terminar(self):
+        for nombre in self._filas:
+            self._vaciar(nombre)
+
+    def progreso(self) -> str:
+        # Incluye las filas generadas que todavia esperan su lote
+        total = sum(self.totales.values()) + sum(len(filas) for filas in self._filas.values())
+        segundos = time.perf_counter() - self.inicio
+        return f"{total} filas en {segundos:.1f}s ({total / segundos if segundos else 0:.0f} filas/s)"
+
+
+def _preparar_sesion(connection: Connection):
+    """
+    Solo para esta conexion: la carga no necesita durabilidad ni revisar llaves
+    fila por fila. Regresa el valor anterior para dejarla como estaba.
+    """
+    backend = connection.dialect.name
+    anterior = None
+    if backend == "sqlite":
+        anterior = connection.exec_driver_sql("PRAGMA synchronous").scalar()
+        connection.exec_driver_sql("PRAGMA synchronous = OFF")
+    elif backend == "mysql":
+        connection.exec_driver_sql("SET SESSION unique_checks = 0")
+        connection.exec_driver_sql("SET SESSION foreign_key_checks = 0")
+    connection.commit()
+    return anterior
+
+
+def _restaurar_sesion(connection: Connection, anterior):
+    # La conexion regresa al pool: no debe quedarse sin fsync ni sin revisar llaves
+    backend = connection.dialect.name
+    if backend == "sqlite":
+        connection.exec_driver_sql(f"PRAGMA synchronous = {int(anterior)}")
+    elif backend == "mysql":
+        connection.exec_driver_sql("SET SESSION unique_checks = 1")
+        connection.exec_driver_sql("SET SESSION foreign_key_checks = 1")
+    connection.commit()
+
+
+def _categorias(connection: Connection) -> Dict[str, int]:
+    """
+    Usa las categorias existentes con el mismo nombre y crea las que falten.
+    """
+    existentes = {
+        fila.nombre_categoria: fila.id
+        for fila in connection.execute(select(categorias.c.id, categorias.c.nombre_categoria))
+    }
+    faltantes = [
+        {"nombre_categoria": nombre, "tipo": tipo}
+        for nombre, tipo, *_ in CATEGORIAS if nombre not in existentes
+    ]
+    if faltantes:
+        connection.execute(categorias.insert(), faltantes)
+        connection.commit()
+        return _categorias(connection)
+    return existentes
+
+
+def _usuario(cargador: Cargador, rng: random.Random, usuario_id: int, ids_categoria: Dict[str, int],
+             password_hash: str, desde: date, hasta: date):
+    alta = f"{desde.isoformat()} 09:00:00"
+    cargador.agregar(users, (
+        usuario_id, f"usuario{usuario_id}", f"usuario{usuario_id}@{DOMINIO_EMAIL}", password_hash,
+        f"55{rng.randrange(10 ** 8):08d}", alta, alta,
+    ))
+    cargador.agregar(preferencias_notificacion, (
+        usuario_id, 1, int(rng.random() < 0.2), 1, 1, int(rng.random() < 0.1), 1, 1, 1,
+        rng.choice((1, 3, 5)), alta,
+    ))
+
+    # Actividad: lognormal, la mayoria registra pocas transacciones al mes
+    por_mes = min(300, max(3, round(30 * rng.lognormvariate(0, 0.6))))
+    gastos = [c for c in CATEGORIAS if c[1] == "gasto" and c[2] > 0]
+    pesos = [peso * rng.uniform(0.3, 1.7) for _, _, peso, _, _ in gastos]
+    acumulados = []
+    total = 0.0
+    for peso in pesos:
+        total += peso
+        acumulados.append(total)
+    salario = 15000 * rng.lognormvariate(0, 0.5)
+    quincenal = rng.random() < 0.5
+    freelance = rng.random() < 0.25
+
+    # Presupuestos para las categorias donde mas gasta
+    principales = sorted(range(len(gastos)), key=lambda i: pesos[i], reverse=True)[:rng.randint(3, 6)]
+    esperado = {
+        i: por_mes * pesos[i] / total * gastos[i][3] * 1.15 for i in principales
+    }
+
+    for anio, mes in _meses(desde, hasta):
+        dias = _dias_del_mes(anio, mes, hasta)
+        # Ingresos
+        if quincenal:
+            for dia in (15, 28):
+                if dia <= dias:
+                    cargador.agregar(transacciones, _transaccion(
+                        usuario_id, ids_categoria["Salario"], salario / 2, anio, mes, dia, "Quincena"))
+        elif dias >= 28:
+            cargador.agregar(transacciones, _transaccion(
+                usuario_id, ids_categoria["Salario"], salario, anio, mes, 28, "Nómina"))
+        if freelance and rng.random() < 0.4:
+            cargador.agregar(transacciones, _transaccion(
+                usuario_id, ids_categoria["Freelance"], 3000 * rng.lognormvariate(0, 0.8),
+                anio, mes, rng.randint(1, dias), "Proyecto"))
+        # Gastos
+        cantidad = max(0, round(rng.gauss(por_mes, por_mes * 0.2) * dias / 30))
+        for i in rng.choices(range(len(gastos)), cum_weights=acumulados, k=cantidad):
+            nombre, _, _, mediana, dispersion = gastos[i]
+            opciones = DESCRIPCIONES.get(nombre)
+            cargador.agregar(transacciones, _transaccion(
+                usuario_id, ids_categoria[nombre], mediana * rng.lognormvariate(0, dispersion),
+                anio, mes, rng.randint(1, dias), rng.choice(opciones) if opciones else None))
+        for i in principales:
+            cargador.agregar(presupuestos, (
+                usuario_id, ids_categoria[gastos[i][0]],
+                _monto(round(esperado[i] * rng.uniform(0.9, 1.3), -2)), mes, anio,
+                f"{_fecha(anio, mes, 1)} 08:00:00", f"{_fecha(anio, mes, 1)} 08:00:00",
+            ))
+        _notificaciones(cargador, rng, usuario_id, anio, mes, dias, hasta)
+
+    for descripcion, categoria, frecuencia, probabilidad in PAGOS_FIJOS:
+        if rng.random() >= probabilidad:
+            continue
+        mediana = next(c[3] for c in CATEGORIAS if c[0] == categoria)
+        dia = rng.randint(1, 28)
+        activo = int(rng.random() < 0.9)
+        cargador.agregar(pagos_programados, (
+            usuario_id, ids_categoria[categoria], descripcion, _monto(mediana * rng.lognormvariate(0, 0.3)),
+            dia, None, frecuencia, primer_vencimiento(frecuencia, dia, hasta).isoformat(),
+            int(rng.random() < 0.5), activo, alta, alta,
+        ))
+
+
+def _transaccion(usuario_id: int, categoria_id: int, monto: float, anio: int, mes: int, dia: int,
+                 descripcion: Optional[str]) -> tuple:
+    momento = f"{_fecha(anio, mes, dia)} 12:00:00"
+    return (usuario_id, categoria_id, _monto(monto), _fecha(anio, mes, dia), descripcion, 0, momento, momento)
+
+
+def _notificaciones(cargador: Cargador, rng: random.Random, usuario_id: int, anio: int, mes: int,
+                    dias: int, hasta: date):
+    for _ in range(rng.randint(0, 6)):
+        canal, asunto, mensaje = rng.choice(NOTIFICACIONES)
+        dia = rng.randint(1, dias)
+        momento = f"{_fecha(anio, mes, dia)} {rng.randint(7, 22):02d}:{rng.randint(0, 59):02d}:00"
+        reciente = (hasta - date(anio, mes, dia)).days <= 30
+        leida = int(rng.random() < (0.5 if reciente else 0.97))
+        estado = "enviado" if rng.random() < 0.97 else "fallido"
+        destino = f"usuario{usuario_id}@{DOMINIO_EMAIL}" if canal == "email" else f"dispositivo-{usuario_id}"
+        cargador.agregar(notificaciones, (
+            usuario_id, canal, destino, asunto, mensaje, momento, estado, leida, momento, momento,
+        ))
+
+
+def sembrar(connection: Connection, usuarios: int = 100, anios: int = 2, semilla: int = 42,
+            hasta: Optional[date] = None, password: str = "password123", lote: int = LOTE) -> dict:
+    """
+    Agrega `usuarios` usuarios con `anios` años de historia hasta `hasta`
+    (hoy por defecto) y deja su marca en semillas. Regresa la marca (con el
+    rango de ids primer_id..ultimo_id) y en "filas" cuantas se insertaron por tabla.
+    """
+    hasta = hasta or date.today()
+    desde = date(hasta.year - anios, hasta.month, 1)
+    anterior = _preparar_sesion(connection)
+    try:
+        ids_categoria = _categorias(connection)
+        primer_id = (connection.execute(select(func.max(users.c.id))).scalar() or 0) + 1
+        connection.commit()
+        # Un solo hash para todos: calcular cientos de miles de PBKDF2 tardaria horas.
+        # Con el metodo configurado para que el login no tenga que rehacerlo.
+        password_hash = generate_password_hash(password, PASSWORD_HASH_METODO, PASSWORD_SALT_LENGTH)
+
+        cargador = Cargador(connection, lote)
+        cargador.registrar(users, ["id", "nombre_usuario", "email", "password_hash", "telefono",
+                                   "fecha_creacion", "fecha_actualizacion"])
+        cargador.registrar(preferencias_notificacion, [
+            "usuario_id", "notificar_exceso_presupuesto_email", "notificar_exceso_presupuesto_sms",
+            "notificar_exceso_presupuesto_push", "notificar_pago_fijo_vencimiento_email",
+            "notificar_pago_fijo_vencimiento_sms", "notificar_pago_fijo_vencimiento_push",
+            "notificar_falta_presupuesto_pago_fijo_email", "notificar_falta_presupuesto_pago_fijo_push",
+            "dias_anticipacion_pago_fijo", "fecha_actualizacion",
+        ])
+        cargador.registrar(transacciones, ["usuario_id", "categoria_id", "monto", "fecha_transaccion",
+                                           "descripcion", "pendiente_sincronizacion", "fecha_creacion",
+                                           "fecha_actualizacion"])
+        cargador.registrar(presupuestos, ["usuario_id", "categoria_id", "monto_presupuestado", "mes", "año",
+                                          "fecha_creacion", "fecha_actualizacion"])
+        cargador.registrar(pagos_programados, ["usuario_id", "categoria_id", "descripcion", "monto",
+                                               "dia_vencimiento", "fecha_fin", "frecuencia",
+                                               "proxima_fecha_vencimiento", "registrar_automaticamente",
+                                               "activo", "fecha_creacion", "fecha_actualizacion"])
+        cargador.registrar(notificaciones, ["usuario_id", "tipo_notificacion_canal", "destino", "asunto",
+                                            "mensaje", "fecha_envio", "estado_envio", "leida",
+                                            "fecha_creacion", "fecha_actualizacion"])
+
+        reporte = max(1, usuarios // 20)
+        for numero in range(usuarios):
+            rng = random.Random(semilla * 1_000_003 + numero)
+            _usuario(cargador, rng, primer_id + numero, ids_categoria, password_hash, desde, hasta)
+            if (numero + 1) % reporte == 0:
+                print(f"{numero + 1}/{usuarios} usuarios, {cargador.progreso()}")
+        cargador.terminar()
+
+        inicio = time.perf_counter()
+        resumen_mensual.reconstruir(connection)
+        connection.commit()
+        print(f"resumen_mensual reconstruido en {time.perf_counter() - inicio:.1f}s")
+
+        marca = {
+            "usuarios": usuarios, "anios": anios, "semilla": semilla, "hasta": hasta,
+            "primer_id": primer_id, "ultimo_id": primer_id + usuarios - 1,
+        }
+        semillas.create(connection, checkfirst=True)
+        connection.execute(semillas.insert().values(marca))
+        connection.commit()
+        return {**marca, "hasta": hasta.isoformat(), "filas": cargador.totales}
+    finally:
+        _restaurar_sesion(connection, anterior)
+
+
+def estado(connection: Connection) -> dict:
+    """
+    Cuantos usuarios tiene la base y la ultima marca de siembra (None si nunca se sembro).
+    """
+    inspector = inspect(connection)
+    total = connection.execute(select(func.count()).select_from(users)).scalar() if inspector.has_table(users.name) else 0
+    marca = None
+    if inspector.has_table(semillas.name):
+        fila = connection.execute(select(semillas).order_by(semillas.c.id.desc()).limit(1)).first()
+        if fila is not None:
+            marca = {columna: fila._mapping[columna] for columna in
+                     ("usuarios", "anios", "semilla", "primer_id", "ultimo_id")}
+            marca["hasta"] = fila.hasta.isoformat()
+    return {"usuarios": total, "marca": marca}
+
+
+if __name__ == "__main__":
+    from app.config.db import engine
+    from app.create_tables import crear_tablas_e_indices
+
+    parser = argparse.ArgumentParser(description="Genera datos sinteticos para pruebas de carga")
+    parser.add_argument("--usuarios", type=int, default=100)
+    parser.add_argument("--anios", type=int, default=2, help="Años de historia por usuario")
+    parser.add_argument("--semilla", type=int, default=42)
+    parser.add_argument("--hasta", type=date.fromisoformat, default=None,
+                        help="Ultima fecha generada (AAAA-MM-DD); fijarla hace la carga reproducible")
+    parser.add_argument("--password", default="password123")
+    parser.add_argument("--lote", type=int, default=LOTE, help="Filas por INSERT/commit")
+    parser.add_argument("--reporte", default=None, help="Archivo JSON donde guardar la marca de esta siembra")
+    parser.add_argument("--estado", action="store_true",
+                        help="Solo imprime en JSON los usuarios existentes y la ultima marca")
+    args = parser.parse_args()
+
+    if args.estado:
+        with engine.connect() as connection:
+            print(json.dumps(estado(connection)))
+        raise SystemExit(0)
+
+    crear_tablas_e_indices()
+    inicio = time.perf_counter()
+    with engine.connect() as connection:
+        marca = sembrar(connection, args.usuarios, args.anios, args.semilla, args.hasta, args.password, args.lote)
+    for tabla, total in marca["filas"].items():
+        print(f"{tabla}: {total}")
+    print(f"Usuarios {marca['primer_id']} a {marca['ultimo_id']}")
+    if args.reporte:
+        with open(args.reporte, "w") as archivo:
+            json.dump(marca, archivo)
+    print(f"Listo en {time.perf_counter() - inicio:.1f}s")
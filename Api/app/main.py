@@ -1,11 +1,29 @@
-from fastapi import FastAPI
+import os
+import asyncio
+from fastapi import FastAPI, Header, HTTPException, Query
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import JSONResponse, Response
 from app.router.router import router
 from app.config.db import engine, meta_data
+from app.database.connection import estado_pool, DB_MODO, obtener_async_engine
+from app.utils.pagos_recurrentes import programador_pagos, PROGRAMADOR_ACTIVO
+from app.utils.notifier import despachador_notificaciones, DESPACHADOR_ACTIVO
+from app.utils.tiempo_real import hub_notificaciones
+from app.utils.cache import caches
+from app.utils.passwords import pool_hash, PoolHashSaturado
+from app.utils.revocacion import revocaciones
+from app.utils.respuestas import RespuestaJSON
+from app.utils.compresion import CompresionMiddleware
+from app.utils.perfilador import (
+    PerfiladorMiddleware, PerfiladorOcupado, PERFILADOR_INTERVALO_MS,
+    PERFILADOR_MAX_SEGUNDOS, TIPO_CONTENIDO as TIPO_PERFIL, perfilar_ventana, token_valido,
+)
+from app.utils.metricas import MetricasMiddleware, registro_metricas, TIPO_CONTENIDO
+from app.utils.instrumentacion_sql import InstrumentacionSQLMiddleware, SQL_INSTRUMENTACION, estadisticas_rutas
 from app.model import (
     users, transaccion, tokensJWTInvalido, presupuestos,
     prefereciasNotificacionesUsuarios, pagosProgramados,
-    notificaciones, categorias
+    notificaciones, categorias, registrosEliminados, resumenMensual
 )
 from sqlalchemy.exc import OperationalError
 from sqlalchemy import text
@@ -19,7 +37,41 @@ async def lifespan(app: FastAPI):
         print("Se pudo conectar a la base de datos")
     except OperationalError as e:
         print("Error en la base de datos", e)
+    if DB_MODO == "async":
+        try:
+            async with obtener_async_engine().connect() as connection:
+                await connection.execute(text("SELECT 1"))
+            print("Modo async: se pudo conectar con el driver asincrono")
+        except OperationalError as e:
+            print("Error en la base de datos (async)", e)
+    # Programador de pagos fijos (se desactiva con PROGRAMADOR_PAGOS=0)
+    if PROGRAMADOR_ACTIVO:
+        try:
+            await programador_pagos.iniciar()
+        except OperationalError as e:
+            print("No se pudo iniciar el programador de pagos", e)
+    # Filtro de tokens revocados (y purga de los que ya expiraron)
+    try:
+        await revocaciones.iniciar()
+    except OperationalError as e:
+        print("No se pudo cargar la lista de tokens revocados", e)
+    await hub_notificaciones.iniciar()
+    # Despachador de notificaciones pendientes (apagado si no se pone NOTIFICACIONES_DESPACHADOR=1)
+    if DESPACHADOR_ACTIVO:
+        await despachador_notificaciones.iniciar()
+    # Snapshots de metricas para /metrics con varios workers (solo si hay METRICAS_DIR)
+    await registro_metricas.iniciar()
     yield
+    await registro_metricas.detener()
+    await despachador_notificaciones.detener()
+    await hub_notificaciones.detener()
+    await revocaciones.detener()
+    await programador_pagos.detener()
+    # Cerrar las conexiones del pool al apagar el worker
+    if DB_MODO == "async":
+        await obtener_async_engine().dispose()
+    pool_hash.cerrar()
+    engine.dispose()
 
 
 # Instancia de FastAPI con metadatos
@@ -27,7 +79,9 @@ app = FastAPI(
     title="Lana App API",
     description="API para gestión de gastos personales",
     version="1.0.0",
-    lifespan=lifespan
+    lifespan=lifespan,
+    # Codifica con orjson lo que no usa el camino rapido de app/utils/respuestas.py
+    default_response_class=RespuestaJSON
 )
 
 # Configurar CORS para permitir solicitudes externas (React Native, etc.)
@@ -39,8 +93,36 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
+# Comprime con brotli/gzip segun Accept-Encoding (se desactiva con COMPRESION=0)
+if os.getenv("COMPRESION", "1") == "1":
+    app.add_middleware(CompresionMiddleware)
+
+# Consultas y tiempo en la base por request (header Server-Timing y log lanaapp.sql)
+if SQL_INSTRUMENTACION:
+    app.add_middleware(InstrumentacionSQLMiddleware)
+
+# ?profile=1 con X-Admin-Token regresa las pilas del request en vez de su respuesta
+# Siempre instalado (sin token valido solo revisa la query y los headers) para poder
+# perfilar un worker vivo sin reiniciarlo
+app.add_middleware(PerfiladorMiddleware)
+
+# Latencia y requests por ruta para /metrics; va por fuera de todo para medir el request completo
+# (se agrega al final: el ultimo middleware agregado es el de mas afuera)
+app.add_middleware(MetricasMiddleware)
+
+# El pool de hash de contraseñas tiene la cola llena: mejor que el cliente reintente
+@app.exception_handler(PoolHashSaturado)
+async def pool_hash_saturado(request, exc):
+    return JSONResponse(status_code=503, content={"detail": "Servidor ocupado, intenta de nuevo"}, headers={"Retry-After": "1"})
+
+
 # Incluir router principal (que internamente incluye login_router)
-app.include_router(router)
+# Con DB_MODO=async se usan los handlers async de app/api en lugar de los de app/router
+if DB_MODO == "async":
+    from app.api.router import api_router
+    app.include_router(api_router)
+else:
+    app.include_router(router)
 
 # Crear todas las tablas si no existen
 meta_data.create_all(engine)
@@ -57,3 +139,59 @@ def root():
             "documentacion": "/docs"
         }
     }
+
+
+# Estado del pool de conexiones (conexiones en uso, overflow y tiempo de espera)
+@app.get("/lanaapp/db/pool", tags=["Sistema"])
+def obtener_estado_pool():
+    return estado_pool()
+
+
+# Metricas para Prometheus (de todos los workers si se configura METRICAS_DIR)
+@app.get("/metrics", include_in_schema=False)
+async def metricas():
+    return Response(content=await registro_metricas.exportar(), media_type=TIPO_CONTENIDO)
+
+
+# Perfil por muestreo de este worker durante una ventana (formato collapsed para flame graphs)
+@app.get("/lanaapp/admin/perfil", include_in_schema=False)
+async def perfilar_worker(
+    segundos: float = Query(10, gt=0, le=PERFILADOR_MAX_SEGUNDOS),
+    intervalo_ms: float = Query(PERFILADOR_INTERVALO_MS, ge=1, le=1000),
+    x_admin_token: str = Header(None),
+):
+    if not token_valido(x_admin_token):
+        raise HTTPException(status_code=403, detail="No autorizado")
+    try:
+        muestreador = await asyncio.to_thread(perfilar_ventana, segundos, intervalo_ms)
+    except PerfiladorOcupado as e:
+        raise HTTPException(status_code=409, detail=str(e))
+    return Response(
+        content=muestreador.collapsed(),
+        media_type=TIPO_PERFIL,
+        headers={"X-Perfil-Muestras": str(muestreador.muestras)},
+    )
+
+
+# Consultas por ruta de este worker, las que mas tiempo pasan en la base primero
+@app.get("/lanaapp/db/consultas", tags=["Sistema"])
+def obtener_consultas_por_ruta():
+    return estadisticas_rutas.reporte()
+
+
+# Hits, misses e invalidaciones de los caches en memoria de este worker
+@app.get("/lanaapp/cache", tags=["Sistema"])
+def obtener_estado_cache():
+    return {nombre: cache.estadisticas() for nombre, cache in caches.items()}
+
+
+# Trabajos en el pool de hash de contraseñas, tiempo en cola y rechazos
+@app.get("/lanaapp/auth/hash-pool", tags=["Sistema"])
+def obtener_estado_hash_pool():
+    return pool_hash.estado()
+
+
+# Estado del filtro de tokens revocados (consultas a la base y falsos positivos)
+@app.get("/lanaapp/auth/revocaciones", tags=["Sistema"])
+def obtener_estado_revocaciones():
+    return revocaciones.estado()
@@ -1,4 +1,4 @@
-from sqlalchemy import Table, Column, Integer, String, TIMESTAMP
+from sqlalchemy import Table, Column, Integer, String, TIMESTAMP, Index
 from sqlalchemy.sql import func
 from app.config.db import meta_data
 
@@ -7,5 +7,7 @@ categorias = Table("categorias", meta_data,
     Column("nombre_categoria", String(255), nullable=False),
     Column("tipo", String(50), nullable=False),  # Debes validar que solo acepte ciertos valores en lógica de negocio
     Column("fecha_creacion", TIMESTAMP, nullable=False, server_default=func.now()),
-    Column("fecha_actualizacion", TIMESTAMP, nullable=False, onupdate=func.now(), server_default=func.now())
+    Column("fecha_actualizacion", TIMESTAMP, nullable=False, onupdate=func.now(), server_default=func.now()),
+    # Para la sincronizacion incremental (/lanaapp/sync)
+    Index("ix_categorias_actualizacion", "fecha_actualizacion")
 )
@@ -1,4 +1,4 @@
-from sqlalchemy import Table, Column, Integer, String, Text, Enum, TIMESTAMP, ForeignKey
+from sqlalchemy import Table, Column, Integer, String, Text, Enum, TIMESTAMP, ForeignKey, Index
 from sqlalchemy.sql import func
 from app.config.db import meta_data
 
@@ -15,5 +15,9 @@ notificaciones = Table("notificaciones", meta_data,
     Column("notificable_type", String(50), nullable=True),
     Column("notificable_id", Integer, nullable=True),
     Column("fecha_creacion", TIMESTAMP, nullable=False, server_default=func.now()),
-    Column("fecha_actualizacion", TIMESTAMP, nullable=False, onupdate=func.now(), server_default=func.now())
+    Column("fecha_actualizacion", TIMESTAMP, nullable=False, onupdate=func.now(), server_default=func.now()),
+    # Para contar las no leidas de un usuario cuando el contador no esta en cache
+    Index("ix_notificaciones_usuario_leida", "usuario_id", "leida"),
+    # Para reclamar pendientes y contarlas en /metrics sin recorrer la tabla
+    Index("ix_notificaciones_estado_fecha_envio", "estado_envio", "fecha_envio")
 )
@@ -1,4 +1,4 @@
-from sqlalchemy import Table, Column, Integer, String, DECIMAL, Date, Enum, TIMESTAMP, ForeignKey
+from sqlalchemy import Table, Column, Integer, String, DECIMAL, Date, Enum, TIMESTAMP, ForeignKey, Index
 from sqlalchemy.sql import func
 from app.config.db import meta_data
 
@@ -15,5 +15,9 @@ pagos_programados = Table("pagosprogramados", meta_data,
     Column("registrar_automaticamente", Integer, nullable=False, default=0),
     Column("activo", Integer, nullable=False, default=1),
     Column("fecha_creacion", TIMESTAMP, nullable=False, server_default=func.now()),
-    Column("fecha_actualizacion", TIMESTAMP, nullable=False, onupdate=func.now(), server_default=func.now())
+    Column("fecha_actualizacion", TIMESTAMP, nullable=False, onupdate=func.now(), server_default=func.now()),
+    # Para la sincronizacion incremental (/lanaapp/sync)
+    Index("ix_pagosprogramados_usuario_actualizacion", "usuario_id", "fecha_actualizacion"),
+    # Ventana del programador de pagos (activos ordenados por vencimiento)
+    Index("ix_pagosprogramados_activo_vencimiento_id", "activo", "proxima_fecha_vencimiento", "id")
 )
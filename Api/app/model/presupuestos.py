@@ -1,4 +1,4 @@
-from sqlalchemy import Table, Column, Integer, DECIMAL, TIMESTAMP, ForeignKey
+from sqlalchemy import Table, Column, Integer, DECIMAL, TIMESTAMP, ForeignKey, Index
 from sqlalchemy.sql import func
 from app.config.db import meta_data
 
@@ -10,5 +10,9 @@ presupuestos = Table("presupuestos", meta_data,
     Column("mes", Integer, nullable=False),
     Column("año", Integer, nullable=False),
     Column("fecha_creacion", TIMESTAMP, nullable=False, server_default=func.now()),
-    Column("fecha_actualizacion", TIMESTAMP, nullable=False, onupdate=func.now(), server_default=func.now())
+    Column("fecha_actualizacion", TIMESTAMP, nullable=False, onupdate=func.now(), server_default=func.now()),
+    # Para la sincronizacion incremental (/lanaapp/sync)
+    Index("ix_presupuestos_usuario_actualizacion", "usuario_id", "fecha_actualizacion"),
+    # Para el consumo del mes y el limite de una categoria (app/utils/budget_checker.py)
+    Index("ix_presupuestos_usuario_mes_categoria", "usuario_id", "año", "mes", "categoria_id")
 )
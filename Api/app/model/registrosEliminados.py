@@ -0,0 +1,15 @@
+from sqlalchemy import Table, Column, Integer, String, TIMESTAMP, Index
+from sqlalchemy.sql import func
+from app.config.db import meta_data
+
+# Tombstones: cada DELETE deja aqui un registro para que /lanaapp/sync
+# le pueda avisar a los clientes offline que borren su copia local
+registros_eliminados = Table("registroseliminados", meta_data,
+    Column("id", Integer, primary_key=True, unique=True),
+    Column("tabla", String(50), nullable=False),
+    Column("registro_id", Integer, nullable=False),
+    # NULL para catalogos globales (categorias)
+    Column("usuario_id", Integer, nullable=True),
+    Column("fecha_eliminacion", TIMESTAMP, nullable=False, server_default=func.now()),
+    Index("ix_registroseliminados_usuario_fecha", "usuario_id", "fecha_eliminacion")
+)
@@ -0,0 +1,15 @@
+from sqlalchemy import Table, Column, Integer, DECIMAL, TIMESTAMP, ForeignKey
+from sqlalchemy.sql import func
+from app.config.db import meta_data
+
+# Totales por usuario, mes y categoria. Se mantiene al dia en la misma transaccion
+# que cada alta/cambio/baja de transacciones (ver app/utils/resumen_mensual.py)
+resumen_mensual = Table("resumen_mensual", meta_data,
+    Column("usuario_id", Integer, ForeignKey("usuarios.id"), primary_key=True),
+    Column("año", Integer, primary_key=True),
+    Column("mes", Integer, primary_key=True),
+    Column("categoria_id", Integer, ForeignKey("categorias.id"), primary_key=True),
+    Column("total", DECIMAL(14, 2), nullable=False, default=0),
+    Column("cantidad", Integer, nullable=False, default=0),
+    Column("fecha_actualizacion", TIMESTAMP, nullable=False, onupdate=func.now(), server_default=func.now())
+)
@@ -1,4 +1,4 @@
-from sqlalchemy import Table, Column, Integer, String, TIMESTAMP
+from sqlalchemy import Table, Column, Integer, String, TIMESTAMP, Index
 from sqlalchemy.sql import func
 from app.config.db import meta_data
 
@@ -6,5 +6,9 @@ tokens_invalidos = Table("tokensjwtinvalidados", meta_data,
     Column("id", Integer, primary_key=True, unique=True),
     Column("token_jwt", String(255), nullable=False),
     Column("fecha_expiracion_original", TIMESTAMP, nullable=False),
-    Column("fecha_invalidacion", TIMESTAMP, nullable=False, server_default=func.now())
+    Column("fecha_invalidacion", TIMESTAMP, nullable=False, server_default=func.now()),
+    # token_jwt guarda el jti del token; se busca por el cuando el filtro de Bloom da positivo
+    Index("ix_tokensjwtinvalidados_token", "token_jwt"),
+    # Para la purga de tokens que ya expiraron
+    Index("ix_tokensjwtinvalidados_expiracion", "fecha_expiracion_original")
 )
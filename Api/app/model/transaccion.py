@@ -1,4 +1,4 @@
-from sqlalchemy import Table, Column, Integer, DECIMAL, String, Date, TIMESTAMP, ForeignKey, JSON
+from sqlalchemy import Table, Column, Integer, DECIMAL, String, Date, TIMESTAMP, ForeignKey, JSON, Index
 from sqlalchemy.sql import func
 from app.config.db import meta_data
 
@@ -12,5 +12,11 @@ transacciones = Table("transacciones", meta_data,
     Column("metadatos", JSON, nullable=True),
     Column("pendiente_sincronizacion", Integer, nullable=False, default=0),
     Column("fecha_creacion", TIMESTAMP, nullable=False, server_default=func.now()),
-    Column("fecha_actualizacion", TIMESTAMP, nullable=False, onupdate=func.now(), server_default=func.now())
+    Column("fecha_actualizacion", TIMESTAMP, nullable=False, onupdate=func.now(), server_default=func.now()),
+    # Indices para el listado paginado por cursor (usuario_id, fecha_transaccion, id)
+    # y para el mismo listado filtrado por categoria
+    Index("ix_transacciones_usuario_fecha_id", "usuario_id", "fecha_transaccion", "id"),
+    Index("ix_transacciones_usuario_categoria_fecha_id", "usuario_id", "categoria_id", "fecha_transaccion", "id"),
+    # Para la sincronizacion incremental (/lanaapp/sync)
+    Index("ix_transacciones_usuario_actualizacion", "usuario_id", "fecha_actualizacion")
 )
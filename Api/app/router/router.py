@@ -8,6 +8,8 @@ from app.router.router_pagos_programados import pagos_router
 from app.router.router_notificaciones import notificaciones_router
 from app.router.router_categoria import categoria_router
 from app.router.router_login import login_router
+from app.router.router_sync import sync_router
+from app.router.router_stream import stream_router
 
 router = APIRouter()
 
@@ -15,7 +17,10 @@ router.include_router(user_router)
 router.include_router(transaccion_router)
 router.include_router(presupuesto_router)
 router.include_router(pagos_router)
+# stream va antes para que GET /notificaciones/stream no caiga en /notificaciones/{notificacion_id}
+router.include_router(stream_router)
 router.include_router(notificaciones_router)
 router.include_router(categoria_router)
 router.include_router(login_router) 
+router.include_router(sync_router)
 
@@ -1,53 +1,53 @@
-from fastapi import APIRouter, HTTPException
+from fastapi import APIRouter, HTTPException, Depends, Header
 from starlette.status import HTTP_201_CREATED, HTTP_404_NOT_FOUND
-from app.config.db import engine
+from sqlalchemy.engine import Connection
+from app.database.connection import get_connection
 from app.model.categorias import categorias
+from app.utils.eliminaciones import registrar_eliminacion
+from app.utils import catalogo_categorias
 from app.schema.categoria_schema import CategoriaSchema, CategoriaSchemaOut
-from typing import List
+from typing import List, Optional
 
 categoria_router = APIRouter()
 
 @categoria_router.post("/lanaapp/categorias", status_code=HTTP_201_CREATED, tags=["Categorías"])
-def crear_categoria(data: CategoriaSchema):
+def crear_categoria(data: CategoriaSchema, connection: Connection = Depends(get_connection)):
     nueva_categoria = data.model_dump()
-    with engine.connect() as connection:
-        with connection.begin():
-            connection.execute(categorias.insert().values(nueva_categoria))
+    connection.execute(categorias.insert().values(nueva_categoria))
+    catalogo_categorias.invalidar_catalogo(connection)
     return {"mensaje": "Categoría creada correctamente"}
 
+# Sin Depends(get_connection): el catalogo sale del cache (ver app/utils/catalogo_categorias.py)
 @categoria_router.get("/lanaapp/categorias", response_model=List[CategoriaSchemaOut], tags=["Categorías"])
-def obtener_categorias():
-    with engine.connect() as connection:
-        result = connection.execute(categorias.select()).fetchall()
-        return [dict(row._mapping) for row in result]
+def obtener_categorias(if_none_match: Optional[str] = Header(None)):
+    return catalogo_categorias.responder(catalogo_categorias.obtener_catalogo(), if_none_match)
 
 @categoria_router.get("/lanaapp/categorias/{categoria_id}", response_model=CategoriaSchemaOut, tags=["Categorías"])
-def obtener_categoria(categoria_id: int):
-    with engine.connect() as connection:
-        result = connection.execute(categorias.select().where(categorias.c.id == categoria_id)).first()
-        if result is None:
-            raise HTTPException(status_code=HTTP_404_NOT_FOUND, detail="Categoría no encontrada")
-        return dict(result._mapping)
+def obtener_categoria(categoria_id: int, connection: Connection = Depends(get_connection)):
+    result = connection.execute(categorias.select().where(categorias.c.id == categoria_id)).first()
+    if result is None:
+        raise HTTPException(status_code=HTTP_404_NOT_FOUND, detail="Categoría no encontrada")
+    return dict(result._mapping)
 
 @categoria_router.put("/lanaapp/categorias/{categoria_id}", tags=["Categorías"])
-def actualizar_categoria(categoria_id: int, data: CategoriaSchema):
+def actualizar_categoria(categoria_id: int, data: CategoriaSchema, connection: Connection = Depends(get_connection)):
     actualizada = data.model_dump()
-    with engine.connect() as connection:
-        with connection.begin():
-            result = connection.execute(
-                categorias.update()
-                .where(categorias.c.id == categoria_id)
-                .values(actualizada)
-            )
-            if result.rowcount == 0:
-                raise HTTPException(status_code=HTTP_404_NOT_FOUND, detail="Categoría no encontrada")
+    result = connection.execute(
+        categorias.update()
+        .where(categorias.c.id == categoria_id)
+        .values(actualizada)
+    )
+    if result.rowcount == 0:
+        raise HTTPException(status_code=HTTP_404_NOT_FOUND, detail="Categoría no encontrada")
+    catalogo_categorias.invalidar_catalogo(connection)
     return {"mensaje": "Categoría actualizada correctamente"}
 
 @categoria_router.delete("/lanaapp/categorias/{categoria_id}", tags=["Categorías"])
-def eliminar_categoria(categoria_id: int):
-    with engine.connect() as connection:
-        with connection.begin():
-            result = connection.execute(categorias.delete().where(categorias.c.id == categoria_id))
-            if result.rowcount == 0:
-                raise HTTPException(status_code=HTTP_404_NOT_FOUND, detail="Categoría no encontrada")
+def eliminar_categoria(categoria_id: int, connection: Connection = Depends(get_connection)):
+    result = connection.execute(categorias.delete().where(categorias.c.id == categoria_id))
+    if result.rowcount == 0:
+        raise HTTPException(status_code=HTTP_404_NOT_FOUND, detail="Categoría no encontrada")
+    # Las categorias son globales, el tombstone no tiene usuario
+    registrar_eliminacion(connection, "categorias", categoria_id)
+    catalogo_categorias.invalidar_catalogo(connection)
     return {"mensaje": "Categoría eliminada correctamente"}
@@ -5,12 +5,16 @@ from sqlalchemy.orm import Session
 from datetime import datetime, timedelta
 from typing import Optional
 import jwt
+import uuid
 from pydantic import BaseModel
-from werkzeug.security import check_password_hash
 
-from app.config.db import engine
+from sqlalchemy.engine import Connection
+from starlette.concurrency import run_in_threadpool
+from app.database.connection import get_connection, abrir_conexion, ejecutar_en_transaccion
 from app.model.users import users
 from sqlalchemy.sql import select
+from app.utils import cache_usuarios, passwords
+from app.utils.revocacion import revocaciones, revocar
 
 # Configuración
 login_router = APIRouter()
@@ -45,56 +49,69 @@ def create_access_token(data: dict, expires_delta: Optional[timedelta] = None):
         expire = datetime.utcnow() + expires_delta
     else:
         expire = datetime.utcnow() + timedelta(minutes=15)
-    to_encode.update({"exp": expire})
+    # jti identifica al token para poder revocarlo en /logout
+    to_encode.update({"exp": expire, "jti": uuid.uuid4().hex})
     encoded_jwt = jwt.encode(to_encode, SECRET_KEY, algorithm=ALGORITHM)
     return encoded_jwt
 
-# Función para verificar token
-def verify_token(credentials: HTTPAuthorizationCredentials = Depends(security)):
+# Regresa el email (sub) de un token valido y no revocado, o None
+# Lo usan verify_token y los endpoints que reciben el token fuera del header (WebSocket)
+def decodificar_token(token: str) -> Optional[str]:
     try:
-        payload = jwt.decode(credentials.credentials, SECRET_KEY, algorithms=[ALGORITHM])
-        email: str = payload.get("sub")
-        if email is None:
-            raise HTTPException(
-                status_code=status.HTTP_401_UNAUTHORIZED,
-                detail="Token inválido",
-                headers={"WWW-Authenticate": "Bearer"},
-            )
-        return email
+        payload = jwt.decode(token, SECRET_KEY, algorithms=[ALGORITHM])
     except jwt.PyJWTError:
+        return None
+    # Los tokens emitidos antes de agregar jti no se pueden revocar; expiran solos
+    jti = payload.get("jti")
+    if jti is not None and revocaciones.esta_revocado(jti):
+        return None
+    return payload.get("sub")
+
+# Función para verificar token
+def verify_token(credentials: HTTPAuthorizationCredentials = Depends(security)):
+    email = decodificar_token(credentials.credentials)
+    if email is None:
         raise HTTPException(
             status_code=status.HTTP_401_UNAUTHORIZED,
             detail="Token inválido",
             headers={"WWW-Authenticate": "Bearer"},
         )
+    return email
 
-# Función para obtener usuario por email
-def get_user_by_email(email: str):
+# Función para obtener usuario por email (usa la conexion del request)
+def get_user_by_email(connection: Connection, email: str):
     try:
-        with engine.connect() as connection:
-            result = connection.execute(
-                users.select().where(users.c.email == email)
-            ).first()
-            return result
+        result = connection.execute(
+            users.select().where(users.c.email == email)
+        ).first()
+        return result
     except Exception as e:
         print(f"Error obteniendo usuario por email: {e}")
         return None
 
-# Función para obtener usuario por ID
-def get_user_by_id(user_id: int):
+# Función para obtener usuario por ID (usa la conexion del request)
+def get_user_by_id(connection: Connection, user_id: int):
     try:
-        with engine.connect() as connection:
-            result = connection.execute(
-                users.select().where(users.c.id == user_id)
-            ).first()
-            return result
+        result = connection.execute(
+            users.select().where(users.c.id == user_id)
+        ).first()
+        return result
     except Exception as e:
         print(f"Error obteniendo usuario por ID: {e}")
         return None
 
+# Busca el usuario del token primero en cache; solo en un miss se abre una conexion
+def cargar_usuario_autenticado(email: str):
+    user = cache_usuarios.usuario_por_email(email)
+    if user is None:
+        with abrir_conexion() as connection:
+            user = cache_usuarios.leer_usuario(connection, email)
+        cache_usuarios.guardar_usuario(user)
+    return user
+
 # Función para obtener el usuario actual basado en el token
 def get_current_user(email: str = Depends(verify_token)):
-    user = get_user_by_email(email)
+    user = cargar_usuario_autenticado(email)
     if user is None:
         raise HTTPException(
             status_code=status.HTTP_401_UNAUTHORIZED,
@@ -102,27 +119,25 @@ def get_current_user(email: str = Depends(verify_token)):
         )
     return user
 
-@login_router.post("/login", response_model=Token, tags=["Autenticación"])
-async def login(user_data: UserLogin):
+def credenciales_invalidas():
+    return HTTPException(
+        status_code=status.HTTP_401_UNAUTHORIZED,
+        detail="Email o contraseña incorrectos"
+    )
+
+def guardar_rehash(user_id: int, password_hash: str, connection: Connection):
     """
-    Endpoint para iniciar sesión
+    Reemplaza un hash hecho con parametros viejos (ver passwords.necesita_rehash).
+    """
+    connection.execute(users.update().where(users.c.id == user_id).values(password_hash=password_hash))
+    user = get_user_by_id(connection, user_id)
+    if user is not None:
+        cache_usuarios.invalidar_usuario(connection, user_id, user.email)
+
+def emitir_token(user) -> Token:
+    """
+    Genera el token de un usuario ya autenticado. Se comparte entre /login sync y async.
     """
-    # Buscar usuario por email
-    user = get_user_by_email(user_data.email.lower().strip())
-    
-    if not user:
-        raise HTTPException(
-            status_code=status.HTTP_401_UNAUTHORIZED,
-            detail="Email o contraseña incorrectos"
-        )
-    
-    # Verificar contraseña usando werkzeug (igual que en tu registro)
-    if not check_password_hash(user.password_hash, user_data.password):
-        raise HTTPException(
-            status_code=status.HTTP_401_UNAUTHORIZED,
-            detail="Email o contraseña incorrectos"
-        )
-    
     # Crear token de acceso
     access_token_expires = timedelta(minutes=ACCESS_TOKEN_EXPIRE_MINUTES)
     access_token = create_access_token(
@@ -146,6 +161,22 @@ async def login(user_data: UserLogin):
         user=user_response
     )
 
+# async def sin Depends(get_connection): mientras espera al pool de hash no ocupa
+# un hilo del threadpool ni una conexion; la base solo se toca en la busqueda y el rehash
+@login_router.post("/login", response_model=Token, tags=["Autenticación"])
+async def login(user_data: UserLogin):
+    """
+    Endpoint para iniciar sesión
+    """
+    # Buscar usuario por email
+    user = await run_in_threadpool(ejecutar_en_transaccion, get_user_by_email, email=user_data.email.lower().strip())
+    if not user or not await passwords.verificar_async(user.password_hash, user_data.password):
+        raise credenciales_invalidas()
+    if passwords.necesita_rehash(user.password_hash):
+        nuevo_hash = await passwords.hashear_async(user_data.password)
+        await run_in_threadpool(ejecutar_en_transaccion, guardar_rehash, user.id, nuevo_hash)
+    return emitir_token(user)
+
 @login_router.get("/verify-token", response_model=UserResponse, tags=["Autenticación"])
 async def verify_user_token(current_user = Depends(get_current_user)):
     """
@@ -176,11 +207,19 @@ async def get_current_user_info(current_user = Depends(get_current_user)):
     )
 
 @login_router.post("/logout", tags=["Autenticación"])
-async def logout():
+def logout(credentials: HTTPAuthorizationCredentials = Depends(security), connection: Connection = Depends(get_connection)):
     """
-    Logout - En JWT stateless no necesitas hacer nada en el servidor.
+    Logout - Revoca el token: se guarda su jti y deja de aceptarse aunque no haya expirado.
     El cliente debe eliminar el token de su almacenamiento local.
     """
+    try:
+        payload = jwt.decode(credentials.credentials, SECRET_KEY, algorithms=[ALGORITHM])
+    except jwt.PyJWTError:
+        # Un token invalido o expirado ya no sirve, no hay nada que revocar
+        return {"message": "Logout exitoso"}
+    jti = payload.get("jti")
+    if jti is not None and not revocaciones.esta_revocado(jti):
+        revocar(connection, jti, datetime.utcfromtimestamp(payload["exp"]))
     return {"message": "Logout exitoso"}
 
 # Función helper para usar en otros routers que necesiten autenticación
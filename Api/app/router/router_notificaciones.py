@@ -1,104 +1,121 @@
-from fastapi import APIRouter, HTTPException
+from fastapi import APIRouter, HTTPException, Depends, Query
 from starlette.status import HTTP_201_CREATED, HTTP_404_NOT_FOUND
-from typing import List
-from app.config.db import engine
+from typing import List, Optional
+from sqlalchemy import select
+from sqlalchemy.engine import Connection
+from app.database.connection import get_connection, abrir_conexion
 from app.model.notificaciones import notificaciones
 from app.schema.notificaciones_schema import NotificacionSchema, NotificacionSchemaOut
+from app.utils.notifier import encolar_notificaciones
+from app.utils import no_leidas
+from app.utils.respuestas import SerializadorFilas, responder
 
 notificaciones_router = APIRouter()
 
+SERIALIZADOR_NOTIFICACION = SerializadorFilas(NotificacionSchemaOut)
+
 @notificaciones_router.get("/lanaapp/notificaciones", response_model=List[NotificacionSchemaOut], tags=["Notificaciones"])
-def obtener_todas():
-    with engine.connect() as connection:
-        result = connection.execute(notificaciones.select()).fetchall()
-        return result
+def obtener_todas(
+    fields: Optional[str] = Query(None, description="Campos a incluir separados por coma, p. ej. id,mensaje"),
+    connection: Connection = Depends(get_connection),
+):
+    serializador = SERIALIZADOR_NOTIFICACION.seleccionar(fields)
+    result = connection.execute(select(*serializador.columnas_sql(notificaciones))).fetchall()
+    return responder(serializador.lista(result), directo=serializador.es_parcial)
 
 @notificaciones_router.get("/lanaapp/notificaciones/usuario/{usuario_id}", response_model=List[NotificacionSchemaOut], tags=["Notificaciones"])
-def obtener_por_usuario(usuario_id: int):
-    with engine.connect() as connection:
-        result = connection.execute(
-            notificaciones.select().where(notificaciones.c.usuario_id == usuario_id)
-        ).fetchall()
-        return result
+def obtener_por_usuario(
+    usuario_id: int,
+    fields: Optional[str] = Query(None, description="Campos a incluir separados por coma, p. ej. id,mensaje"),
+    connection: Connection = Depends(get_connection),
+):
+    serializador = SERIALIZADOR_NOTIFICACION.seleccionar(fields)
+    result = connection.execute(
+        select(*serializador.columnas_sql(notificaciones)).where(notificaciones.c.usuario_id == usuario_id)
+    ).fetchall()
+    return responder(serializador.lista(result), directo=serializador.es_parcial)
+
+# Sin Depends(get_connection): si el contador esta en cache no se saca conexion del pool
+@notificaciones_router.get("/lanaapp/notificaciones/usuario/{usuario_id}/no-leidas/count", tags=["Notificaciones"])
+def contar_no_leidas(usuario_id: int):
+    total = no_leidas.no_leidas_en_cache(usuario_id)
+    if total is None:
+        with abrir_conexion() as connection:
+            total = no_leidas.recalcular_no_leidas(connection, usuario_id)
+    return {"usuario_id": usuario_id, "no_leidas": total}
 
 @notificaciones_router.post("/lanaapp/notificaciones", status_code=HTTP_201_CREATED, tags=["Notificaciones"])
-def crear_notificacion(data: NotificacionSchema):
-    valores = data.model_dump()
-    with engine.connect() as connection:
-        connection.execute(notificaciones.insert().values(valores))
-        connection.commit()
+def crear_notificacion(data: NotificacionSchema, connection: Connection = Depends(get_connection)):
+    # Pasa por la cola para que el despachador la envie si quedo pendiente
+    encolar_notificaciones(connection, [data.model_dump()])
     return {"mensaje": "Notificación creada"}
 
 @notificaciones_router.get("/lanaapp/notificaciones/{notificacion_id}", response_model=NotificacionSchemaOut, tags=["Notificaciones"])
-def obtener_por_id(notificacion_id: int):
-    with engine.connect() as connection:
-        result = connection.execute(
-            notificaciones.select().where(notificaciones.c.id == notificacion_id)
-        ).first()
-        if result is None:
-            raise HTTPException(status_code=HTTP_404_NOT_FOUND, detail="No encontrada")
-        return dict(result._mapping)
+def obtener_por_id(notificacion_id: int, connection: Connection = Depends(get_connection)):
+    result = connection.execute(
+        notificaciones.select().where(notificaciones.c.id == notificacion_id)
+    ).first()
+    if result is None:
+        raise HTTPException(status_code=HTTP_404_NOT_FOUND, detail="No encontrada")
+    return dict(result._mapping)
 
 @notificaciones_router.put("/lanaapp/notificaciones/{notificacion_id}", tags=["Notificaciones"])
-def actualizar_notificacion(notificacion_id: int, data: NotificacionSchema):
+def actualizar_notificacion(notificacion_id: int, data: NotificacionSchema, connection: Connection = Depends(get_connection)):
     valores = data.model_dump()
-    with engine.connect() as connection:
-        result = connection.execute(
-            notificaciones.update()
-            .where(notificaciones.c.id == notificacion_id)
-            .values(valores)
-        )
-        connection.commit()
-        if result.rowcount == 0:
-            raise HTTPException(status_code=HTTP_404_NOT_FOUND, detail="No encontrada")
+    anterior = connection.execute(
+        select(notificaciones.c.usuario_id).where(notificaciones.c.id == notificacion_id)
+    ).first()
+    if anterior is None:
+        raise HTTPException(status_code=HTTP_404_NOT_FOUND, detail="No encontrada")
+    connection.execute(
+        notificaciones.update()
+        .where(notificaciones.c.id == notificacion_id)
+        .values(valores)
+    )
+    no_leidas.invalidar_usuarios(connection, anterior.usuario_id, data.usuario_id)
     return {"mensaje": "Notificación actualizada"}
 
 @notificaciones_router.delete("/lanaapp/notificaciones/{notificacion_id}", tags=["Notificaciones"])
-def eliminar_notificacion(notificacion_id: int):
-    with engine.connect() as connection:
-        result = connection.execute(
-            notificaciones.delete().where(notificaciones.c.id == notificacion_id)
-        )
-        connection.commit()
-        if result.rowcount == 0:
-            raise HTTPException(status_code=HTTP_404_NOT_FOUND, detail="No encontrada")
+def eliminar_notificacion(notificacion_id: int, connection: Connection = Depends(get_connection)):
+    anterior = connection.execute(
+        select(notificaciones.c.usuario_id, notificaciones.c.leida).where(notificaciones.c.id == notificacion_id)
+    ).first()
+    if anterior is None:
+        raise HTTPException(status_code=HTTP_404_NOT_FOUND, detail="No encontrada")
+    connection.execute(
+        notificaciones.delete().where(notificaciones.c.id == notificacion_id)
+    )
+    if not anterior.leida:
+        no_leidas.registrar_leida(connection, anterior.usuario_id)
     return {"mensaje": "Notificación eliminada"}
 
 @notificaciones_router.put("/lanaapp/notificaciones/{notificacion_id}/leida", tags=["Notificaciones"])
-def marcar_como_leida(notificacion_id: int):
-    with engine.connect() as connection:
-        result = connection.execute(
-            notificaciones.update()
-            .where(notificaciones.c.id == notificacion_id)
-            .values(leida=1)
-        )
-        connection.commit()
-        if result.rowcount == 0:
-            raise HTTPException(status_code=HTTP_404_NOT_FOUND, detail="No encontrada")
-    return {"mensaje": "Notificación marcada como leída"}
-
-@notificaciones_router.put("/lanaapp/notificaciones/{notificacion_id}/leida", tags=["Notificaciones"])
-def marcar_como_leida(notificacion_id: int):
-    with engine.connect() as connection:
-        result = connection.execute(
-            notificaciones.update()
-            .where(notificaciones.c.id == notificacion_id)
-            .values(leida=1)
-        )
-        connection.commit()
-        if result.rowcount == 0:
-            raise HTTPException(status_code=HTTP_404_NOT_FOUND, detail="No encontrada")
+def marcar_como_leida(notificacion_id: int, connection: Connection = Depends(get_connection)):
+    anterior = connection.execute(
+        select(notificaciones.c.usuario_id, notificaciones.c.leida).where(notificaciones.c.id == notificacion_id)
+    ).first()
+    if anterior is None:
+        raise HTTPException(status_code=HTTP_404_NOT_FOUND, detail="No encontrada")
+    if anterior.leida:
+        return {"mensaje": "Notificación marcada como leída"}
+    # leida == 0 en el WHERE para no restar dos veces si dos requests la marcan a la vez
+    result = connection.execute(
+        notificaciones.update()
+        .where(notificaciones.c.id == notificacion_id, notificaciones.c.leida == 0)
+        .values(leida=1)
+    )
+    if result.rowcount:
+        no_leidas.registrar_leida(connection, anterior.usuario_id)
     return {"mensaje": "Notificación marcada como leída"}
 
 @notificaciones_router.put("/lanaapp/notificaciones/usuario/{usuario_id}/marcar-leidas", tags=["Notificaciones"])
-def marcar_todas_como_leidas(usuario_id: int):
-    with engine.connect() as connection:
-        result = connection.execute(
-            notificaciones.update()
-            .where(notificaciones.c.usuario_id == usuario_id)
-            .values(leida=1)
-        )
-        connection.commit()
-        if result.rowcount == 0:
-            raise HTTPException(status_code=HTTP_404_NOT_FOUND, detail="No hay notificaciones para actualizar")
+def marcar_todas_como_leidas(usuario_id: int, connection: Connection = Depends(get_connection)):
+    result = connection.execute(
+        notificaciones.update()
+        .where(notificaciones.c.usuario_id == usuario_id)
+        .values(leida=1)
+    )
+    if result.rowcount == 0:
+        raise HTTPException(status_code=HTTP_404_NOT_FOUND, detail="No hay notificaciones para actualizar")
+    no_leidas.registrar_todas_leidas(connection, usuario_id)
     return {"mensaje": f"Se marcaron {result.rowcount} notificaciones como leídas"}
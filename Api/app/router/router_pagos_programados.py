@@ -1,56 +1,90 @@
-from fastapi import APIRouter, HTTPException
+from fastapi import APIRouter, HTTPException, Depends, Query
 from starlette.status import HTTP_201_CREATED, HTTP_404_NOT_FOUND
-from typing import List
-from app.config.db import engine
+from typing import List, Optional
+from sqlalchemy import select
+from sqlalchemy.engine import Connection
+from app.database.connection import get_connection, al_confirmar
 from app.model.pagosProgramados import pagos_programados
+from app.utils.eliminaciones import registrar_eliminacion
+from app.utils.pagos_recurrentes import programador_pagos, primer_vencimiento
 from app.schema.pagos_programados_schema import PagoProgramadoSchema, PagoProgramadoSchemaOut
+from app.utils.respuestas import SerializadorFilas, responder
 from datetime import date
 
 pagos_router = APIRouter()
 
+SERIALIZADOR_PAGO = SerializadorFilas(PagoProgramadoSchemaOut)
+
+def _valores_pago(data: PagoProgramadoSchema) -> dict:
+    valores = data.model_dump()
+    if valores["proxima_fecha_vencimiento"] is None:
+        valores["proxima_fecha_vencimiento"] = primer_vencimiento(data.frecuencia, data.dia_vencimiento)
+    return valores
+
 @pagos_router.get("/lanaapp/pagos-fijos", response_model=List[PagoProgramadoSchemaOut], tags=["Pagos Fijos"])
-def obtener_pagos_programados():
-    with engine.connect() as connection:
-        result = connection.execute(pagos_programados.select()).fetchall()
-        return result
+def obtener_pagos_programados(
+    fields: Optional[str] = Query(None, description="Campos a incluir separados por coma, p. ej. id,monto"),
+    connection: Connection = Depends(get_connection),
+):
+    serializador = SERIALIZADOR_PAGO.seleccionar(fields)
+    result = connection.execute(select(*serializador.columnas_sql(pagos_programados))).fetchall()
+    return responder(serializador.lista(result), directo=serializador.es_parcial)
 
 @pagos_router.post("/lanaapp/pagos-fijos", status_code=HTTP_201_CREATED, tags=["Pagos Fijos"])
-def crear_pago_programado(data: PagoProgramadoSchema):
-    nuevo_pago = data.model_dump()
-    with engine.connect() as connection:
-        connection.execute(pagos_programados.insert().values(nuevo_pago))
+def crear_pago_programado(data: PagoProgramadoSchema, connection: Connection = Depends(get_connection)):
+    nuevo_pago = _valores_pago(data)
+    result = connection.execute(pagos_programados.insert().values(nuevo_pago))
+    if nuevo_pago["activo"]:
+        # Despues del commit, si no el programador podria buscar la fila antes de que exista
+        pago_id = result.inserted_primary_key[0]
+        al_confirmar(connection, lambda: programador_pagos.programar(pago_id, nuevo_pago["proxima_fecha_vencimiento"]))
     return {"mensaje": "Pago fijo creado correctamente"}
 
 @pagos_router.put("/lanaapp/pagos-fijos/{pago_id}", tags=["Pagos Fijos"])
-def actualizar_pago_programado(pago_id: int, data: PagoProgramadoSchema):
-    valores = data.model_dump()
-    with engine.connect() as connection:
-        result = connection.execute(
-            pagos_programados.update()
-            .where(pagos_programados.c.id == pago_id)
-            .values(valores)
-        )
-        if result.rowcount == 0:
-            raise HTTPException(status_code=HTTP_404_NOT_FOUND, detail="Pago no encontrado")
+def actualizar_pago_programado(pago_id: int, data: PagoProgramadoSchema, connection: Connection = Depends(get_connection)):
+    valores = _valores_pago(data)
+    result = connection.execute(
+        pagos_programados.update()
+        .where(pagos_programados.c.id == pago_id)
+        .values(valores)
+    )
+    if result.rowcount == 0:
+        raise HTTPException(status_code=HTTP_404_NOT_FOUND, detail="Pago no encontrado")
+    if valores["activo"]:
+        al_confirmar(connection, lambda: programador_pagos.programar(pago_id, valores["proxima_fecha_vencimiento"]))
+    else:
+        al_confirmar(connection, lambda: programador_pagos.cancelar(pago_id))
     return {"mensaje": "Pago fijo actualizado correctamente"}
 
 @pagos_router.delete("/lanaapp/pagos-fijos/{pago_id}", tags=["Pagos Fijos"])
-def eliminar_pago_programado(pago_id: int):
-    with engine.connect() as connection:
-        result = connection.execute(
-            pagos_programados.delete().where(pagos_programados.c.id == pago_id)
-        )
-        if result.rowcount == 0:
-            raise HTTPException(status_code=HTTP_404_NOT_FOUND, detail="Pago no encontrado")
+def eliminar_pago_programado(pago_id: int, connection: Connection = Depends(get_connection)):
+    existente = connection.execute(
+        select(pagos_programados.c.usuario_id).where(pagos_programados.c.id == pago_id)
+    ).first()
+    if existente is None:
+        raise HTTPException(status_code=HTTP_404_NOT_FOUND, detail="Pago no encontrado")
+    connection.execute(
+        pagos_programados.delete().where(pagos_programados.c.id == pago_id)
+    )
+    registrar_eliminacion(connection, "pagos_programados", pago_id, existente.usuario_id)
+    al_confirmar(connection, lambda: programador_pagos.cancelar(pago_id))
     return {"mensaje": "Pago fijo eliminado correctamente"}
 
 @pagos_router.get("/lanaapp/pagos-fijos/upcoming", response_model=List[PagoProgramadoSchemaOut], tags=["Pagos Fijos"])
-def obtener_pagos_proximos():
+def obtener_pagos_proximos(
+    usuario_id: Optional[int] = None,
+    fields: Optional[str] = Query(None, description="Campos a incluir separados por coma, p. ej. id,monto"),
+    connection: Connection = Depends(get_connection),
+):
+    serializador = SERIALIZADOR_PAGO.seleccionar(fields)
     hoy = date.today()
-    with engine.connect() as connection:
-        result = connection.execute(
-            pagos_programados.select().where(
-                pagos_programados.c.proximo_pago >= hoy
-            ).order_by(pagos_programados.c.proximo_pago.asc())
-        ).fetchall()
-        return result
+    consulta = select(*serializador.columnas_sql(pagos_programados)).where(
+        pagos_programados.c.activo == 1,
+        pagos_programados.c.proxima_fecha_vencimiento >= hoy,
+    )
+    if usuario_id is not None:
+        consulta = consulta.where(pagos_programados.c.usuario_id == usuario_id)
+    result = connection.execute(
+        consulta.order_by(pagos_programados.c.proxima_fecha_vencimiento.asc())
+    ).fetchall()
+    return responder(serializador.lista(result), directo=serializador.es_parcial)
@@ -1,49 +1,84 @@
 # app/router/router_presupuesto.py
 
-from fastapi import APIRouter, HTTPException
+from fastapi import APIRouter, HTTPException, Depends, Query
 from starlette.status import HTTP_201_CREATED, HTTP_404_NOT_FOUND
-from typing import List
-from app.config.db import engine
+from typing import List, Optional
+from sqlalchemy import select
+from sqlalchemy.engine import Connection
+from app.database.connection import get_connection
 from app.model.presupuestos import presupuestos
-from app.schema.presupuesto_schema import PresupuestoSchema, PresupuestoSchemaOut
+from app.utils.eliminaciones import registrar_eliminacion
+from app.utils import budget_checker
+from app.utils.respuestas import SerializadorFilas, responder
+from app.schema.presupuesto_schema import PresupuestoSchema, PresupuestoSchemaOut, EstadoPresupuestoSchemaOut
 
 presupuesto_router = APIRouter()
 
+# El schema usa "anio" y la tabla "año"
+def _a_columnas(data: PresupuestoSchema) -> dict:
+    valores = data.model_dump()
+    valores["año"] = valores.pop("anio")
+    return valores
+
+# La tabla usa "año" y el schema "anio"
+SERIALIZADOR_PRESUPUESTO = SerializadorFilas(PresupuestoSchemaOut, columnas={"anio": "año"})
+
 @presupuesto_router.get("/lanaapp/presupuesto", response_model=List[PresupuestoSchemaOut], tags=["Presupuesto"])
-def obtener_presupuestos():
-    with engine.connect() as connection:
-        result = connection.execute(presupuestos.select()).fetchall()
-        return result
+def obtener_presupuestos(
+    fields: Optional[str] = Query(None, description="Campos a incluir separados por coma, p. ej. id,monto"),
+    connection: Connection = Depends(get_connection),
+):
+    serializador = SERIALIZADOR_PRESUPUESTO.seleccionar(fields)
+    result = connection.execute(select(*serializador.columnas_sql(presupuestos))).fetchall()
+    return responder(serializador.lista(result), directo=serializador.es_parcial)
+
+@presupuesto_router.get("/lanaapp/presupuesto/estado", response_model=EstadoPresupuestoSchemaOut, tags=["Presupuesto"])
+def obtener_estado_presupuesto(
+    usuario_id: int,
+    anio: int,
+    mes: int = Query(..., ge=1, le=12),
+    connection: Connection = Depends(get_connection),
+):
+    """
+    Gastado contra presupuestado por categoria para un usuario y mes.
+    """
+    return responder(budget_checker.obtener_consumo(connection, usuario_id, anio, mes))
 
 @presupuesto_router.post("/lanaapp/presupuesto", status_code=HTTP_201_CREATED, tags=["Presupuesto"])
-def crear_presupuesto(data: PresupuestoSchema):
-    nuevo_presupuesto = data.model_dump()
-    with engine.connect() as connection:
-        connection.execute(presupuestos.insert().values(nuevo_presupuesto))
-        connection.commit()
+def crear_presupuesto(data: PresupuestoSchema, connection: Connection = Depends(get_connection)):
+    nuevo_presupuesto = _a_columnas(data)
+    connection.execute(presupuestos.insert().values(nuevo_presupuesto))
+    budget_checker.invalidar_consumo(connection, data.usuario_id, data.anio, data.mes)
     return {"mensaje": "Presupuesto creado correctamente"}
 
 @presupuesto_router.put("/lanaapp/presupuesto/{presupuesto_id}", tags=["Presupuesto"])
-def actualizar_presupuesto(presupuesto_id: int, data: PresupuestoSchema):
-    valores = data.model_dump()
-    with engine.connect() as connection:
-        result = connection.execute(
-            presupuestos.update()
-            .where(presupuestos.c.id == presupuesto_id)
-            .values(valores)
-        )
-        connection.commit()
-        if result.rowcount == 0:
-            raise HTTPException(status_code=HTTP_404_NOT_FOUND, detail="Presupuesto no encontrado")
+def actualizar_presupuesto(presupuesto_id: int, data: PresupuestoSchema, connection: Connection = Depends(get_connection)):
+    valores = _a_columnas(data)
+    anterior = connection.execute(
+        select(presupuestos.c.usuario_id).where(presupuestos.c.id == presupuesto_id)
+    ).first()
+    if anterior is None:
+        raise HTTPException(status_code=HTTP_404_NOT_FOUND, detail="Presupuesto no encontrado")
+    connection.execute(
+        presupuestos.update()
+        .where(presupuestos.c.id == presupuesto_id)
+        .values(valores)
+    )
+    # Pudo cambiar de mes o de usuario, se invalida todo lo del usuario anterior y el nuevo
+    budget_checker.invalidar_usuario(connection, anterior.usuario_id, data.usuario_id)
     return {"mensaje": "Presupuesto actualizado correctamente"}
 
 @presupuesto_router.delete("/lanaapp/presupuesto/{presupuesto_id}", tags=["Presupuesto"])
-def eliminar_presupuesto(presupuesto_id: int):
-    with engine.connect() as connection:
-        result = connection.execute(
-            presupuestos.delete().where(presupuestos.c.id == presupuesto_id)
-        )
-        connection.commit()
-        if result.rowcount == 0:
-            raise HTTPException(status_code=HTTP_404_NOT_FOUND, detail="Presupuesto no encontrado")
+def eliminar_presupuesto(presupuesto_id: int, connection: Connection = Depends(get_connection)):
+    existente = connection.execute(
+        select(presupuestos.c.usuario_id, presupuestos.c["año"], presupuestos.c.mes)
+        .where(presupuestos.c.id == presupuesto_id)
+    ).first()
+    if existente is None:
+        raise HTTPException(status_code=HTTP_404_NOT_FOUND, detail="Presupuesto no encontrado")
+    connection.execute(
+        presupuestos.delete().where(presupuestos.c.id == presupuesto_id)
+    )
+    registrar_eliminacion(connection, "presupuestos", presupuesto_id, existente.usuario_id)
+    budget_checker.invalidar_consumo(connection, existente.usuario_id, existente._mapping["año"], existente.mes)
     return {"mensaje": "Presupuesto eliminado correctamente"}
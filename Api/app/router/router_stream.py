@@ -0,0 +1,106 @@
+# app/router/router_stream.py
+# Notificaciones en tiempo real: WebSocket y SSE (para clientes sin WebSocket)
+# en /lanaapp/notificaciones/stream. Los handlers ya son async y no usan la
+# conexion del request, asi que el mismo router sirve en modo sync y async.
+#
+# El token va en el header Authorization o en ?token= (los WebSocket del
+# navegador no pueden mandar headers).
+import asyncio
+import json
+from typing import Optional
+from fastapi import APIRouter, Depends, HTTPException, Request, WebSocket, status
+from fastapi.responses import StreamingResponse
+from fastapi.security import HTTPBearer, HTTPAuthorizationCredentials
+from app.router.router_login import decodificar_token, cargar_usuario_autenticado
+from app.utils.tiempo_real import hub_notificaciones
+
+stream_router = APIRouter()
+bearer_opcional = HTTPBearer(auto_error=False)
+
+# Cada cuanto se manda un comentario en SSE para que los proxies no cierren la conexion
+PING_SSE_SEGUNDOS = 15
+
+
+def _cargar_usuario(token: str):
+    email = decodificar_token(token)
+    return cargar_usuario_autenticado(email) if email is not None else None
+
+
+async def _usuario_del_token(token: Optional[str]):
+    if not token:
+        return None
+    # Se valida en un hilo (revocacion y usuario pueden ir a la base en un miss);
+    # la conexion no se queda abierta durante el stream
+    return await asyncio.to_thread(_cargar_usuario, token)
+
+
+def _token_de_header(autorizacion: Optional[str]) -> Optional[str]:
+    if autorizacion and autorizacion.lower().startswith("bearer "):
+        return autorizacion[7:]
+    return None
+
+
+@stream_router.websocket("/lanaapp/notificaciones/stream")
+async def stream_websocket(websocket: WebSocket, token: Optional[str] = None):
+    usuario = await _usuario_del_token(token or _token_de_header(websocket.headers.get("authorization")))
+    if usuario is None:
+        await websocket.close(code=status.WS_1008_POLICY_VIOLATION)
+        return
+    await websocket.accept()
+    cola = hub_notificaciones.suscribir(usuario.id)
+
+    async def esperar_cierre():
+        # El cliente no manda nada; solo se lee para enterarse cuando se desconecta
+        while (await websocket.receive())["type"] != "websocket.disconnect":
+            pass
+
+    cierre = asyncio.create_task(esperar_cierre())
+    try:
+        while True:
+            siguiente = asyncio.create_task(cola.get())
+            listos, _ = await asyncio.wait({siguiente, cierre}, return_when=asyncio.FIRST_COMPLETED)
+            if cierre in listos:
+                siguiente.cancel()
+                break
+            await websocket.send_json(siguiente.result())
+    except Exception:
+        # Se cayo el envio (conexion cerrada a medio mensaje)
+        pass
+    finally:
+        cierre.cancel()
+        hub_notificaciones.desuscribir(usuario.id, cola)
+
+
+@stream_router.get("/lanaapp/notificaciones/stream", tags=["Notificaciones"])
+async def stream_sse(
+    request: Request,
+    token: Optional[str] = None,
+    credentials: Optional[HTTPAuthorizationCredentials] = Depends(bearer_opcional),
+):
+    usuario = await _usuario_del_token(token or (credentials.credentials if credentials else None))
+    if usuario is None:
+        raise HTTPException(
+            status_code=status.HTTP_401_UNAUTHORIZED,
+            detail="Token inválido",
+            headers={"WWW-Authenticate": "Bearer"},
+        )
+
+    async def eventos():
+        cola = hub_notificaciones.suscribir(usuario.id)
+        try:
+            yield "retry: 3000\n\n"
+            while not await request.is_disconnected():
+                try:
+                    mensaje = await asyncio.wait_for(cola.get(), timeout=PING_SSE_SEGUNDOS)
+                except asyncio.TimeoutError:
+                    yield ": ping\n\n"
+                    continue
+                yield f"id: {mensaje['id']}\nevent: notificacion\ndata: {json.dumps(mensaje, default=str)}\n\n"
+        finally:
+            hub_notificaciones.desuscribir(usuario.id, cola)
+
+    return StreamingResponse(
+        eventos(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
@@ -0,0 +1,106 @@
+# app/router/router_sync.py
+
+import os
+from datetime import timedelta
+from fastapi import APIRouter, Depends
+from sqlalchemy import select, func, or_
+from sqlalchemy.engine import Connection
+from app.database.connection import get_connection
+from app.model.transaccion import transacciones
+from app.router.router_transaccion import COLUMNAS_RESUMEN
+from app.model.presupuestos import presupuestos
+from app.model.pagosProgramados import pagos_programados
+from app.model.categorias import categorias
+from app.model.registrosEliminados import registros_eliminados
+from app.utils.eliminaciones import registrar_eliminacion
+from app.utils import resumen_mensual
+from app.schema.sync_schema import SyncSchema, CambioClienteSchema
+
+sync_router = APIRouter()
+
+# El watermark se regresa con este margen hacia atras. Una escritura que puso su
+# fecha_actualizacion antes de leer now() pero hace commit despues no se ve en
+# este sync; con el margen el siguiente sync la vuelve a pedir. Debe ser mayor
+# que la transaccion de escritura mas larga (el pool espera hasta 30s por conexion).
+SYNC_MARGEN_SEGUNDOS = int(os.getenv("SYNC_MARGEN_SEGUNDOS", "120"))
+
+def aplicar_cambio(connection: Connection, usuario_id: int, cambio: CambioClienteSchema) -> dict:
+    """
+    Aplica un cambio de transaccion hecho offline. Solo se permite tocar
+    transacciones del mismo usuario que sincroniza.
+    """
+    resultado = {"id_cliente": cambio.id_cliente, "operacion": cambio.operacion}
+    valores = None
+    if cambio.datos is not None:
+        valores = cambio.datos.model_dump()
+        valores["usuario_id"] = usuario_id
+        # Ya llego al servidor, deja de estar pendiente
+        valores["pendiente_sincronizacion"] = 0
+
+    if cambio.operacion == "crear":
+        result = connection.execute(transacciones.insert().values(valores))
+        resumen_mensual.registrar_cambio(connection, nueva=valores)
+        return {**resultado, "estado": "ok", "id": result.inserted_primary_key[0]}
+
+    condicion = (transacciones.c.id == cambio.id) & (transacciones.c.usuario_id == usuario_id)
+    anterior = connection.execute(select(*COLUMNAS_RESUMEN).where(condicion)).first()
+    if anterior is None:
+        return {**resultado, "estado": "no_encontrada", "id": cambio.id}
+
+    if cambio.operacion == "actualizar":
+        connection.execute(transacciones.update().where(condicion).values(valores))
+        resumen_mensual.registrar_cambio(connection, anterior=anterior._mapping, nueva=valores)
+    else:
+        connection.execute(transacciones.delete().where(condicion))
+        resumen_mensual.registrar_cambio(connection, anterior=anterior._mapping)
+        registrar_eliminacion(connection, "transacciones", cambio.id, usuario_id)
+    return {**resultado, "estado": "ok", "id": cambio.id}
+
+def _filas(connection: Connection, consulta) -> list:
+    return [dict(row._mapping) for row in connection.execute(consulta)]
+
+@sync_router.post("/lanaapp/sync", tags=["Sincronización"])
+def sincronizar(data: SyncSchema, connection: Connection = Depends(get_connection)):
+    """
+    Sincronizacion incremental para la app offline.
+    1. Aplica los cambios que manda el cliente (transacciones).
+    2. Regresa solo lo que cambio desde el watermark `desde` en transacciones,
+       presupuestos, pagos programados y categorias, mas los ids eliminados.
+    El cliente guarda el `watermark` de la respuesta y lo manda en el siguiente sync.
+    Por el margen de SYNC_MARGEN_SEGUNDOS un registro puede llegar en dos syncs
+    seguidos; el cliente hace upsert por id y los eliminados se aplican por id.
+    """
+    # Se usa la hora de la base de datos para no depender del reloj del servidor ni del celular
+    watermark = connection.execute(select(func.now())).scalar() - timedelta(seconds=SYNC_MARGEN_SEGUNDOS)
+
+    resultados_cambios = [aplicar_cambio(connection, data.usuario_id, cambio) for cambio in data.cambios]
+
+    def cambiadas(tabla, filtro_usuario=True):
+        consulta = select(tabla)
+        if filtro_usuario:
+            consulta = consulta.where(tabla.c.usuario_id == data.usuario_id)
+        # >= porque TIMESTAMP tiene resolucion de segundos; el cliente hace upsert por id
+        if data.desde is not None:
+            consulta = consulta.where(tabla.c.fecha_actualizacion >= data.desde)
+        return _filas(connection, consulta)
+
+    eliminados = []
+    if data.desde is not None:
+        eliminados = _filas(connection, select(
+            registros_eliminados.c.tabla,
+            registros_eliminados.c.registro_id,
+            registros_eliminados.c.fecha_eliminacion,
+        ).where(
+            or_(registros_eliminados.c.usuario_id == data.usuario_id, registros_eliminados.c.usuario_id.is_(None)),
+            registros_eliminados.c.fecha_eliminacion >= data.desde,
+        ))
+
+    return {
+        "watermark": watermark,
+        "transacciones": cambiadas(transacciones),
+        "presupuestos": cambiadas(presupuestos),
+        "pagos_programados": cambiadas(pagos_programados),
+        "categorias": cambiadas(categorias, filtro_usuario=False),
+        "eliminados": eliminados,
+        "resultados_cambios": resultados_cambios,
+    }
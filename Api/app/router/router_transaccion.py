@@ -1,64 +1,322 @@
 # app/router/router_transaccion.py
 
-from fastapi import APIRouter, HTTPException, Response
-from starlette.status import HTTP_201_CREATED, HTTP_404_NOT_FOUND
-from typing import List
-from app.config.db import engine
+import base64
+import csv
+import io
+import json
+import zlib
+from datetime import date, datetime
+from decimal import Decimal
+from fastapi import APIRouter, HTTPException, Response, Depends, Query, Body, Header
+from fastapi.responses import StreamingResponse, JSONResponse
+from pydantic import TypeAdapter, ValidationError
+from starlette.status import HTTP_201_CREATED, HTTP_400_BAD_REQUEST, HTTP_404_NOT_FOUND, HTTP_422_UNPROCESSABLE_ENTITY
+from typing import Any, List, Optional
+from sqlalchemy import and_, or_, select
+from sqlalchemy.engine import Connection
+from app.database.connection import get_connection, abrir_conexion
 from app.model.transaccion import transacciones
-from app.model.categorias import categorias
-from app.schema.transaccion_schema import TransaccionSchema, TransaccionSchemaOut
+from app.model.resumenMensual import resumen_mensual as resumen_mensual_tabla
+from app.utils.eliminaciones import registrar_eliminacion
+from app.utils import resumen_mensual, catalogo_categorias
+from app.utils.respuestas import SerializadorFilas, responder
+from app.schema.transaccion_schema import TransaccionSchema, TransaccionSchemaOut, TransaccionPaginaOut, ResumenMensualSchemaOut
 
 transaccion_router = APIRouter()
 
-@transaccion_router.get("/lanaapp/transacciones", tags=["Transacciones"])
-def get_transacciones():
-    with engine.connect() as connection:
-        result = connection.execute(transacciones.select()).fetchall()
-        return [dict(row._mapping) for row in result]
+SERIALIZADOR_TRANSACCION = SerializadorFilas(TransaccionSchemaOut)
+SERIALIZADOR_RESUMEN = SerializadorFilas(ResumenMensualSchemaOut, columnas={"anio": "año"})
+
+LIMITE_PAGINA_MAXIMO = 200
+
+# Columnas que necesita resumen_mensual para restar una transaccion que cambia o se borra
+COLUMNAS_RESUMEN = (
+    transacciones.c.usuario_id,
+    transacciones.c.categoria_id,
+    transacciones.c.fecha_transaccion,
+    transacciones.c.monto,
+)
+
+# El cursor es la ultima (fecha_transaccion, id) de la pagina anterior codificada en base64
+def codificar_cursor(fecha_transaccion: date, transaccion_id: int) -> str:
+    crudo = f"{fecha_transaccion.isoformat()}|{transaccion_id}"
+    return base64.urlsafe_b64encode(crudo.encode()).decode()
+
+def decodificar_cursor(cursor: str):
+    try:
+        fecha, transaccion_id = base64.urlsafe_b64decode(cursor.encode()).decode().split("|")
+        return date.fromisoformat(fecha), int(transaccion_id)
+    except ValueError:
+        raise HTTPException(status_code=HTTP_400_BAD_REQUEST, detail="Cursor inválido")
+
+@transaccion_router.get("/lanaapp/transacciones", response_model=TransaccionPaginaOut, tags=["Transacciones"])
+def get_transacciones(
+    usuario_id: int,
+    cursor: Optional[str] = None,
+    limit: int = Query(50, ge=1, le=LIMITE_PAGINA_MAXIMO),
+    fecha_desde: Optional[date] = None,
+    fecha_hasta: Optional[date] = None,
+    categoria_id: Optional[int] = None,
+    monto_min: Optional[float] = None,
+    monto_max: Optional[float] = None,
+    fields: Optional[str] = Query(None, description="Campos a incluir separados por coma, p. ej. id,monto"),
+    connection: Connection = Depends(get_connection),
+):
+    """
+    Lista las transacciones de un usuario de la mas reciente a la mas antigua,
+    paginando por cursor sobre (fecha_transaccion, id). A diferencia de OFFSET,
+    cada pagina es un rango del indice ix_transacciones_usuario_fecha_id, asi que
+    el tiempo de respuesta no crece con el historial del usuario.
+    Con fields= solo se leen y regresan esas columnas.
+    """
+    serializador = SERIALIZADOR_TRANSACCION.seleccionar(fields)
+    condiciones = [transacciones.c.usuario_id == usuario_id]
+    if fecha_desde is not None:
+        condiciones.append(transacciones.c.fecha_transaccion >= fecha_desde)
+    if fecha_hasta is not None:
+        condiciones.append(transacciones.c.fecha_transaccion <= fecha_hasta)
+    if categoria_id is not None:
+        condiciones.append(transacciones.c.categoria_id == categoria_id)
+    if monto_min is not None:
+        condiciones.append(transacciones.c.monto >= monto_min)
+    if monto_max is not None:
+        condiciones.append(transacciones.c.monto <= monto_max)
+    if cursor is not None:
+        ultima_fecha, ultimo_id = decodificar_cursor(cursor)
+        condiciones.append(or_(
+            transacciones.c.fecha_transaccion < ultima_fecha,
+            and_(transacciones.c.fecha_transaccion == ultima_fecha, transacciones.c.id < ultimo_id),
+        ))
+
+    # Se pide un registro de mas para saber si existe una pagina siguiente
+    result = connection.execute(
+        # Las columnas del cursor se leen aunque no se pidan
+        select(*serializador.columnas_sql(transacciones, "fecha_transaccion", "id"))
+        .where(*condiciones)
+        .order_by(transacciones.c.fecha_transaccion.desc(), transacciones.c.id.desc())
+        .limit(limit + 1)
+    ).fetchall()
+
+    items = serializador.lista(result[:limit])
+    siguiente_cursor = None
+    if len(result) > limit:
+        ultimo = result[limit - 1]
+        siguiente_cursor = codificar_cursor(ultimo.fecha_transaccion, ultimo.id)
+    return responder({"items": items, "siguiente_cursor": siguiente_cursor}, directo=serializador.es_parcial)
+
+@transaccion_router.get("/lanaapp/transacciones/resumen", response_model=List[ResumenMensualSchemaOut], tags=["Transacciones"])
+def get_resumen_mensual(
+    usuario_id: int,
+    anio: int,
+    mes: Optional[int] = Query(None, ge=1, le=12),
+    connection: Connection = Depends(get_connection),
+):
+    """
+    Totales por mes y categoria leidos de resumen_mensual (sin recorrer transacciones).
+    Sin `mes` regresa todo el año.
+    """
+    consulta = resumen_mensual_tabla.select().where(
+        resumen_mensual_tabla.c.usuario_id == usuario_id,
+        resumen_mensual_tabla.c["año"] == anio,
+        resumen_mensual_tabla.c.cantidad > 0,
+    )
+    if mes is not None:
+        consulta = consulta.where(resumen_mensual_tabla.c.mes == mes)
+    result = connection.execute(
+        consulta.order_by(resumen_mensual_tabla.c.mes, resumen_mensual_tabla.c.categoria_id)
+    ).fetchall()
+    return responder(SERIALIZADOR_RESUMEN.lista(result))
+
+# Exportacion: se leen las filas por lotes con un cursor del lado del servidor
+# (stream_results) y se escriben al response conforme llegan, asi la memoria
+# del worker no depende del tamaño del historial
+TAMANO_LOTE_EXPORTACION = 1000
+FORMATOS_EXPORTACION = {
+    "ndjson": "application/x-ndjson",
+    "csv": "text/csv",
+}
+
+def _json_default(valor):
+    if isinstance(valor, Decimal):
+        return float(valor)
+    if isinstance(valor, (date, datetime)):
+        return valor.isoformat()
+    raise TypeError(f"Tipo no serializable: {type(valor).__name__}")
+
+def _lotes_exportacion(usuario_id: int, fecha_desde: Optional[date], fecha_hasta: Optional[date]):
+    # La conexion vive lo mismo que el stream, por eso no se usa get_connection
+    # (la dependencia se cierra antes de que termine de enviarse el response)
+    connection = abrir_conexion()
+    try:
+        consulta = transacciones.select().where(transacciones.c.usuario_id == usuario_id)
+        if fecha_desde is not None:
+            consulta = consulta.where(transacciones.c.fecha_transaccion >= fecha_desde)
+        if fecha_hasta is not None:
+            consulta = consulta.where(transacciones.c.fecha_transaccion <= fecha_hasta)
+        result = connection.execution_options(
+            stream_results=True, yield_per=TAMANO_LOTE_EXPORTACION
+        ).execute(consulta.order_by(transacciones.c.fecha_transaccion, transacciones.c.id))
+        for lote in result.partitions():
+            yield lote
+    finally:
+        connection.close()
+
+def _generar_ndjson(lotes):
+    for lote in lotes:
+        yield "".join(
+            json.dumps(dict(row._mapping), default=_json_default, ensure_ascii=False) + "\n" for row in lote
+        ).encode()
+
+def _generar_csv(lotes):
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    writer.writerow([columna.name for columna in transacciones.c])
+    yield buffer.getvalue().encode()
+    for lote in lotes:
+        buffer.seek(0)
+        buffer.truncate(0)
+        for row in lote:
+            writer.writerow([
+                json.dumps(valor, default=_json_default, ensure_ascii=False) if isinstance(valor, (dict, list)) else valor
+                for valor in row
+            ])
+        yield buffer.getvalue().encode()
+
+def _comprimir_gzip(trozos):
+    # wbits=31 genera formato gzip (con cabecera) en lugar de zlib crudo
+    compresor = zlib.compressobj(6, zlib.DEFLATED, 31)
+    for trozo in trozos:
+        datos = compresor.compress(trozo)
+        if datos:
+            yield datos
+    yield compresor.flush()
+
+# Se declara antes de /lanaapp/transactions/{transaction_id} para que "export" no se tome como id
+@transaccion_router.get("/lanaapp/transactions/export", tags=["Transacciones"])
+def export_transacciones(
+    usuario_id: int,
+    formato: str = Query("ndjson", pattern="^(ndjson|csv)$"),
+    gzip: bool = False,
+    fecha_desde: Optional[date] = None,
+    fecha_hasta: Optional[date] = None,
+):
+    """
+    Exporta todas las transacciones de un usuario en NDJSON o CSV sin cargarlas
+    completas en memoria. Con gzip=true el archivo se comprime mientras se envia.
+    """
+    lotes = _lotes_exportacion(usuario_id, fecha_desde, fecha_hasta)
+    contenido = _generar_ndjson(lotes) if formato == "ndjson" else _generar_csv(lotes)
+    nombre_archivo = f"transacciones_{usuario_id}.{formato}"
+    media_type = FORMATOS_EXPORTACION[formato]
+    if gzip:
+        contenido = _comprimir_gzip(contenido)
+        nombre_archivo += ".gz"
+        media_type = "application/gzip"
+    return StreamingResponse(
+        contenido,
+        media_type=media_type,
+        headers={"Content-Disposition": f'attachment; filename="{nombre_archivo}"'},
+    )
 
 @transaccion_router.post("/lanaapp/transactions/", status_code=HTTP_201_CREATED, tags=["Transacciones"])
-def create_transaccion(data: TransaccionSchema):
+def create_transaccion(data: TransaccionSchema, connection: Connection = Depends(get_connection)):
     nueva_transaccion = data.model_dump()
-    with engine.connect() as connection:
-        connection.execute(transacciones.insert().values(nueva_transaccion))
-        connection.commit()
+    connection.execute(transacciones.insert().values(nueva_transaccion))
+    resumen_mensual.registrar_cambio(connection, nueva=nueva_transaccion)
     return {"mensaje": "Transacción creada correctamente"}
 
+# Carga masiva: pensado para la cola offline de la app (pendiente_sincronizacion)
+MAXIMO_TRANSACCIONES_BULK = 10000
+TAMANO_LOTE_INSERT = 1000
+_validador_transacciones = TypeAdapter(List[TransaccionSchema])
+
+def _validar_lote(items: List[Any]):
+    """
+    Valida toda la lista de una vez con el TypeAdapter. Si hay errores se
+    agrupan por indice y se vuelven a validar solo los elementos correctos.
+    Regresa (indices_validos, transacciones_validas, errores_por_indice).
+    """
+    try:
+        return list(range(len(items))), _validador_transacciones.validate_python(items), {}
+    except ValidationError as e:
+        errores = {}
+        for error in e.errors(include_url=False):
+            indice = error["loc"][0]
+            errores.setdefault(indice, []).append({
+                "campo": ".".join(str(parte) for parte in error["loc"][1:]),
+                "mensaje": error["msg"],
+            })
+        indices_validos = [i for i in range(len(items)) if i not in errores]
+        validas = _validador_transacciones.validate_python([items[i] for i in indices_validos])
+        return indices_validos, validas, errores
+
+@transaccion_router.post("/lanaapp/transactions/bulk", status_code=HTTP_201_CREATED, tags=["Transacciones"])
+def create_transacciones_bulk(items: List[Any] = Body(...), connection: Connection = Depends(get_connection)):
+    """
+    Inserta muchas transacciones en una sola transaccion de base de datos usando
+    executemany por lotes (el driver los manda como INSERT de varias filas).
+    Los elementos invalidos se reportan y no impiden insertar los demas.
+    """
+    if len(items) > MAXIMO_TRANSACCIONES_BULK:
+        raise HTTPException(
+            status_code=HTTP_400_BAD_REQUEST,
+            detail=f"Máximo {MAXIMO_TRANSACCIONES_BULK} transacciones por petición",
+        )
+
+    indices_validos, validas, errores = _validar_lote(items)
+    filas = [transaccion.model_dump() for transaccion in validas]
+    for inicio in range(0, len(filas), TAMANO_LOTE_INSERT):
+        connection.execute(transacciones.insert(), filas[inicio:inicio + TAMANO_LOTE_INSERT])
+    resumen_mensual.registrar_lote(connection, filas)
+
+    resultados = [{"indice": i, "estado": "creada"} for i in indices_validos]
+    resultados += [{"indice": i, "estado": "error", "errores": errores[i]} for i in errores]
+    resultados.sort(key=lambda resultado: resultado["indice"])
+    respuesta = {"creadas": len(filas), "fallidas": len(errores), "resultados": resultados}
+    if not filas and errores:
+        return JSONResponse(status_code=HTTP_422_UNPROCESSABLE_ENTITY, content=respuesta)
+    return respuesta
+
 @transaccion_router.get("/lanaapp/transactions/{transaction_id}", response_model=TransaccionSchemaOut, tags=["Transacciones"])
-def get_transaccion(transaction_id: int):
-    with engine.connect() as connection:
-        result = connection.execute(
-            transacciones.select().where(transacciones.c.id == transaction_id)
-        ).fetchall()
-        return [dict(row._mapping) for row in result]
+def get_transaccion(transaction_id: int, connection: Connection = Depends(get_connection)):
+    result = connection.execute(
+        transacciones.select().where(transacciones.c.id == transaction_id)
+    ).first()
+    if result is None:
+        raise HTTPException(status_code=HTTP_404_NOT_FOUND, detail="Transacción no encontrada")
+    return responder(SERIALIZADOR_TRANSACCION.fila(result))
 
 @transaccion_router.put("/lanaapp/transactions/{transaction_id}", tags=["Transacciones"])
-def update_transaccion(transaction_id: int, data: TransaccionSchema):
+def update_transaccion(transaction_id: int, data: TransaccionSchema, connection: Connection = Depends(get_connection)):
     valores = data.model_dump()
-    with engine.connect() as connection:
-        result = connection.execute(
-            transacciones.update()
-            .where(transacciones.c.id == transaction_id)
-            .values(valores)
-        )
-        connection.commit()
-        if result.rowcount == 0:
-            raise HTTPException(status_code=HTTP_404_NOT_FOUND, detail="Transacción no encontrada")
+    anterior = connection.execute(
+        select(*COLUMNAS_RESUMEN).where(transacciones.c.id == transaction_id)
+    ).first()
+    if anterior is None:
+        raise HTTPException(status_code=HTTP_404_NOT_FOUND, detail="Transacción no encontrada")
+    connection.execute(
+        transacciones.update()
+        .where(transacciones.c.id == transaction_id)
+        .values(valores)
+    )
+    resumen_mensual.registrar_cambio(connection, anterior=anterior._mapping, nueva=valores)
     return {"mensaje": "Transacción actualizada correctamente"}
 
 @transaccion_router.delete("/lanaapp/transactions/{transaction_id}", tags=["Transacciones"])
-def delete_transaccion(transaction_id: int):
-    with engine.connect() as connection:
-        result = connection.execute(
-            transacciones.delete().where(transacciones.c.id == transaction_id)
-        )
-        connection.commit()
-        if result.rowcount == 0:
-            raise HTTPException(status_code=HTTP_404_NOT_FOUND, detail="Transacción no encontrada")
+def delete_transaccion(transaction_id: int, connection: Connection = Depends(get_connection)):
+    existente = connection.execute(
+        select(*COLUMNAS_RESUMEN).where(transacciones.c.id == transaction_id)
+    ).first()
+    if existente is None:
+        raise HTTPException(status_code=HTTP_404_NOT_FOUND, detail="Transacción no encontrada")
+    connection.execute(
+        transacciones.delete().where(transacciones.c.id == transaction_id)
+    )
+    resumen_mensual.registrar_cambio(connection, anterior=existente._mapping)
+    registrar_eliminacion(connection, "transacciones", transaction_id, existente.usuario_id)
     return {"mensaje": "Transacción eliminada correctamente"}
 
+# Mismo catalogo que /lanaapp/categorias (cache + ETag)
 @transaccion_router.get("/lanaapp/transactions/categories/list", tags=["Transacciones"])
-def get_categories():
-    with engine.connect() as connection:
-        result = connection.execute(categorias.select()).fetchall()
-        return result
+def get_categories(if_none_match: Optional[str] = Header(None)):
+    return catalogo_categorias.responder(catalogo_categorias.obtener_catalogo(), if_none_match)
@@ -1,80 +1,96 @@
-from fastapi import APIRouter, HTTPException, Response
+from fastapi import APIRouter, HTTPException, Response, Depends
 from starlette.status import HTTP_201_CREATED, HTTP_404_NOT_FOUND
 from typing import List
 from app.schema.user_schema import UserSchema, UserSchemaOut
-from app.config.db import engine
+from sqlalchemy import select
+from sqlalchemy.engine import Connection
+from starlette.concurrency import run_in_threadpool
+from app.database.connection import get_connection, ejecutar_en_transaccion
 from app.model.users import users
-from werkzeug.security import generate_password_hash, check_password_hash
+from app.utils import cache_usuarios, passwords
+from app.utils.respuestas import SerializadorFilas, responder
 
 user_router = APIRouter()
 
+# Solo los campos de UserSchemaOut (nunca password_hash)
+SERIALIZADOR_USUARIO = SerializadorFilas(UserSchemaOut)
+
+# async def: el hash se espera en el pool de app/utils/passwords.py sin ocupar un hilo
+# del threadpool ni una conexion, y despues la escritura va en su propia transaccion
 @user_router.post("/lanaapp/user", status_code=HTTP_201_CREATED, tags=["Usuarios"])
-def create_user(data_user: UserSchema):
+async def create_user(data_user: UserSchema):
+    password_hash = await passwords.hashear_async(data_user.password)
+    return await run_in_threadpool(ejecutar_en_transaccion, insertar_usuario, data_user, password_hash)
+
+
+# Se separa del endpoint para que el modo async calcule el hash sin bloquear el event loop
+def insertar_usuario(data_user: UserSchema, password_hash: str, connection: Connection):
     print("Datos recibidos", data_user.model_dump())
     # nuestros usuarios creados se van a convertir en un diccionario para que los pueda leer data_user
     # un diccionario tiene un clave, valor
     new_user = data_user.model_dump()
-    # en el generate password hash se reciben dos parametros
-    new_user["password_hash"] = generate_password_hash(data_user.password, "pbkdf2:sha256:30", 30)
+    new_user["password_hash"] = password_hash
 
     del new_user["password"]
     try: 
-        with engine.connect() as connection:
-            with connection.begin():
-                connection.execute(users.insert().values(new_user))
-                print("Se agrego el usuario correctamente")
+        connection.execute(users.insert().values(new_user))
+        print("Se agrego el usuario correctamente")
     except Exception as e:
+        connection.rollback()
         print("No se agrego el usuario correctamente")
     print("Usuarios insertados con datos", new_user)
     return Response(status_code=HTTP_201_CREATED)
 
 
 @user_router.get("/lanaapp/user/{user_id}", response_model = UserSchemaOut, tags=["Usuarios"])
-def obtener_solo_un_usuario(user_id: int):
+def obtener_solo_un_usuario(user_id: int, connection: Connection = Depends(get_connection)):
     try: 
-        with engine.connect() as connection:
         # c en la parte de where se refiere a la columna
-            result = connection.execute(users.select().where(users.c.id == user_id)).first()
-            
-            if result is None:
-                raise HTTPException(status_code=404, detail="Usuario no encontrado")
-            user_data = dict(result._mapping)
-            return user_data
+        result = connection.execute(users.select().where(users.c.id == user_id)).first()
+        
+        if result is None:
+            raise HTTPException(status_code=404, detail="Usuario no encontrado")
+        user_data = dict(result._mapping)
+        return user_data
             
     except Exception as e:
         print ("No se encontro el usuario", e)
         raise HTTPException(status_code=500, detail=str(e))
     
 @user_router.get("/lanaapp/user", response_model=List[UserSchemaOut], tags=["Usuarios"])
-def obtener_usuarios():
-    with engine.connect() as connection:
-        result = connection.execute(users.select()).fetchall()
-        return result
+def obtener_usuarios(connection: Connection = Depends(get_connection)):
+    result = connection.execute(users.select()).fetchall()
+    return responder(SERIALIZADOR_USUARIO.lista(result))
 
 @user_router.put("/lanaapp/user/{user_id}", tags=["Usuarios"])
-def update_user(user_id: int, data: UserSchema):
+async def update_user(user_id: int, data: UserSchema):
+    password_hash = await passwords.hashear_async(data.password)
+    return await run_in_threadpool(ejecutar_en_transaccion, actualizar_usuario, user_id, data, password_hash)
+
+
+def actualizar_usuario(user_id: int, data: UserSchema, password_hash: str, connection: Connection):
     updated_data = data.model_dump()
-    updated_data["password_hash"] = generate_password_hash(data.password, "pbkdf2:sha256:30", 30)
+    updated_data["password_hash"] = password_hash
     del updated_data["password"]
     
-    with engine.connect() as connection:
-        with connection.begin():
-            result = connection.execute(
-                users.update()
-                .where(users.c.id == user_id)
-                .values(updated_data)
-            )
-            if result.rowcount == 0:
-                raise HTTPException(status_code=HTTP_404_NOT_FOUND, detail="Usuario no encontrado")
+    anterior = connection.execute(select(users.c.email).where(users.c.id == user_id)).first()
+    if anterior is None:
+        raise HTTPException(status_code=HTTP_404_NOT_FOUND, detail="Usuario no encontrado")
+    connection.execute(
+        users.update()
+        .where(users.c.id == user_id)
+        .values(updated_data)
+    )
+    cache_usuarios.invalidar_usuario(connection, user_id, anterior.email, data.email)
     return {"mensaje": "Usuario actualizado correctamente"}
 
 
 @user_router.delete("/lanaapp/user/{user_id}", tags=["Usuarios"])
-def delete_user(user_id: int):
-    with engine.connect() as connection:
-        with connection.begin():
-            result = connection.execute(users.delete().where(users.c.id == user_id))
-            if result.rowcount == 0:
-                raise HTTPException(status_code=HTTP_404_NOT_FOUND, detail="Usuario no encontrado")
+def delete_user(user_id: int, connection: Connection = Depends(get_connection)):
+    anterior = connection.execute(select(users.c.email).where(users.c.id == user_id)).first()
+    if anterior is None:
+        raise HTTPException(status_code=HTTP_404_NOT_FOUND, detail="Usuario no encontrado")
+    connection.execute(users.delete().where(users.c.id == user_id))
+    cache_usuarios.invalidar_usuario(connection, user_id, anterior.email)
     return {"mensaje": "Usuario eliminado correctamente"}
 
@@ -1,17 +1,20 @@
-from pydantic import BaseModel
-from typing import Optional
+from pydantic import BaseModel, Field
+from typing import Optional, Literal
 from datetime import date, datetime
 
 class PagoProgramadoSchema(BaseModel):
     usuario_id: int
     categoria_id: int
-    nombre: str
-    monto: float
-    fecha_inicio: date
-    frecuencia: str  # Ej: 'semanal', 'mensual', etc.
-    proximo_pago: date
     descripcion: Optional[str] = None
-    activo: Optional[bool] = True
+    monto: float
+    # mensual/anual: dia del mes (1-31); semanal: dia de la semana (1 = lunes ... 7 = domingo)
+    dia_vencimiento: int = Field(..., ge=1, le=31)
+    fecha_fin: Optional[date] = None
+    frecuencia: Literal["diario", "semanal", "mensual", "anual"]
+    # Si no se manda se calcula con frecuencia y dia_vencimiento
+    proxima_fecha_vencimiento: Optional[date] = None
+    registrar_automaticamente: Optional[int] = 0
+    activo: Optional[int] = 1
 
 class PagoProgramadoSchemaOut(PagoProgramadoSchema):
     id: int
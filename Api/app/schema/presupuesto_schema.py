@@ -1,5 +1,5 @@
 from pydantic import BaseModel
-from typing import Optional
+from typing import Optional, List
 from datetime import datetime
 
 class PresupuestoSchema(BaseModel):
@@ -13,3 +13,22 @@ class PresupuestoSchemaOut(PresupuestoSchema):
     id: int
     fecha_creacion: datetime
     fecha_actualizacion: datetime
+
+
+class ConsumoCategoriaSchemaOut(BaseModel):
+    categoria_id: int
+    presupuesto_id: int
+    presupuestado: float
+    gastado: float
+    disponible: float
+    porcentaje: float
+    excedido: bool
+    cantidad_transacciones: int
+
+class EstadoPresupuestoSchemaOut(BaseModel):
+    usuario_id: int
+    anio: int
+    mes: int
+    total_presupuestado: float
+    total_gastado: float
+    categorias: List[ConsumoCategoriaSchemaOut]
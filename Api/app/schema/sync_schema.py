@@ -0,0 +1,27 @@
+from pydantic import BaseModel, model_validator
+from typing import Optional, List, Literal
+from datetime import datetime
+from app.schema.transaccion_schema import TransaccionSchema
+
+# Un cambio hecho en el celular mientras estaba sin conexion
+class CambioClienteSchema(BaseModel):
+    operacion: Literal["crear", "actualizar", "eliminar"]
+    # id del servidor, obligatorio para actualizar y eliminar
+    id: Optional[int] = None
+    # id temporal que usa la app para relacionar la respuesta con su registro local
+    id_cliente: Optional[str] = None
+    datos: Optional[TransaccionSchema] = None
+
+    @model_validator(mode="after")
+    def validar_campos(self):
+        if self.operacion in ("actualizar", "eliminar") and self.id is None:
+            raise ValueError("id es obligatorio para actualizar o eliminar")
+        if self.operacion in ("crear", "actualizar") and self.datos is None:
+            raise ValueError("datos es obligatorio para crear o actualizar")
+        return self
+
+class SyncSchema(BaseModel):
+    usuario_id: int
+    # watermark que regreso el ultimo sync; None para la primera descarga completa
+    desde: Optional[datetime] = None
+    cambios: List[CambioClienteSchema] = []
@@ -1,5 +1,5 @@
 from pydantic import BaseModel
-from typing import Optional
+from typing import Optional, List
 from datetime import datetime, date
 
 class TransaccionSchema(BaseModel):
@@ -15,3 +15,17 @@ class TransaccionSchemaOut(TransaccionSchema):
     id: int
     fecha_creacion: datetime
     fecha_actualizacion: datetime
+
+
+class TransaccionPaginaOut(BaseModel):
+    items: List[TransaccionSchemaOut]
+    # None cuando ya no hay mas paginas
+    siguiente_cursor: Optional[str] = None
+
+
+class ResumenMensualSchemaOut(BaseModel):
+    anio: int
+    mes: int
+    categoria_id: int
+    total: float
+    cantidad: int
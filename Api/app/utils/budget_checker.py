@@ -0,0 +1,197 @@
+# app/utils/budget_checker.py
+# Motor de consumo de presupuestos: cuanto lleva gastado un usuario en cada
+# categoria del mes contra lo que tiene presupuestado.
+#
+# El gasto sale de resumen_mensual (ya agrupado por mes y categoria), asi que
+# evaluar un mes es una sola consulta de O(categorias) sin importar cuantas
+# transacciones tenga. El resultado se guarda en cache por (usuario_id, año, mes)
+# y se invalida despues del commit cuando cambian transacciones
+# (resumen_mensual.aplicar_deltas) o presupuestos del usuario. El TTL cubre lo
+# que no invalida este worker (escrituras hechas en otros workers).
+#
+# Tambien detecta al momento de escribir cuando una categoria pasa su limite
+# (verificar_excesos) y deja la notificacion en la cola, sin barridos nocturnos.
+from decimal import Decimal
+from typing import Optional
+from sqlalchemy import select, func, and_
+from sqlalchemy.engine import Connection
+from app.database.connection import al_confirmar
+from app.model.presupuestos import presupuestos
+from app.model.resumenMensual import resumen_mensual
+from app.model.users import users
+from app.model.prefereciasNotificacionesUsuarios import preferencias_notificacion
+from app.utils.cache import CacheTTL
+from app.utils.notifier import encolar_notificaciones
+
+cache_consumo = CacheTTL("consumo_presupuesto", max_elementos=20000, ttl_segundos=30)
+
+
+def calcular_consumo(connection: Connection, usuario_id: int, anio: int, mes: int) -> dict:
+    # Si hay mas de un presupuesto para la misma categoria y mes se suman
+    presupuestado = (
+        select(
+            presupuestos.c.categoria_id,
+            func.min(presupuestos.c.id).label("presupuesto_id"),
+            func.sum(presupuestos.c.monto_presupuestado).label("presupuestado"),
+        )
+        .where(
+            presupuestos.c.usuario_id == usuario_id,
+            presupuestos.c["año"] == anio,
+            presupuestos.c.mes == mes,
+        )
+        .group_by(presupuestos.c.categoria_id)
+        .subquery()
+    )
+    consulta = (
+        select(
+            presupuestado.c.categoria_id,
+            presupuestado.c.presupuesto_id,
+            presupuestado.c.presupuestado,
+            func.coalesce(resumen_mensual.c.total, 0).label("gastado"),
+            func.coalesce(resumen_mensual.c.cantidad, 0).label("cantidad"),
+        )
+        .select_from(
+            presupuestado.outerjoin(resumen_mensual, and_(
+                resumen_mensual.c.usuario_id == usuario_id,
+                resumen_mensual.c["año"] == anio,
+                resumen_mensual.c.mes == mes,
+                resumen_mensual.c.categoria_id == presupuestado.c.categoria_id,
+            ))
+        )
+        .order_by(presupuestado.c.categoria_id)
+    )
+
+    categorias = []
+    total_presupuestado = Decimal("0")
+    total_gastado = Decimal("0")
+    for row in connection.execute(consulta):
+        limite = Decimal(row.presupuestado or 0)
+        gastado = Decimal(row.gastado or 0)
+        total_presupuestado += limite
+        total_gastado += gastado
+        categorias.append({
+            "categoria_id": row.categoria_id,
+            "presupuesto_id": row.presupuesto_id,
+            "presupuestado": limite,
+            "gastado": gastado,
+            "disponible": limite - gastado,
+            "porcentaje": round(float(gastado / limite) * 100, 2) if limite else 0.0,
+            "excedido": gastado > limite,
+            "cantidad_transacciones": row.cantidad,
+        })
+
+    return {
+        "usuario_id": usuario_id,
+        "anio": anio,
+        "mes": mes,
+        "total_presupuestado": total_presupuestado,
+        "total_gastado": total_gastado,
+        "categorias": categorias,
+    }
+
+
+def obtener_consumo(connection: Connection, usuario_id: int, anio: int, mes: int) -> dict:
+    return cache_consumo.obtener_o_calcular(
+        (usuario_id, anio, mes),
+        lambda: calcular_consumo(connection, usuario_id, anio, mes),
+    )
+
+
+def invalidar_consumo(connection: Connection, usuario_id: int, anio: int, mes: int):
+    # Despues del commit: antes otro request podria volver a llenar el cache con datos viejos
+    al_confirmar(connection, lambda: cache_consumo.invalidar((usuario_id, anio, mes)))
+
+
+def invalidar_usuario(connection: Connection, *usuario_ids: int):
+    ids = set(usuario_ids)
+    al_confirmar(connection, lambda: cache_consumo.invalidar_si(lambda llave: llave[0] in ids))
+
+
+# Canales que se revisan en preferencias_notificacion y su valor por defecto
+# (el mismo default que tiene la tabla cuando el usuario no ha guardado preferencias)
+CANALES_EXCESO = {
+    "email": ("notificar_exceso_presupuesto_email", 1),
+    "sms": ("notificar_exceso_presupuesto_sms", 0),
+    "push": ("notificar_exceso_presupuesto_push", 1),
+}
+
+
+def _notificar_exceso(connection: Connection, usuario_id: int, anio: int, mes: int, categoria: dict, gastado: Decimal):
+    columnas_preferencia = [preferencias_notificacion.c[columna] for columna, _ in CANALES_EXCESO.values()]
+    usuario = connection.execute(
+        select(users.c.email, users.c.telefono, *columnas_preferencia)
+        .select_from(users.outerjoin(preferencias_notificacion, preferencias_notificacion.c.usuario_id == users.c.id))
+        .where(users.c.id == usuario_id)
+    ).first()
+    if usuario is None:
+        return
+    datos = usuario._mapping
+    destinos = {"email": datos["email"], "sms": datos["telefono"], "push": f"usuario:{usuario_id}"}
+
+    filas = []
+    for canal, (columna, default) in CANALES_EXCESO.items():
+        activo = datos[columna] if datos[columna] is not None else default
+        if not activo or not destinos[canal]:
+            continue
+        filas.append({
+            "usuario_id": usuario_id,
+            "tipo_notificacion_canal": canal,
+            "destino": destinos[canal],
+            "asunto": "Presupuesto excedido",
+            "mensaje": (
+                f"Llevas {gastado:.2f} gastado en la categoría {categoria['categoria_id']} "
+                f"durante {mes:02d}/{anio}, tu presupuesto es de {categoria['presupuestado']:.2f}"
+            ),
+            "notificable_type": "presupuesto",
+            "notificable_id": categoria["presupuesto_id"],
+        })
+    encolar_notificaciones(connection, filas)
+
+
+def _presupuesto_categoria(connection: Connection, usuario_id: int, anio: int, mes: int, categoria_id: int) -> Optional[dict]:
+    """
+    Limite de una sola categoria (ix_presupuestos_usuario_mes_categoria), sin
+    pasar por el consumo de todo el mes. None si la categoria no tiene presupuesto.
+    """
+    row = connection.execute(
+        select(
+            func.min(presupuestos.c.id).label("presupuesto_id"),
+            func.sum(presupuestos.c.monto_presupuestado).label("presupuestado"),
+        ).where(
+            presupuestos.c.usuario_id == usuario_id,
+            presupuestos.c["año"] == anio,
+            presupuestos.c.mes == mes,
+            presupuestos.c.categoria_id == categoria_id,
+        )
+    ).first()
+    if row is None or row.presupuestado is None:
+        return None
+    return {"categoria_id": categoria_id, "presupuesto_id": row.presupuesto_id, "presupuestado": Decimal(row.presupuestado)}
+
+
+def verificar_excesos(connection: Connection, deltas: dict):
+    """
+    Se llama despues de aplicar los deltas de resumen_mensual.
+    deltas: {(usuario_id, año, mes, categoria_id): (total, cantidad)}.
+    Por cada categoria que subio se lee solo su presupuesto (por indice) y su
+    fila de resumen_mensual (por llave primaria); no se usa el consumo en cache
+    porque las escrituras lo invalidan y casi siempre estaria vacio.
+    Solo se notifica cuando el total cruza el limite (antes <= limite < despues).
+    """
+    for (usuario_id, anio, mes, categoria_id), (delta, _) in deltas.items():
+        if delta <= 0:
+            continue
+        categoria = _presupuesto_categoria(connection, usuario_id, anio, mes, categoria_id)
+        if categoria is None:
+            continue
+        despues = connection.execute(
+            select(resumen_mensual.c.total).where(
+                resumen_mensual.c.usuario_id == usuario_id,
+                resumen_mensual.c["año"] == anio,
+                resumen_mensual.c.mes == mes,
+                resumen_mensual.c.categoria_id == categoria_id,
+            )
+        ).scalar() or Decimal("0")
+        antes = despues - delta
+        if antes <= categoria["presupuestado"] < despues:
+            _notificar_exceso(connection, usuario_id, anio, mes, categoria, despues)
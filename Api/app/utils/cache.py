@@ -0,0 +1,92 @@
+# app/utils/cache.py
+# Cache en memoria del proceso (por worker) con expiracion (TTL) y limite de
+# elementos (LRU). Lo usan los modulos que necesitan evitar consultas repetidas.
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Callable, Hashable, Optional
+
+_SIN_VALOR = object()
+
+# Todos los caches creados en el proceso, por nombre (para GET /lanaapp/cache)
+caches = {}
+
+
+class CacheTTL:
+    def __init__(self, nombre: str, max_elementos: int = 10000, ttl_segundos: float = 60):
+        self.nombre = nombre
+        self.max_elementos = max_elementos
+        self.ttl_segundos = ttl_segundos
+        self._datos = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.invalidaciones = 0
+        caches[nombre] = self
+
+    def obtener(self, llave: Hashable, default: Any = None) -> Any:
+        ahora = time.monotonic()
+        with self._lock:
+            entrada = self._datos.get(llave, _SIN_VALOR)
+            if entrada is _SIN_VALOR or entrada[0] < ahora:
+                if entrada is not _SIN_VALOR:
+                    del self._datos[llave]
+                self.misses += 1
+                return default
+            self._datos.move_to_end(llave)
+            self.hits += 1
+            return entrada[1]
+
+    def guardar(self, llave: Hashable, valor: Any, ttl_segundos: Optional[float] = None):
+        expira = time.monotonic() + (self.ttl_segundos if ttl_segundos is None else ttl_segundos)
+        with self._lock:
+            self._datos[llave] = (expira, valor)
+            self._datos.move_to_end(llave)
+            while len(self._datos) > self.max_elementos:
+                self._datos.popitem(last=False)
+
+    def obtener_o_calcular(self, llave: Hashable, calcular: Callable[[], Any]) -> Any:
+        valor = self.obtener(llave, _SIN_VALOR)
+        if valor is _SIN_VALOR:
+            valor = calcular()
+            self.guardar(llave, valor)
+        return valor
+
+    def actualizar(self, llave: Hashable, funcion: Callable[[Any], Any]) -> bool:
+        """
+        Reemplaza el valor guardado por funcion(valor) sin cambiar su expiracion.
+        Si la llave no esta (o ya expiro) no hace nada y regresa False.
+        """
+        ahora = time.monotonic()
+        with self._lock:
+            entrada = self._datos.get(llave, _SIN_VALOR)
+            if entrada is _SIN_VALOR or entrada[0] < ahora:
+                return False
+            self._datos[llave] = (entrada[0], funcion(entrada[1]))
+            return True
+
+    def invalidar(self, llave: Hashable):
+        with self._lock:
+            if self._datos.pop(llave, _SIN_VALOR) is not _SIN_VALOR:
+                self.invalidaciones += 1
+
+    def invalidar_si(self, condicion: Callable[[Hashable], bool]):
+        with self._lock:
+            for llave in [llave for llave in self._datos if condicion(llave)]:
+                del self._datos[llave]
+                self.invalidaciones += 1
+
+    def limpiar(self):
+        with self._lock:
+            self._datos.clear()
+
+    def estadisticas(self) -> dict:
+        with self._lock:
+            consultas = self.hits + self.misses
+            return {
+                "elementos": len(self._datos),
+                "hits": self.hits,
+                "misses": self.misses,
+                "invalidaciones": self.invalidaciones,
+                "hit_ratio": round(self.hits / consultas, 4) if consultas else 0.0,
+            }
@@ -0,0 +1,63 @@
+# app/utils/cache_usuarios.py
+# Cache de usuarios autenticados para que get_current_user no haga un SELECT
+# en cada request protegido: con el cache caliente la autenticacion es decodificar
+# el JWT y buscar en un diccionario.
+#
+# Cada usuario se guarda con dos llaves, ("email", email) y ("id", id). Los
+# endpoints que cambian usuarios invalidan ambas despues del commit; lo que
+# cambie otro worker (un usuario borrado, por ejemplo) se corrige cuando vence
+# el TTL, por eso es corto.
+#
+# El cache nunca guarda password_hash: /login lo lee siempre de la base.
+import os
+from typing import Optional
+from sqlalchemy import select
+from sqlalchemy.engine import Connection
+from app.database.connection import al_confirmar
+from app.model.users import users
+from app.utils.cache import CacheTTL
+
+cache_usuarios = CacheTTL(
+    "usuarios",
+    max_elementos=int(os.getenv("CACHE_USUARIOS_MAX", "10000")),
+    ttl_segundos=float(os.getenv("CACHE_USUARIOS_TTL", "15")),
+)
+
+# Todo el usuario menos el hash de la contraseña
+COLUMNAS_USUARIO = [columna for columna in users.c if columna.name != "password_hash"]
+
+
+def leer_usuario(connection: Connection, email: str):
+    """
+    Usuario del token (sin password_hash), listo para guardar_usuario.
+    """
+    return connection.execute(select(*COLUMNAS_USUARIO).where(users.c.email == email)).first()
+
+
+def usuario_por_email(email: str):
+    return cache_usuarios.obtener(("email", email))
+
+
+def usuario_por_id(user_id: int):
+    return cache_usuarios.obtener(("id", user_id))
+
+
+def guardar_usuario(user):
+    # Solo se guardan usuarios que existen; un email desconocido siempre va a la base
+    if user is not None:
+        if "password_hash" in user._mapping:
+            raise ValueError("El cache de usuarios no guarda password_hash, usa leer_usuario")
+        cache_usuarios.guardar(("email", user.email), user)
+        cache_usuarios.guardar(("id", user.id), user)
+
+
+def invalidar_usuario(connection: Connection, user_id: int, *emails: Optional[str]):
+    """
+    Se llama al actualizar o borrar un usuario con sus emails (anterior y nuevo).
+    """
+    def invalidar():
+        cache_usuarios.invalidar(("id", user_id))
+        for email in emails:
+            if email:
+                cache_usuarios.invalidar(("email", email))
+    al_confirmar(connection, invalidar)
@@ -0,0 +1,93 @@
+# app/utils/catalogo_categorias.py
+# Catalogo de categorias en memoria, ya serializado a JSON, con su ETag.
+#
+# Las categorias casi no cambian y la app las pide en cada pantalla. El
+# catalogo se lee una vez, se guarda como bytes y se sirve sin tocar la base;
+# si el cliente manda If-None-Match con el ETag vigente se responde 304 sin
+# cuerpo. El ETag es el hash del contenido, asi que todos los workers dan el
+# mismo para el mismo catalogo.
+#
+# crear/actualizar/eliminar categoria invalidan despues del commit y suben la
+# version; una lectura que empezo antes de la invalidacion no se guarda.
+import hashlib
+import threading
+from typing import List, NamedTuple, Optional
+from fastapi import Response
+from pydantic import TypeAdapter
+from sqlalchemy.engine import Connection
+from app.database.connection import al_confirmar, abrir_conexion, obtener_async_engine
+from app.model.categorias import categorias
+from app.schema.categoria_schema import CategoriaSchemaOut
+from app.utils.cache import CacheTTL
+
+# El TTL cubre los cambios hechos desde otros workers
+cache_catalogo = CacheTTL("catalogo_categorias", max_elementos=1, ttl_segundos=300)
+_adaptador = TypeAdapter(List[CategoriaSchemaOut])
+_lock = threading.Lock()
+_version = 0
+
+
+class Catalogo(NamedTuple):
+    cuerpo: bytes
+    etag: str
+
+
+def _leer(connection: Connection) -> Catalogo:
+    with _lock:
+        version = _version
+    filas = connection.execute(categorias.select().order_by(categorias.c.id)).fetchall()
+    cuerpo = _adaptador.dump_json(_adaptador.validate_python([dict(fila._mapping) for fila in filas]))
+    catalogo = Catalogo(cuerpo, '"' + hashlib.sha256(cuerpo).hexdigest()[:32] + '"')
+    with _lock:
+        if version == _version:
+            cache_catalogo.guardar("catalogo", catalogo)
+    return catalogo
+
+
+def obtener_catalogo() -> Catalogo:
+    """
+    Version sync: solo abre una conexion si el catalogo no esta en cache.
+    """
+    catalogo = cache_catalogo.obtener("catalogo")
+    if catalogo is None:
+        with abrir_conexion() as connection:
+            catalogo = _leer(connection)
+    return catalogo
+
+
+async def obtener_catalogo_async() -> Catalogo:
+    catalogo = cache_catalogo.obtener("catalogo")
+    if catalogo is None:
+        async with obtener_async_engine().connect() as connection:
+            catalogo = await connection.run_sync(_leer)
+    return catalogo
+
+
+def _invalidar():
+    global _version
+    with _lock:
+        _version += 1
+        cache_catalogo.invalidar("catalogo")
+
+
+def invalidar_catalogo(connection: Connection):
+    al_confirmar(connection, _invalidar)
+
+
+def _coincide(if_none_match: Optional[str], etag: str) -> bool:
+    if not if_none_match:
+        return False
+    for valor in if_none_match.split(","):
+        valor = valor.strip()
+        # If-None-Match usa comparacion debil: W/"x" coincide con "x"
+        if valor == "*" or valor.removeprefix("W/") == etag:
+            return True
+    return False
+
+
+def responder(catalogo: Catalogo, if_none_match: Optional[str]) -> Response:
+    # no-cache: el cliente puede guardar la respuesta pero debe revalidar con el ETag
+    headers = {"ETag": catalogo.etag, "Cache-Control": "no-cache"}
+    if _coincide(if_none_match, catalogo.etag):
+        return Response(status_code=304, headers=headers)
+    return Response(content=catalogo.cuerpo, media_type="application/json", headers=headers)
@@ -0,0 +1,187 @@
+# app/utils/compresion.py
+# Middleware ASGI que comprime las respuestas con brotli o gzip segun el
+# Accept-Encoding del cliente (la app movil va por datos celulares).
+#
+# - Respuestas menores a COMPRESION_MINIMO se mandan tal cual (no vale la pena).
+# - Solo se comprimen tipos de texto (JSON, NDJSON, CSV, HTML...). SSE nunca,
+#   porque el compresor retendria los eventos.
+# - Respuestas por partes (StreamingResponse) se comprimen parte por parte.
+# - Cuerpos de COMPRESION_HILO bytes o mas se comprimen en un hilo para no
+#   detener el event loop.
+# - Si la respuesta ya trae Content-Encoding no se toca.
+# - Un ETag fuerte se vuelve debil (W/"...") al comprimir: el cuerpo ya no es
+#   byte por byte el mismo que el de la version sin comprimir. If-None-Match
+#   compara en forma debil, asi que el cliente sigue recibiendo 304.
+# - El export con gzip=true no se toca por su tipo (application/gzip no esta en
+#   TIPOS_COMPRIMIBLES). Es un archivo .gz, no un cuerpo codificado: no lleva
+#   Content-Encoding y no se le debe agregar.
+#
+# brotli es opcional; si no esta instalado solo se negocia gzip.
+import asyncio
+import os
+import zlib
+
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+COMPRESION_MINIMO = int(os.getenv("COMPRESION_MINIMO", "1024"))
+COMPRESION_HILO = int(os.getenv("COMPRESION_HILO", str(256 * 1024)))
+NIVEL_GZIP = int(os.getenv("COMPRESION_NIVEL_GZIP", "6"))
+# 0-11; 11 comprime mas pero es demasiado lento para respuestas en linea
+NIVEL_BROTLI = int(os.getenv("COMPRESION_NIVEL_BROTLI", "4"))
+
+TIPOS_COMPRIMIBLES = (
+    "application/json",
+    "application/x-ndjson",
+    "application/javascript",
+    "application/xml",
+    "text/",
+)
+
+
+def elegir_codificacion(accept_encoding: str):
+    """
+    Regresa "br", "gzip" o None. Respeta q=0 y prefiere brotli si se acepta igual.
+    """
+    aceptadas = {}
+    for parte in accept_encoding.lower().split(","):
+        nombre, _, parametros = parte.strip().partition(";")
+        calidad = 1.0
+        parametros = parametros.strip()
+        if parametros.startswith("q="):
+            try:
+                calidad = float(parametros[2:])
+            except ValueError:
+                calidad = 0.0
+        if nombre:
+            aceptadas[nombre] = calidad
+    comodin = aceptadas.get("*", 0.0)
+    candidatas = (["br"] if brotli is not None else []) + ["gzip"]
+    mejor, mejor_calidad = None, 0.0
+    for nombre in candidatas:
+        calidad = aceptadas.get(nombre, comodin)
+        if calidad > mejor_calidad:
+            mejor, mejor_calidad = nombre, calidad
+    return mejor
+
+
+class _Compresor:
+    def __init__(self, codificacion: str):
+        if codificacion == "br":
+            self._br = brotli.Compressor(quality=NIVEL_BROTLI)
+            self._gzip = None
+        else:
+            self._br = None
+            # wbits=31: formato gzip con cabecera
+            self._gzip = zlib.compressobj(NIVEL_GZIP, zlib.DEFLATED, 31)
+
+    def comprimir(self, datos: bytes) -> bytes:
+        if self._br is not None:
+            return self._br.process(datos)
+        return self._gzip.compress(datos)
+
+    def terminar(self) -> bytes:
+        if self._br is not None:
+            return self._br.finish()
+        return self._gzip.flush()
+
+    def todo(self, datos: bytes) -> bytes:
+        return self.comprimir(datos) + self.terminar()
+
+
+def _comprimible(headers: dict) -> bool:
+    if "content-encoding" in headers:
+        return False
+    tipo = headers.get("content-type", "")
+    if tipo.startswith("text/event-stream"):
+        return False
+    return tipo.startswith(TIPOS_COMPRIMIBLES)
+
+
+def _etag_debil(etag: bytes) -> bytes:
+    return etag if etag.startswith(b"W/") else b"W/" + etag
+
+
+class CompresionMiddleware:
+    def __init__(self, app, minimo: int = COMPRESION_MINIMO, hilo: int = COMPRESION_HILO):
+        self.app = app
+        self.minimo = minimo
+        self.hilo = hilo
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+        accept = ""
+        for nombre, valor in scope["headers"]:
+            if nombre == b"accept-encoding":
+                accept = valor.decode("latin-1")
+                break
+        codificacion = elegir_codificacion(accept) if accept else None
+        if codificacion is None:
+            await self.app(scope, receive, send)
+            return
+
+        inicio = None
+        compresor = None
+        # None: todavia no se decide; False: se manda sin comprimir
+        comprimir = None
+
+        async def enviar(mensaje):
+            nonlocal inicio, compresor, comprimir
+            if mensaje["type"] == "http.response.start":
+                # Se espera al primer cuerpo para saber el tamaño
+                inicio = mensaje
+                return
+            if mensaje["type"] != "http.response.body" or inicio is None:
+                await send(mensaje)
+                return
+
+            cuerpo = mensaje.get("body", b"")
+            mas = mensaje.get("more_body", False)
+
+            if comprimir is None:
+                headers = {k.decode("latin-1").lower(): v.decode("latin-1") for k, v in inicio["headers"]}
+                comprimir = (
+                    inicio["status"] not in (204, 304)
+                    and _comprimible(headers)
+                    and (mas or len(cuerpo) >= self.minimo)
+                )
+                if not comprimir:
+                    await send(inicio)
+                    await send(mensaje)
+                    return
+                compresor = _Compresor(codificacion)
+                nuevos = [(k, _etag_debil(v) if k.lower() == b"etag" else v)
+                          for k, v in inicio["headers"] if k.lower() != b"content-length"]
+                nuevos.append((b"content-encoding", codificacion.encode()))
+                vary = headers.get("vary")
+                nuevos = [(k, v) for k, v in nuevos if k.lower() != b"vary"]
+                nuevos.append((b"vary", (vary + ", Accept-Encoding" if vary else "Accept-Encoding").encode()))
+                if not mas:
+                    # Respuesta completa: se comprime de una vez (en un hilo si es grande)
+                    if len(cuerpo) >= self.hilo:
+                        comprimido = await asyncio.to_thread(compresor.todo, cuerpo)
+                    else:
+                        comprimido = compresor.todo(cuerpo)
+                    nuevos.append((b"content-length", str(len(comprimido)).encode()))
+                    await send({**inicio, "headers": nuevos})
+                    await send({"type": "http.response.body", "body": comprimido})
+                    return
+                await send({**inicio, "headers": nuevos})
+
+            if not comprimir:
+                await send(mensaje)
+                return
+            if len(cuerpo) >= self.hilo:
+                salida = await asyncio.to_thread(compresor.comprimir, cuerpo)
+            else:
+                salida = compresor.comprimir(cuerpo)
+            if not mas:
+                salida += compresor.terminar()
+            if salida or not mas:
+                await send({"type": "http.response.body", "body": salida, "more_body": mas})
+
+        await self.app(scope, receive, enviar)
@@ -0,0 +1,13 @@
+# app/utils/eliminaciones.py
+# Helpers para registrar tombstones de los registros borrados (ver /lanaapp/sync)
+from typing import Optional
+from sqlalchemy.engine import Connection
+from app.model.registrosEliminados import registros_eliminados
+
+
+def registrar_eliminacion(connection: Connection, tabla: str, registro_id: int, usuario_id: Optional[int] = None):
+    connection.execute(registros_eliminados.insert().values(
+        tabla=tabla,
+        registro_id=registro_id,
+        usuario_id=usuario_id,
+    ))
@@ -0,0 +1,250 @@
+# app/utils/instrumentacion_sql.py
+# Cuanto SQL hace cada request.
+#
+# Los eventos before/after_cursor_execute del engine (sync y async) suman a la
+# metricas del request actual (un ContextVar que pone el middleware): numero de
+# consultas, tiempo en la base, filas leidas y escritas y las sentencias lentas.
+# Al terminar:
+# - Se agrega el header Server-Timing (lo muestran las devtools del navegador):
+#   db;dur=12.3;desc="7 consultas, 120 filas leidas, 2 escritas"
+# - Se escribe una linea JSON en el log "lanaapp.sql" (warning si hubo
+#   sentencias lentas o un posible N+1, info en otro caso).
+# - Se acumula por ruta para GET /lanaapp/db/consultas, ordenado por tiempo
+#   total en la base: el primer handler de la lista es el que conviene arreglar.
+#
+# Posible N+1: la misma sentencia (mismo SQL con parametros distintos) se
+# ejecuta SQL_N_MAS_1_UMBRAL veces o mas dentro de un request.
+#
+# Filas escritas: el rowcount de las sentencias que no regresan filas
+# (INSERT/UPDATE/DELETE). De un SELECT el rowcount no sirve: sqlite3 da -1 y el
+# SSCursor de pymysql (export con stream_results) da 2**64 - 1.
+# Filas leidas: las que el Result realmente saca del cursor. Despues de ejecutar
+# una sentencia que regresa filas se cambia context.cursor por un CursorContador
+# (el CursorResult se arma con context.cursor justo despues de este evento), asi
+# se cuentan tambien las que se leen mas tarde, como las del export en streaming.
+import json
+import logging
+import os
+import threading
+import time
+from collections import Counter
+from contextvars import ContextVar
+from typing import Optional
+from sqlalchemy import event
+
+SQL_INSTRUMENTACION = os.getenv("SQL_INSTRUMENTACION", "1") == "1"
+SQL_LENTO_MS = float(os.getenv("SQL_LENTO_MS", "100"))
+SQL_N_MAS_1_UMBRAL = int(os.getenv("SQL_N_MAS_1_UMBRAL", "5"))
+# Sentencias lentas que se guardan por request (para no llenar el log)
+MAX_LENTAS = 5
+
+logger = logging.getLogger("lanaapp.sql")
+
+
+class MetricasSQL:
+    __slots__ = ("consultas", "segundos", "filas_leidas", "filas_escritas", "lentas", "sentencias")
+
+    def __init__(self):
+        self.consultas = 0
+        self.segundos = 0.0
+        self.filas_leidas = 0
+        self.filas_escritas = 0
+        self.lentas = []
+        self.sentencias = Counter()
+
+    def registrar(self, sentencia: str, segundos: float, filas_escritas: int):
+        self.consultas += 1
+        self.segundos += segundos
+        self.filas_escritas += filas_escritas
+        self.sentencias[sentencia] += 1
+        if segundos * 1000 >= SQL_LENTO_MS and len(self.lentas) < MAX_LENTAS:
+            self.lentas.append({"sql": sentencia[:500], "ms": round(segundos * 1000, 3)})
+
+    def repetidas(self) -> list:
+        return [
+            {"sql": sentencia[:500], "veces": veces}
+            for sentencia, veces in self.sentencias.most_common()
+            if veces >= SQL_N_MAS_1_UMBRAL
+        ]
+
+    def server_timing(self) -> str:
+        return (f'db;dur={self.segundos * 1000:.3f};desc="{self.consultas} consultas, '
+                f'{self.filas_leidas} filas leidas, {self.filas_escritas} escritas"')
+
+
+_actual: ContextVar[Optional[MetricasSQL]] = ContextVar("metricas_sql", default=None)
+
+
+def metricas_actuales() -> Optional[MetricasSQL]:
+    return _actual.get()
+
+
+def _antes(conn, cursor, statement, parameters, context, executemany):
+    if _actual.get() is not None:
+        # El contexto de ejecucion es uno por sentencia; si falla no queda nada colgando
+        context._inicio_sql = time.perf_counter()
+
+
+def _despues(conn, cursor, statement, parameters, context, executemany):
+    metricas = _actual.get()
+    inicio = getattr(context, "_inicio_sql", None)
+    if metricas is None or inicio is None:
+        return
+    metricas.registrar(statement, time.perf_counter() - inicio, _filas_escritas(cursor))
+    if cursor.description is not None:
+        context.cursor = CursorContador(cursor, metricas)
+
+
+class CursorContador:
+    """
+    Envuelve el cursor DBAPI y suma a metricas.filas_leidas lo que regresa cada fetch.
+    """
+    __slots__ = ("_cursor", "_metricas")
+
+    def __init__(self, cursor, metricas: MetricasSQL):
+        self._cursor = cursor
+        self._metricas = metricas
+
+    def fetchone(self):
+        fila = self._cursor.fetchone()
+        if fila is not None:
+            self._metricas.filas_leidas += 1
+        return fila
+
+    def fetchmany(self, *args):
+        filas = self._cursor.fetchmany(*args)
+        self._metricas.filas_leidas += len(filas)
+        return filas
+
+    def fetchall(self):
+        filas = self._cursor.fetchall()
+        self._metricas.filas_leidas += len(filas)
+        return filas
+
+    def __getattr__(self, nombre):
+        return getattr(self._cursor, nombre)
+
+
+def _filas_escritas(cursor) -> int:
+    # Con description la sentencia regresa filas (SELECT o RETURNING) y el rowcount no es confiable
+    if cursor.description is not None:
+        return 0
+    filas = cursor.rowcount
+    # -1 si el driver no lo sabe; los valores enormes son -1 visto como entero sin signo
+    if filas is None or filas < 0 or filas >= 2 ** 63:
+        return 0
+    return filas
+
+
+def instrumentar_engine(engine):
+    """
+    Registra los eventos en un engine sincrono (para el async: engine.sync_engine).
+    """
+    if not SQL_INSTRUMENTACION:
+        return
+    event.listen(engine, "before_cursor_execute", _antes)
+    event.listen(engine, "after_cursor_execute", _despues)
+
+
+class EstadisticasRutas:
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._rutas = {}
+
+    def agregar(self, ruta: str, metricas: MetricasSQL, repetidas: int):
+        with self._lock:
+            datos = self._rutas.get(ruta)
+            if datos is None:
+                datos = self._rutas[ruta] = {
+                    "requests": 0, "consultas": 0, "db_ms": 0.0, "db_ms_maximo": 0.0,
+                    "filas_leidas": 0, "filas_escritas": 0, "lentas": 0, "posible_n_mas_1": 0,
+                }
+            ms = metricas.segundos * 1000
+            datos["requests"] += 1
+            datos["consultas"] += metricas.consultas
+            datos["db_ms"] += ms
+            datos["db_ms_maximo"] = max(datos["db_ms_maximo"], ms)
+            datos["filas_leidas"] += metricas.filas_leidas
+            datos["filas_escritas"] += metricas.filas_escritas
+            datos["lentas"] += len(metricas.lentas)
+            if repetidas:
+                datos["posible_n_mas_1"] += 1
+
+    def reporte(self) -> list:
+        with self._lock:
+            rutas = [(ruta, dict(datos)) for ruta, datos in self._rutas.items()]
+        reporte = []
+        for ruta, datos in rutas:
+            datos["ruta"] = ruta
+            datos["consultas_promedio"] = round(datos["consultas"] / datos["requests"], 2)
+            datos["db_ms_promedio"] = round(datos["db_ms"] / datos["requests"], 3)
+            datos["db_ms"] = round(datos["db_ms"], 3)
+            datos["db_ms_maximo"] = round(datos["db_ms_maximo"], 3)
+            reporte.append(datos)
+        reporte.sort(key=lambda datos: datos["db_ms"], reverse=True)
+        return reporte
+
+    def limpiar(self):
+        with self._lock:
+            self._rutas.clear()
+
+
+estadisticas_rutas = EstadisticasRutas()
+
+
+def _ruta(scope) -> str:
+    # FastAPI deja la ruta que hizo match en el scope; su path es la plantilla (/x/{id})
+    ruta = scope.get("route")
+    return f"{scope['method']} {getattr(ruta, 'path', scope['path'])}"
+
+
+class InstrumentacionSQLMiddleware:
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+        metricas = MetricasSQL()
+        token = _actual.set(metricas)
+        inicio = time.perf_counter()
+        estado = 500
+
+        async def enviar(mensaje):
+            nonlocal estado
+            if mensaje["type"] == "http.response.start":
+                estado = mensaje["status"]
+                headers = list(mensaje.get("headers", []))
+                headers.append((b"server-timing", metricas.server_timing().encode()))
+                mensaje = {**mensaje, "headers": headers}
+            await send(mensaje)
+
+        try:
+            await self.app(scope, receive, enviar)
+        finally:
+            _actual.reset(token)
+            if metricas.consultas:
+                self._reportar(scope, metricas, estado, time.perf_counter() - inicio)
+
+    def _reportar(self, scope, metricas: MetricasSQL, estado: int, segundos: float):
+        ruta = _ruta(scope)
+        repetidas = metricas.repetidas()
+        estadisticas_rutas.agregar(ruta, metricas, len(repetidas))
+        nivel = logging.WARNING if repetidas or metricas.lentas else logging.INFO
+        if not logger.isEnabledFor(nivel):
+            return
+        registro = {
+            "ruta": ruta,
+            "estado": estado,
+            "total_ms": round(segundos * 1000, 3),
+            "consultas": metricas.consultas,
+            "db_ms": round(metricas.segundos * 1000, 3),
+            "filas_leidas": metricas.filas_leidas,
+            "filas_escritas": metricas.filas_escritas,
+        }
+        if metricas.lentas:
+            registro["lentas"] = metricas.lentas
+        if repetidas:
+            registro["posible_n_mas_1"] = repetidas
+        logger.log(nivel, json.dumps(registro, ensure_ascii=False))
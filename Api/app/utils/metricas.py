@@ -0,0 +1,374 @@
+# app/utils/metricas.py
+# Metricas en formato de texto de Prometheus para GET /metrics.
+#
+# - Latencia por ruta (histograma), requests por ruta y estado, y requests en
+#   curso: los actualiza MetricasMiddleware. Todo corre en el hilo del event
+#   loop, asi que son enteros simples sin locks.
+# - Lo demas (threadpool, pool de conexiones, caches, pool de hash,
+#   notificaciones) se lee de los contadores que ya existen en cada modulo al
+#   momento de generar la respuesta.
+# - La ruta es la plantilla de FastAPI (/x/{id}); lo que no hizo match cuenta
+#   como "sin_ruta" para que un escaneo de URLs no cree miles de series.
+#
+# Varios workers de uvicorn: con METRICAS_DIR cada worker escribe su snapshot
+# en METRICAS_DIR/metricas_<pid>_<arranque>.json al arrancar, cada
+# METRICAS_INTERVALO segundos y al apagarse, y /metrics suma los de todos.
+# <arranque> es un id al azar por proceso: en contenedores los pid se repiten en
+# cada reinicio y un worker nuevo no debe pisar el archivo de uno muerto.
+# Counters e histogramas se suman aunque el worker ya no exista (siguen siendo
+# totales validos); los gauges solo de los workers vivos. Vivo no se decide por
+# pid (puede ser otro proceso con el mismo numero): es el snapshot mas nuevo de
+# su pid, se escribio hace menos de METRICAS_VIGENCIA intervalos y no es el
+# snapshot final de un worker que se apago.
+import asyncio
+import bisect
+import json
+import os
+import time
+import uuid
+from typing import Dict, List, Optional, Tuple
+import anyio.to_thread
+from sqlalchemy import func, select
+from app.database.connection import abrir_conexion, estado_pool
+from app.model.notificaciones import notificaciones
+from app.utils.cache import caches
+from app.utils.notifier import despachador_notificaciones
+from app.utils.passwords import pool_hash
+from app.utils.tiempo_real import hub_notificaciones
+
+METRICAS_DIR = os.getenv("METRICAS_DIR") or None
+METRICAS_INTERVALO = float(os.getenv("METRICAS_INTERVALO", "5"))
+# Intervalos sin escribir despues de los cuales un worker se da por muerto
+METRICAS_VIGENCIA = float(os.getenv("METRICAS_VIGENCIA", "3"))
+# Identifica a este proceso aunque su pid se repita despues de un reinicio
+ARRANQUE = uuid.uuid4().hex
+# Limites (en segundos) de los buckets del histograma de latencia
+BUCKETS_LATENCIA = tuple(
+    float(valor) for valor in os.getenv(
+        "METRICAS_BUCKETS", "0.005,0.01,0.025,0.05,0.1,0.25,0.5,1,2.5,5,10"
+    ).split(",")
+)
+
+TIPO_CONTENIDO = "text/plain; version=0.0.4; charset=utf-8"
+
+# Muestra: (sufijo del nombre, ((label, valor), ...), valor)
+Muestra = Tuple[str, Tuple[Tuple[str, str], ...], float]
+
+
+class Familia:
+    def __init__(self, nombre: str, tipo: str, ayuda: str):
+        self.nombre = nombre
+        self.tipo = tipo
+        self.ayuda = ayuda
+        self.muestras: List[Muestra] = []
+
+    def agregar(self, valor: float, sufijo: str = "", **labels):
+        self.muestras.append((sufijo, tuple(sorted(labels.items())), float(valor)))
+        return self
+
+    def a_dict(self) -> dict:
+        return {
+            "tipo": self.tipo,
+            "ayuda": self.ayuda,
+            "muestras": [[sufijo, [list(par) for par in labels], valor] for sufijo, labels, valor in self.muestras],
+        }
+
+
+class MetricasHTTP:
+    def __init__(self, buckets=BUCKETS_LATENCIA):
+        self.buckets = buckets
+        self.en_curso = 0
+        # (metodo, ruta, estado) -> requests
+        self.requests: Dict[tuple, int] = {}
+        # (metodo, ruta) -> [conteo por bucket (el ultimo es +Inf), suma]
+        self.latencias: Dict[tuple, list] = {}
+
+    def observar(self, metodo: str, ruta: str, estado: int, segundos: float):
+        clave = (metodo, ruta, str(estado))
+        self.requests[clave] = self.requests.get(clave, 0) + 1
+        serie = self.latencias.get((metodo, ruta))
+        if serie is None:
+            serie = self.latencias[(metodo, ruta)] = [[0] * (len(self.buckets) + 1), 0.0]
+        serie[0][bisect.bisect_left(self.buckets, segundos)] += 1
+        serie[1] += segundos
+
+    def familias(self) -> List[Familia]:
+        requests = Familia("lanaapp_http_requests_total", "counter", "Requests atendidos por ruta y estado")
+        for (metodo, ruta, estado), total in self.requests.items():
+            requests.agregar(total, metodo=metodo, ruta=ruta, estado=estado)
+        latencia = Familia("lanaapp_http_request_duracion_segundos", "histogram", "Latencia de los requests por ruta")
+        for (metodo, ruta), (conteos, suma) in self.latencias.items():
+            acumulado = 0
+            for limite, conteo in zip(self.buckets + (float("inf"),), conteos):
+                acumulado += conteo
+                latencia.agregar(acumulado, "_bucket", metodo=metodo, ruta=ruta, le=_numero(limite))
+            latencia.agregar(suma, "_sum", metodo=metodo, ruta=ruta)
+            latencia.agregar(acumulado, "_count", metodo=metodo, ruta=ruta)
+        en_curso = Familia("lanaapp_http_requests_en_curso", "gauge", "Requests que se estan atendiendo")
+        en_curso.agregar(self.en_curso)
+        return [requests, latencia, en_curso]
+
+
+metricas_http = MetricasHTTP()
+
+
+def _ruta(scope) -> str:
+    ruta = scope.get("route")
+    return getattr(ruta, "path", None) or "sin_ruta"
+
+
+class MetricasMiddleware:
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+        metricas_http.en_curso += 1
+        inicio = time.perf_counter()
+        estado = 500
+
+        async def enviar(mensaje):
+            nonlocal estado
+            if mensaje["type"] == "http.response.start":
+                estado = mensaje["status"]
+            await send(mensaje)
+
+        try:
+            await self.app(scope, receive, enviar)
+        finally:
+            metricas_http.en_curso -= 1
+            metricas_http.observar(scope["method"], _ruta(scope), estado, time.perf_counter() - inicio)
+
+
+def _familias_worker() -> List[Familia]:
+    """
+    Metricas de este worker. Se llama desde el event loop (el limitador de
+    anyio solo se puede leer ahi).
+    """
+    familias = metricas_http.familias()
+
+    limitador = anyio.to_thread.current_default_thread_limiter()
+    familias.append(Familia("lanaapp_threadpool_hilos_ocupados", "gauge",
+                            "Hilos del threadpool de anyio ejecutando handlers sync").agregar(limitador.borrowed_tokens))
+    familias.append(Familia("lanaapp_threadpool_hilos_maximos", "gauge",
+                            "Tamaño del threadpool de anyio").agregar(limitador.total_tokens))
+    familias.append(Familia("lanaapp_threadpool_en_espera", "gauge",
+                            "Tareas esperando un hilo libre").agregar(limitador.statistics().tasks_waiting))
+
+    pool = estado_pool()
+    familias.append(Familia("lanaapp_db_pool_checkouts_total", "counter",
+                            "Conexiones entregadas por el pool").agregar(pool["checkouts"]))
+    familias.append(Familia("lanaapp_db_pool_espera_segundos_total", "counter",
+                            "Tiempo total esperando una conexion del pool").agregar(pool["espera_total_ms"] / 1000))
+    familias.append(Familia("lanaapp_db_pool_timeouts_total", "counter",
+                            "Requests que no obtuvieron conexion a tiempo").agregar(pool["timeouts"]))
+    if "pool_checkedout" in pool:
+        familias.append(Familia("lanaapp_db_pool_conexiones_en_uso", "gauge",
+                                "Conexiones prestadas en este momento").agregar(pool["pool_checkedout"]))
+        familias.append(Familia("lanaapp_db_pool_tamano", "gauge",
+                                "Conexiones que el pool mantiene abiertas (sin overflow)").agregar(pool["pool_size"]))
+
+    hits = Familia("lanaapp_cache_hits_total", "counter", "Lecturas encontradas en cache")
+    misses = Familia("lanaapp_cache_misses_total", "counter", "Lecturas que no estaban en cache")
+    elementos = Familia("lanaapp_cache_elementos", "gauge", "Elementos guardados en cache")
+    for nombre, cache in caches.items():
+        datos = cache.estadisticas()
+        hits.agregar(datos["hits"], cache=nombre)
+        misses.agregar(datos["misses"], cache=nombre)
+        elementos.agregar(datos["elementos"], cache=nombre)
+    familias += [hits, misses, elementos]
+
+    hash_pool = pool_hash.estado()
+    familias.append(Familia("lanaapp_hash_pool_en_cola", "gauge",
+                            "Operaciones de contraseña esperando turno").agregar(hash_pool["en_cola"]))
+    familias.append(Familia("lanaapp_hash_pool_rechazados_total", "counter",
+                            "Operaciones de contraseña rechazadas por cola llena").agregar(hash_pool["rechazados"]))
+
+    despachador = despachador_notificaciones.estado()
+    familias.append(Familia("lanaapp_notificaciones_enviadas_total", "counter",
+                            "Notificaciones enviadas por el despachador").agregar(despachador["enviados"]))
+    familias.append(Familia("lanaapp_notificaciones_fallidas_total", "counter",
+                            "Notificaciones cuyo envio fallo").agregar(despachador["fallidos"]))
+    hub = hub_notificaciones.estado()
+    familias.append(Familia("lanaapp_tiempo_real_conexiones", "gauge",
+                            "Conexiones WebSocket/SSE abiertas").agregar(hub["conexiones"]))
+    familias.append(Familia("lanaapp_tiempo_real_descartados_total", "counter",
+                            "Mensajes descartados por clientes lentos").agregar(hub["descartados"]))
+    return familias
+
+
+def _contar_pendientes() -> int:
+    with abrir_conexion() as connection:
+        return connection.execute(
+            select(func.count()).select_from(notificaciones).where(notificaciones.c.estado_envio == "pendiente")
+        ).scalar_one()
+
+
+async def _familias_globales() -> List[Familia]:
+    """
+    Metricas de la base, iguales para todos los workers: solo las calcula el
+    worker que atiende /metrics y no se suman.
+    """
+    try:
+        pendientes = await asyncio.to_thread(_contar_pendientes)
+    except Exception as e:
+        print("No se pudo contar las notificaciones pendientes", e)
+        return []
+    return [Familia("lanaapp_notificaciones_pendientes", "gauge",
+                    "Notificaciones en cola (estado_envio = pendiente)").agregar(pendientes)]
+
+
+def _numero(valor: float) -> str:
+    if valor == float("inf"):
+        return "+Inf"
+    if valor == int(valor) and abs(valor) < 1e15:
+        return str(int(valor))
+    return repr(valor)
+
+
+def _escapar(valor: str) -> str:
+    return valor.replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _texto(familias: Dict[str, dict]) -> str:
+    lineas = []
+    for nombre, familia in familias.items():
+        lineas.append(f"# HELP {nombre} {familia['ayuda']}")
+        lineas.append(f"# TYPE {nombre} {familia['tipo']}")
+        for sufijo, labels, valor in familia["muestras"]:
+            etiquetas = ",".join(f'{clave}="{_escapar(str(dato))}"' for clave, dato in labels)
+            lineas.append(f"{nombre}{sufijo}{{{etiquetas}}} {_numero(valor)}" if etiquetas else f"{nombre}{sufijo} {_numero(valor)}")
+    return "\n".join(lineas) + "\n"
+
+
+def _vivos(snapshots: List[dict], ahora: float) -> set:
+    """
+    Arranques de los workers vivos: el propio, y de cada pid solo el snapshot mas
+    nuevo si se escribio dentro de la vigencia.
+    """
+    ultimo_por_pid: Dict[int, dict] = {}
+    for snapshot in snapshots:
+        anterior = ultimo_por_pid.get(snapshot["pid"])
+        if anterior is None or snapshot["inicio"] > anterior["inicio"]:
+            ultimo_por_pid[snapshot["pid"]] = snapshot
+    limite = ahora - METRICAS_VIGENCIA * METRICAS_INTERVALO
+    vivos = {
+        snapshot["arranque"] for snapshot in ultimo_por_pid.values()
+        if snapshot["escrito"] >= limite and not snapshot["terminado"]
+    }
+    vivos.add(ARRANQUE)
+    return vivos
+
+
+def _combinar(snapshots: List[dict], ahora: Optional[float] = None) -> Dict[str, dict]:
+    combinadas: Dict[str, dict] = {}
+    vivos = _vivos(snapshots, time.time() if ahora is None else ahora)
+    for snapshot in snapshots:
+        vivo = snapshot["arranque"] in vivos
+        for nombre, familia in snapshot["familias"].items():
+            if familia["tipo"] == "gauge" and not vivo:
+                continue
+            destino = combinadas.setdefault(nombre, {"tipo": familia["tipo"], "ayuda": familia["ayuda"], "valores": {}})
+            for sufijo, labels, valor in familia["muestras"]:
+                clave = (sufijo, tuple(tuple(par) for par in labels))
+                destino["valores"][clave] = destino["valores"].get(clave, 0.0) + valor
+    return {
+        nombre: {
+            "tipo": datos["tipo"],
+            "ayuda": datos["ayuda"],
+            "muestras": [(sufijo, labels, valor) for (sufijo, labels), valor in datos["valores"].items()],
+        }
+        for nombre, datos in combinadas.items()
+    }
+
+
+class RegistroMetricas:
+    def __init__(self, directorio: Optional[str] = METRICAS_DIR):
+        self.directorio = directorio
+        self._tarea = None
+        self._inicio = time.time()
+
+    def _archivo(self, pid: int, arranque: str) -> str:
+        return os.path.join(self.directorio, f"metricas_{pid}_{arranque}.json")
+
+    def snapshot(self, terminado: bool = False) -> dict:
+        return {
+            "pid": os.getpid(),
+            "arranque": ARRANQUE,
+            "inicio": self._inicio,
+            "escrito": time.time(),
+            "terminado": terminado,
+            "familias": {f.nombre: f.a_dict() for f in _familias_worker()},
+        }
+
+    def escribir(self, snapshot: dict):
+        # Se escribe aparte y se reemplaza para que nadie lea un archivo a medias
+        archivo = self._archivo(snapshot["pid"], snapshot["arranque"])
+        temporal = archivo + ".tmp"
+        with open(temporal, "w") as f:
+            json.dump(snapshot, f)
+        os.replace(temporal, archivo)
+
+    def _leer_todos(self) -> List[dict]:
+        snapshots = []
+        for nombre in os.listdir(self.directorio):
+            if not (nombre.startswith("metricas_") and nombre.endswith(".json")):
+                continue
+            try:
+                with open(os.path.join(self.directorio, nombre)) as f:
+                    snapshot = json.load(f)
+            except (OSError, ValueError) as e:
+                print("No se pudo leer", nombre, e)
+                continue
+            # Los archivos de antes de ARRANQUE (metricas_<pid>.json) no se pueden atribuir a un proceso
+            if "arranque" in snapshot:
+                snapshots.append(snapshot)
+        return snapshots
+
+    async def exportar(self) -> str:
+        propio = self.snapshot()
+        if self.directorio is None:
+            familias = propio["familias"]
+        else:
+            # El snapshot propio va al dia; el de los demas tiene a lo mas METRICAS_INTERVALO segundos
+            await asyncio.to_thread(self.escribir, propio)
+            familias = _combinar(await asyncio.to_thread(self._leer_todos))
+        for familia in await _familias_globales():
+            familias[familia.nombre] = familia.a_dict()
+        return _texto(familias)
+
+    async def _ciclo(self):
+        while True:
+            await asyncio.sleep(METRICAS_INTERVALO)
+            try:
+                await asyncio.to_thread(self.escribir, self.snapshot())
+            except Exception as e:
+                print("Error guardando las metricas", e)
+
+    async def iniciar(self):
+        if self.directorio is None:
+            return
+        os.makedirs(self.directorio, exist_ok=True)
+        # Se escribe de una vez para que un archivo viejo con el mismo pid deje de contar como vivo
+        await asyncio.to_thread(self.escribir, self.snapshot())
+        self._tarea = asyncio.create_task(self._ciclo())
+
+    async def detener(self):
+        if self._tarea is None:
+            return
+        self._tarea.cancel()
+        try:
+            await self._tarea
+        except asyncio.CancelledError:
+            pass
+        self._tarea = None
+        # Ultimo snapshot para que los counters de este worker no se pierdan
+        try:
+            self.escribir(self.snapshot(terminado=True))
+        except Exception as e:
+            print("Error guardando las metricas", e)
+
+
+registro_metricas = RegistroMetricas()
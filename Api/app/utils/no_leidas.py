@@ -0,0 +1,61 @@
+# app/utils/no_leidas.py
+# Contador de notificaciones no leidas por usuario (el numero del badge).
+#
+# El contador vive en cache; se suma cuando se encolan notificaciones y se
+# ajusta cuando se marcan como leidas, siempre despues del commit. Si no esta
+# en cache se cuenta por el indice (usuario_id, leida). Lo que cambie otro
+# worker se corrige cuando vence el TTL.
+from collections import Counter
+from typing import Iterable, Optional
+from sqlalchemy import select, func
+from sqlalchemy.engine import Connection
+from app.database.connection import al_confirmar
+from app.model.notificaciones import notificaciones
+from app.utils.cache import CacheTTL
+
+cache_no_leidas = CacheTTL("notificaciones_no_leidas", max_elementos=50000, ttl_segundos=60)
+
+
+def no_leidas_en_cache(usuario_id: int) -> Optional[int]:
+    return cache_no_leidas.obtener(usuario_id)
+
+
+def recalcular_no_leidas(connection: Connection, usuario_id: int) -> int:
+    total = connection.execute(
+        select(func.count()).select_from(notificaciones).where(
+            notificaciones.c.usuario_id == usuario_id,
+            notificaciones.c.leida == 0,
+        )
+    ).scalar_one()
+    cache_no_leidas.guardar(usuario_id, total)
+    return total
+
+
+def _sumar(usuario_id: int, cantidad: int):
+    # Si no esta en cache no se crea: la siguiente consulta lo cuenta completo
+    cache_no_leidas.actualizar(usuario_id, lambda total: max(0, total + cantidad))
+
+
+def registrar_nuevas(connection: Connection, filas: Iterable[dict]):
+    """
+    Suma al contador las filas no leidas que se insertaron (al confirmar).
+    """
+    por_usuario = Counter(fila["usuario_id"] for fila in filas if not fila.get("leida"))
+    for usuario_id, cantidad in por_usuario.items():
+        al_confirmar(connection, lambda u=usuario_id, c=cantidad: _sumar(u, c))
+
+
+def registrar_leida(connection: Connection, usuario_id: int):
+    al_confirmar(connection, lambda: _sumar(usuario_id, -1))
+
+
+def registrar_todas_leidas(connection: Connection, usuario_id: int):
+    al_confirmar(connection, lambda: cache_no_leidas.guardar(usuario_id, 0))
+
+
+def invalidar_usuarios(connection: Connection, *usuario_ids: int):
+    """
+    Para cambios donde no se sabe el efecto (PUT completo, DELETE): se vuelve a contar.
+    """
+    for usuario_id in set(usuario_ids):
+        al_confirmar(connection, lambda u=usuario_id: cache_no_leidas.invalidar(u))
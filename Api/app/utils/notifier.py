@@ -0,0 +1,257 @@
+# app/utils/notifier.py
+# Todo lo que crea notificaciones pasa por aqui para que quede en la cola
+# (estado_envio = "pendiente") con el mismo formato.
+#
+# El despachador corre en cada worker: reclama un lote de pendientes, lo reparte
+# por canal (email, sms, push) a su enviador con un limite de envios simultaneos
+# por canal y guarda el resultado de todo el lote con un UPDATE por estado.
+#
+# Mientras una notificacion esta reclamada sigue en "pendiente" pero con
+# fecha_envio = momento del reclamo; si el worker muere a medio envio la
+# notificacion se vuelve a reclamar cuando pasan RECLAMO_SEGUNDOS.
+# Cada notificacion encolada se publica en hub_notificaciones despues del
+# commit para los dispositivos conectados a /lanaapp/notificaciones/stream, este
+# o no prendido el despachador. Si lo esta, al terminar cada lote se vuelve a
+# publicar con el mismo id y su estado_envio final.
+#
+# Solo se reclaman notificaciones de canales con un enviador registrado
+# (registrar_enviador); las de los demas canales se quedan en "pendiente"
+# hasta que alguien las pueda entregar. Por eso el despachador viene apagado:
+# se prende con NOTIFICACIONES_DESPACHADOR=1 despues de registrar los enviadores.
+import asyncio
+import os
+from datetime import datetime, timedelta
+from functools import partial
+from typing import Iterable, List
+from sqlalchemy import select, and_, or_
+from sqlalchemy.engine import Connection
+from app.config.db import engine
+from app.database.connection import al_confirmar
+from app.model.notificaciones import notificaciones
+from app.utils.tiempo_real import hub_notificaciones
+from app.utils import no_leidas
+
+# Cuantas notificaciones se reclaman por lectura
+LOTE_NOTIFICACIONES = int(os.getenv("NOTIFICACIONES_LOTE", "500"))
+# Envios simultaneos por canal (cada proveedor tiene su propio limite)
+CONCURRENCIA_POR_CANAL = int(os.getenv("NOTIFICACIONES_CONCURRENCIA", "50"))
+# Cada cuanto se revisa la tabla si nadie avisa de notificaciones nuevas
+ESPERA_SEGUNDOS = float(os.getenv("NOTIFICACIONES_ESPERA_SEGUNDOS", "2"))
+# Despues de este tiempo un reclamo sin resultado se considera abandonado
+RECLAMO_SEGUNDOS = int(os.getenv("NOTIFICACIONES_RECLAMO_SEGUNDOS", "300"))
+DESPACHADOR_ACTIVO = os.getenv("NOTIFICACIONES_DESPACHADOR", "0") == "1"
+
+COLUMNAS_ENVIO = [
+    notificaciones.c.id,
+    notificaciones.c.usuario_id,
+    notificaciones.c.tipo_notificacion_canal,
+    notificaciones.c.destino,
+    notificaciones.c.asunto,
+    notificaciones.c.mensaje,
+    notificaciones.c.notificable_type,
+    notificaciones.c.notificable_id,
+]
+
+
+def reclamar_lote(connection: Connection, limite: int, ahora: datetime, canales: Iterable[str]) -> list:
+    """
+    Marca como reclamadas hasta `limite` notificaciones pendientes de `canales`
+    y las regresa.
+    En MySQL se usa SELECT ... FOR UPDATE SKIP LOCKED para que dos workers no
+    tomen las mismas filas; SQLite no tiene SKIP LOCKED pero serializa las
+    escrituras, asi que basta con un solo UPDATE ... RETURNING.
+    """
+    vencido = ahora - timedelta(seconds=RECLAMO_SEGUNDOS)
+    disponibles = and_(
+        notificaciones.c.estado_envio == "pendiente",
+        notificaciones.c.tipo_notificacion_canal.in_(list(canales)),
+        or_(notificaciones.c.fecha_envio.is_(None), notificaciones.c.fecha_envio < vencido),
+    )
+    if connection.dialect.name == "sqlite":
+        ids = select(notificaciones.c.id).where(disponibles).order_by(notificaciones.c.id).limit(limite)
+        return connection.execute(
+            notificaciones.update()
+            .where(notificaciones.c.id.in_(ids.scalar_subquery()))
+            .values(fecha_envio=ahora)
+            .returning(*COLUMNAS_ENVIO)
+        ).fetchall()
+
+    filas = connection.execute(
+        select(*COLUMNAS_ENVIO)
+        .where(disponibles)
+        .order_by(notificaciones.c.id)
+        .limit(limite)
+        .with_for_update(skip_locked=True)
+    ).fetchall()
+    if filas:
+        connection.execute(
+            notificaciones.update()
+            .where(notificaciones.c.id.in_([fila.id for fila in filas]))
+            .values(fecha_envio=ahora)
+        )
+    return filas
+
+
+def guardar_resultados(connection: Connection, enviados: List[int], fallidos: List[int], ahora: datetime):
+    """
+    Un UPDATE por estado para todo el lote.
+    """
+    for estado, ids in (("enviado", enviados), ("fallido", fallidos)):
+        if ids:
+            connection.execute(
+                notificaciones.update()
+                .where(notificaciones.c.id.in_(ids))
+                .values(estado_envio=estado, fecha_envio=ahora)
+            )
+
+
+class DespachadorNotificaciones:
+    def __init__(self, engine, lote: int = LOTE_NOTIFICACIONES, concurrencia: int = CONCURRENCIA_POR_CANAL):
+        self.engine = engine
+        self.lote = lote
+        self.concurrencia = concurrencia
+        # Un enviador por canal (registrar_enviador); sin enviador el canal no se reclama
+        self.enviadores = {}
+        self._semaforos = {}
+        self._despertar = None
+        self._loop = None
+        self._tarea = None
+        self.enviados = 0
+        self.fallidos = 0
+
+    def registrar_enviador(self, canal: str, enviador):
+        """
+        enviador: objeto con `async def enviar(notificacion: dict) -> bool`.
+        """
+        self.enviadores[canal] = enviador
+
+    def avisar(self):
+        """
+        Despierta al despachador (se llama despues del commit de un encolado).
+        """
+        if self._loop is not None and self._despertar is not None:
+            self._loop.call_soon_threadsafe(self._despertar.set)
+
+    def _reclamar(self) -> list:
+        with self.engine.begin() as connection:
+            return reclamar_lote(connection, self.lote, datetime.now(), self.enviadores)
+
+    def _guardar(self, enviados: List[int], fallidos: List[int]):
+        with self.engine.begin() as connection:
+            guardar_resultados(connection, enviados, fallidos, datetime.now())
+
+    async def _enviar(self, notificacion: dict) -> bool:
+        canal = notificacion["tipo_notificacion_canal"]
+        enviador = self.enviadores.get(canal)
+        if enviador is None:
+            return False
+        semaforo = self._semaforos.get(canal)
+        if semaforo is None:
+            semaforo = self._semaforos[canal] = asyncio.Semaphore(self.concurrencia)
+        async with semaforo:
+            try:
+                return bool(await enviador.enviar(notificacion))
+            except Exception as e:
+                print(f"Error enviando la notificacion {notificacion['id']} por {canal}: {e}")
+                return False
+
+    async def despachar_lote(self) -> int:
+        """
+        Reclama, envia y guarda un lote. Regresa cuantas notificaciones se procesaron.
+        """
+        if not self.enviadores:
+            return 0
+        filas = await asyncio.to_thread(self._reclamar)
+        if not filas:
+            return 0
+        pendientes = [dict(fila._mapping) for fila in filas]
+        resultados = await asyncio.gather(*(self._enviar(notificacion) for notificacion in pendientes))
+        enviados = [n["id"] for n, ok in zip(pendientes, resultados) if ok]
+        fallidos = [n["id"] for n, ok in zip(pendientes, resultados) if not ok]
+        await asyncio.to_thread(self._guardar, enviados, fallidos)
+        # Los dispositivos conectados por WebSocket/SSE la reciben en cuanto se procesa
+        for notificacion, ok in zip(pendientes, resultados):
+            notificacion["estado_envio"] = "enviado" if ok else "fallido"
+            await hub_notificaciones.publicar(notificacion["usuario_id"], notificacion)
+        self.enviados += len(enviados)
+        self.fallidos += len(fallidos)
+        return len(pendientes)
+
+    async def _ciclo(self):
+        while True:
+            # Se limpia antes de leer para no perder un aviso que llegue durante el lote
+            self._despertar.clear()
+            try:
+                procesadas = await self.despachar_lote()
+            except Exception as e:
+                print("Error despachando notificaciones", e)
+                procesadas = 0
+            if procesadas >= self.lote:
+                # El lote salio lleno, probablemente hay mas esperando
+                continue
+            try:
+                await asyncio.wait_for(self._despertar.wait(), timeout=ESPERA_SEGUNDOS)
+            except asyncio.TimeoutError:
+                pass
+
+    async def iniciar(self):
+        if not self.enviadores:
+            print("Despachador de notificaciones sin enviadores: las notificaciones se quedan pendientes")
+        self._loop = asyncio.get_running_loop()
+        self._despertar = asyncio.Event()
+        self._semaforos = {}
+        self._tarea = asyncio.create_task(self._ciclo())
+
+    async def detener(self):
+        if self._tarea is not None:
+            self._tarea.cancel()
+            try:
+                await self._tarea
+            except asyncio.CancelledError:
+                pass
+            self._tarea = None
+
+    def estado(self) -> dict:
+        return {
+            "activo": self._tarea is not None,
+            "canales": sorted(self.enviadores),
+            "enviados": self.enviados,
+            "fallidos": self.fallidos,
+        }
+
+
+despachador_notificaciones = DespachadorNotificaciones(engine)
+
+
+def _insertar(connection: Connection, filas: List[dict]) -> List[int]:
+    """
+    Inserta las filas y regresa sus ids en el mismo orden. Con un solo
+    executemany si el motor regresa ids de un executemany (SQLite, MariaDB);
+    en MySQL una sentencia por fila, porque los ids de un INSERT de varias
+    filas no tienen por que ser consecutivos.
+    """
+    if connection.dialect.insert_executemany_returning_sort_by_parameter_order:
+        resultado = connection.execute(
+            notificaciones.insert().returning(notificaciones.c.id, sort_by_parameter_order=True), filas,
+        )
+        return list(resultado.scalars())
+    return [connection.execute(notificaciones.insert().values(fila)).inserted_primary_key[0] for fila in filas]
+
+
+def encolar_notificaciones(connection: Connection, filas: List[dict]):
+    """
+    Inserta notificaciones pendientes de envio y las publica en tiempo real al confirmar.
+    Cada fila necesita usuario_id, tipo_notificacion_canal, destino, asunto y mensaje.
+    """
+    if not filas:
+        return
+    filas = [{"estado_envio": "pendiente", "leida": 0, **fila} for fila in filas]
+    ids = _insertar(connection, filas)
+    no_leidas.registrar_nuevas(connection, filas)
+    for id_notificacion, fila in zip(ids, filas):
+        # Mismas llaves que publica el despachador
+        mensaje = {columna.name: fila.get(columna.name) for columna in COLUMNAS_ENVIO}
+        mensaje["id"] = id_notificacion
+        mensaje["estado_envio"] = fila["estado_envio"]
+        al_confirmar(connection, partial(hub_notificaciones.publicar_desde_hilo, fila["usuario_id"], mensaje))
+    al_confirmar(connection, despachador_notificaciones.avisar)
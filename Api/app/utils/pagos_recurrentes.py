@@ -0,0 +1,293 @@
+# app/utils/pagos_recurrentes.py
+# Programador de pagos fijos (pagos_programados).
+#
+# Mantiene en memoria un min-heap con los pagos activos mas proximos a vencer
+# (una ventana de VENTANA_PAGOS elementos leida por indice, no toda la tabla).
+# La tarea de fondo duerme hasta que vence el primero del heap, registra la
+# transaccion si registrar_automaticamente = 1 y avanza proxima_fecha_vencimiento
+# segun la frecuencia. Cuando la ventana se vacia se lee la siguiente.
+#
+# Con varios workers cada uno tiene su heap; el UPDATE que avanza la fecha
+# solo aplica si proxima_fecha_vencimiento no ha cambiado, asi que un pago
+# vencido lo procesa un solo worker.
+import asyncio
+import calendar
+import heapq
+import os
+import threading
+from datetime import date, datetime, timedelta, time as dtime
+from typing import Optional
+from sqlalchemy import select, and_, or_
+from sqlalchemy.engine import Connection
+from app.config.db import engine
+from app.model.pagosProgramados import pagos_programados
+from app.model.transaccion import transacciones
+from app.utils import resumen_mensual
+
+# Cuantos pagos se cargan en el heap por lectura
+VENTANA_PAGOS = int(os.getenv("PAGOS_VENTANA", "10000"))
+# Cada cuanto se vuelve a leer la ventana aunque no haya vencimientos
+# (recoge cambios hechos desde otros workers)
+RECARGA_SEGUNDOS = float(os.getenv("PAGOS_RECARGA_SEGUNDOS", "600"))
+PROGRAMADOR_ACTIVO = os.getenv("PROGRAMADOR_PAGOS", "1") == "1"
+
+
+def _dia_del_mes(anio: int, mes: int, dia: int) -> date:
+    # Si el mes no tiene ese dia (31 en abril) se usa el ultimo dia del mes
+    return date(anio, mes, min(dia, calendar.monthrange(anio, mes)[1]))
+
+
+def siguiente_vencimiento(fecha: date, frecuencia: str, dia_vencimiento: int) -> date:
+    if frecuencia == "diario":
+        return fecha + timedelta(days=1)
+    if frecuencia == "semanal":
+        return fecha + timedelta(days=7)
+    if frecuencia == "mensual":
+        anio, mes = (fecha.year + 1, 1) if fecha.month == 12 else (fecha.year, fecha.month + 1)
+        return _dia_del_mes(anio, mes, dia_vencimiento)
+    if frecuencia == "anual":
+        return _dia_del_mes(fecha.year + 1, fecha.month, dia_vencimiento)
+    raise ValueError(f"Frecuencia desconocida: {frecuencia}")
+
+
+def primer_vencimiento(frecuencia: str, dia_vencimiento: int, hoy: Optional[date] = None) -> date:
+    """
+    Primera fecha de vencimiento a partir de hoy para un pago nuevo.
+    """
+    hoy = hoy or date.today()
+    if frecuencia == "diario":
+        return hoy
+    if frecuencia == "semanal":
+        dia_semana = (dia_vencimiento - 1) % 7 + 1
+        return hoy + timedelta(days=(dia_semana - hoy.isoweekday()) % 7)
+    candidato = _dia_del_mes(hoy.year, hoy.month, dia_vencimiento)
+    if candidato >= hoy:
+        return candidato
+    return siguiente_vencimiento(candidato, frecuencia, dia_vencimiento)
+
+
+def procesar_pago(connection: Connection, pago_id: int, fecha_esperada: date, hoy: date):
+    """
+    Registra los vencimientos atrasados de un pago (hasta hoy) y avanza su fecha.
+    Regresa (procesado, nueva proxima_fecha_vencimiento o None si ya no esta activo).
+    """
+    pago = connection.execute(
+        select(pagos_programados).where(
+            pagos_programados.c.id == pago_id,
+            pagos_programados.c.activo == 1,
+        )
+    ).first()
+    if pago is None or pago.proxima_fecha_vencimiento != fecha_esperada:
+        # Se borro, se desactivo o alguien mas ya lo avanzo
+        return False, None
+
+    vencimientos = []
+    proxima = pago.proxima_fecha_vencimiento
+    while proxima <= hoy and (pago.fecha_fin is None or proxima <= pago.fecha_fin):
+        vencimientos.append(proxima)
+        proxima = siguiente_vencimiento(proxima, pago.frecuencia, pago.dia_vencimiento)
+    sigue_activo = pago.fecha_fin is None or proxima <= pago.fecha_fin
+
+    # Se reclama el pago: solo un worker logra cambiar la fecha esperada
+    result = connection.execute(
+        pagos_programados.update()
+        .where(
+            pagos_programados.c.id == pago_id,
+            pagos_programados.c.proxima_fecha_vencimiento == fecha_esperada,
+        )
+        .values(proxima_fecha_vencimiento=proxima, activo=1 if sigue_activo else 0)
+    )
+    if result.rowcount == 0:
+        return False, None
+
+    if pago.registrar_automaticamente and vencimientos:
+        filas = [{
+            "usuario_id": pago.usuario_id,
+            "categoria_id": pago.categoria_id,
+            "monto": pago.monto,
+            "fecha_transaccion": vencimiento,
+            "descripcion": pago.descripcion,
+            "metadatos": {"pago_programado_id": pago_id},
+            "pendiente_sincronizacion": 0,
+        } for vencimiento in vencimientos]
+        connection.execute(transacciones.insert(), filas)
+        resumen_mensual.registrar_lote(connection, filas)
+
+    return True, (proxima if sigue_activo else None)
+
+
+class ProgramadorPagos:
+    def __init__(self, engine, ventana: int = VENTANA_PAGOS):
+        self.engine = engine
+        self.ventana = ventana
+        self._heap = []
+        # pago_id -> fecha vigente; las entradas del heap que no coinciden se ignoran
+        self._vigentes = {}
+        # Ultimo (fecha, id) leido; lo que este despues se carga en la siguiente ventana
+        self._horizonte = None
+        self._ventana_completa = False
+        self._lock = threading.Lock()
+        self._despertar = None
+        self._loop = None
+        self._tarea = None
+        self.procesados = 0
+
+    def _empujar(self, pago_id: int, fecha: date):
+        self._vigentes[pago_id] = fecha
+        heapq.heappush(self._heap, (fecha, pago_id))
+
+    def cargar_ventana(self, connection: Connection, reiniciar: bool = False):
+        """
+        Lee los siguientes `ventana` pagos activos por el indice
+        (activo, proxima_fecha_vencimiento, id).
+        """
+        with self._lock:
+            if reiniciar:
+                self._heap.clear()
+                self._vigentes.clear()
+                self._horizonte = None
+            horizonte = self._horizonte
+        consulta = select(pagos_programados.c.id, pagos_programados.c.proxima_fecha_vencimiento).where(
+            pagos_programados.c.activo == 1,
+            pagos_programados.c.proxima_fecha_vencimiento.is_not(None),
+        )
+        if horizonte is not None:
+            fecha, pago_id = horizonte
+            consulta = consulta.where(or_(
+                pagos_programados.c.proxima_fecha_vencimiento > fecha,
+                and_(pagos_programados.c.proxima_fecha_vencimiento == fecha, pagos_programados.c.id > pago_id),
+            ))
+        filas = connection.execute(
+            consulta.order_by(pagos_programados.c.proxima_fecha_vencimiento, pagos_programados.c.id).limit(self.ventana)
+        ).fetchall()
+        with self._lock:
+            for fila in filas:
+                self._empujar(fila.id, fila.proxima_fecha_vencimiento)
+            if filas:
+                self._horizonte = (filas[-1].proxima_fecha_vencimiento, filas[-1].id)
+            # Si llegaron menos que la ventana ya no hay nada despues del horizonte
+            self._ventana_completa = len(filas) < self.ventana
+        return len(filas)
+
+    def programar(self, pago_id: int, fecha: Optional[date]):
+        """
+        Lo llaman los endpoints al crear o actualizar un pago.
+        Solo entra al heap si cae dentro de la ventana cargada.
+        """
+        with self._lock:
+            if fecha is None:
+                self._vigentes.pop(pago_id, None)
+                return
+            dentro = self._ventana_completa or self._horizonte is None or (fecha, pago_id) <= self._horizonte
+            if not dentro:
+                self._vigentes.pop(pago_id, None)
+                return
+            self._empujar(pago_id, fecha)
+            es_el_primero = self._heap[0] == (fecha, pago_id)
+        if es_el_primero:
+            self._avisar()
+
+    def cancelar(self, pago_id: int):
+        with self._lock:
+            self._vigentes.pop(pago_id, None)
+
+    def _avisar(self):
+        if self._loop is not None and self._despertar is not None:
+            self._loop.call_soon_threadsafe(self._despertar.set)
+
+    def _sacar_vencidos(self, hoy: date) -> list:
+        vencidos = []
+        with self._lock:
+            while self._heap and self._heap[0][0] <= hoy:
+                fecha, pago_id = heapq.heappop(self._heap)
+                if self._vigentes.get(pago_id) == fecha:
+                    del self._vigentes[pago_id]
+                    vencidos.append((pago_id, fecha))
+        return vencidos
+
+    def proximo_vencimiento(self) -> Optional[date]:
+        with self._lock:
+            while self._heap and self._vigentes.get(self._heap[0][1]) != self._heap[0][0]:
+                heapq.heappop(self._heap)
+            return self._heap[0][0] if self._heap else None
+
+    def procesar_vencidos(self, hoy: Optional[date] = None) -> int:
+        """
+        Procesa todo lo que vence hasta hoy. Cada pago va en su propia transaccion
+        para que un error en uno no detenga a los demas.
+        """
+        hoy = hoy or date.today()
+        procesados = 0
+        while True:
+            vencidos = self._sacar_vencidos(hoy)
+            if not vencidos:
+                with self._lock:
+                    necesita_mas = not self._heap and not self._ventana_completa
+                if necesita_mas:
+                    with self.engine.connect() as connection:
+                        if self.cargar_ventana(connection):
+                            continue
+                break
+            for pago_id, fecha in vencidos:
+                try:
+                    with self.engine.begin() as connection:
+                        procesado, nueva_fecha = procesar_pago(connection, pago_id, fecha, hoy)
+                except Exception as e:
+                    print(f"Error procesando el pago programado {pago_id}: {e}")
+                    continue
+                if procesado:
+                    procesados += 1
+                if nueva_fecha is not None:
+                    self.programar(pago_id, nueva_fecha)
+        self.procesados += procesados
+        return procesados
+
+    async def _ciclo(self):
+        ultima_recarga = datetime.now()
+        while True:
+            await asyncio.to_thread(self.procesar_vencidos)
+            self._despertar.clear()
+            # Se duerme hasta la medianoche del siguiente vencimiento (o hasta la recarga)
+            espera = RECARGA_SEGUNDOS
+            proximo = self.proximo_vencimiento()
+            if proximo is not None:
+                hasta = (datetime.combine(proximo, dtime.min) - datetime.now()).total_seconds()
+                espera = max(0.0, min(espera, hasta))
+            try:
+                await asyncio.wait_for(self._despertar.wait(), timeout=espera)
+            except asyncio.TimeoutError:
+                pass
+            if (datetime.now() - ultima_recarga).total_seconds() >= RECARGA_SEGUNDOS:
+                await asyncio.to_thread(self._recargar)
+                ultima_recarga = datetime.now()
+
+    def _recargar(self):
+        with self.engine.connect() as connection:
+            self.cargar_ventana(connection, reiniciar=True)
+
+    async def iniciar(self):
+        self._loop = asyncio.get_running_loop()
+        self._despertar = asyncio.Event()
+        await asyncio.to_thread(self._recargar)
+        self._tarea = asyncio.create_task(self._ciclo())
+
+    async def detener(self):
+        if self._tarea is not None:
+            self._tarea.cancel()
+            try:
+                await self._tarea
+            except asyncio.CancelledError:
+                pass
+            self._tarea = None
+
+    def estado(self) -> dict:
+        with self._lock:
+            return {
+                "en_heap": len(self._vigentes),
+                "horizonte": self._horizonte[0] if self._horizonte else None,
+                "ventana_completa": self._ventana_completa,
+                "procesados": self.procesados,
+            }
+
+
+programador_pagos = ProgramadorPagos(engine)
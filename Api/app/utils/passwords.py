@@ -0,0 +1,147 @@
+# app/utils/passwords.py
+# Hash y verificacion de contraseñas fuera del event loop.
+#
+# PBKDF2 es CPU puro: si se calcula dentro de un handler async detiene todo el
+# worker mientras dura. Aqui se manda a un pool propio (hilos o procesos) de
+# tamaño fijo con una cola limitada; si la cola se llena se rechaza con
+# PoolHashSaturado (main.py lo convierte en 503) en lugar de acumular logins.
+# Solo hay versiones async: un handler sync que esperara aqui ocuparia un hilo
+# del threadpool por cada login en cola y detendria los demas endpoints sync.
+#
+# El metodo y costo del hash se configuran con PASSWORD_HASH_METODO. Los hashes
+# guardados con otro metodo se rehacen en el siguiente login correcto.
+import asyncio
+import os
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, ProcessPoolExecutor
+from werkzeug.security import generate_password_hash, check_password_hash
+
+# Formato de werkzeug: "pbkdf2:sha256:<iteraciones>" o "scrypt:<n>:<r>:<p>"
+PASSWORD_HASH_METODO = os.getenv("PASSWORD_HASH_METODO", "pbkdf2:sha256:600000")
+PASSWORD_SALT_LENGTH = int(os.getenv("PASSWORD_SALT_LENGTH", "16"))
+# "thread" alcanza porque hashlib suelta el GIL durante PBKDF2; "process" aisla por completo
+PASSWORD_POOL_TIPO = os.getenv("PASSWORD_POOL_TIPO", "thread").strip().lower()
+PASSWORD_POOL_TRABAJADORES = int(os.getenv("PASSWORD_POOL_TRABAJADORES", str(min(4, os.cpu_count() or 1))))
+# Trabajos que pueden esperar turno ademas de los que se estan ejecutando
+PASSWORD_POOL_MAX_COLA = int(os.getenv("PASSWORD_POOL_MAX_COLA", "64"))
+
+
+class PoolHashSaturado(Exception):
+    pass
+
+
+def _ejecutar_medido(funcion, args):
+    # Corre dentro del pool; regresa cuando empezo y cuanto tardo para las metricas
+    inicio = time.monotonic()
+    resultado = funcion(*args)
+    return resultado, inicio, time.monotonic() - inicio
+
+
+def _hashear(password: str, metodo: str, salt_length: int) -> str:
+    return generate_password_hash(password, metodo, salt_length)
+
+
+class PoolHash:
+    def __init__(self, tipo: str = PASSWORD_POOL_TIPO, trabajadores: int = PASSWORD_POOL_TRABAJADORES,
+                 max_cola: int = PASSWORD_POOL_MAX_COLA):
+        self.tipo = tipo
+        self.trabajadores = trabajadores
+        self.max_cola = max_cola
+        self._executor = None
+        self._lock = threading.Lock()
+        self.en_curso = 0
+        self.completados = 0
+        self.rechazados = 0
+        self.espera_total = 0.0
+        self.espera_maxima = 0.0
+        self.ejecucion_total = 0.0
+
+    def _obtener_executor(self):
+        with self._lock:
+            if self._executor is None:
+                clase = ProcessPoolExecutor if self.tipo == "process" else ThreadPoolExecutor
+                self._executor = clase(max_workers=self.trabajadores)
+            return self._executor
+
+    def _terminado(self, encolado: float, future):
+        with self._lock:
+            self.en_curso -= 1
+            if future.cancelled() or future.exception() is not None:
+                return
+            _, inicio, duracion = future.result()
+            espera = max(0.0, inicio - encolado)
+            self.completados += 1
+            self.espera_total += espera
+            self.espera_maxima = max(self.espera_maxima, espera)
+            self.ejecucion_total += duracion
+
+    def enviar(self, funcion, *args):
+        executor = self._obtener_executor()
+        with self._lock:
+            if self.en_curso >= self.trabajadores + self.max_cola:
+                self.rechazados += 1
+                raise PoolHashSaturado("Demasiadas operaciones de contraseña en espera")
+            self.en_curso += 1
+        encolado = time.monotonic()
+        try:
+            future = executor.submit(_ejecutar_medido, funcion, args)
+        except Exception:
+            with self._lock:
+                self.en_curso -= 1
+            raise
+        future.add_done_callback(lambda f: self._terminado(encolado, f))
+        return future
+
+    async def ejecutar_async(self, funcion, *args):
+        resultado = await asyncio.wrap_future(self.enviar(funcion, *args))
+        return resultado[0]
+
+    def cerrar(self):
+        with self._lock:
+            executor, self._executor = self._executor, None
+        if executor is not None:
+            executor.shutdown(wait=False, cancel_futures=True)
+
+    def estado(self) -> dict:
+        with self._lock:
+            return {
+                "tipo": self.tipo,
+                "trabajadores": self.trabajadores,
+                "max_cola": self.max_cola,
+                "en_curso": self.en_curso,
+                "en_cola": max(0, self.en_curso - self.trabajadores),
+                "completados": self.completados,
+                "rechazados": self.rechazados,
+                "espera_promedio_ms": round(self.espera_total * 1000 / self.completados, 3) if self.completados else 0.0,
+                "espera_maxima_ms": round(self.espera_maxima * 1000, 3),
+                "ejecucion_promedio_ms": round(self.ejecucion_total * 1000 / self.completados, 3) if self.completados else 0.0,
+                "metodo": PREFIJO_HASH,
+            }
+
+
+pool_hash = PoolHash()
+
+
+async def hashear_async(password: str) -> str:
+    return await pool_hash.ejecutar_async(_hashear, password, PASSWORD_HASH_METODO, PASSWORD_SALT_LENGTH)
+
+
+async def verificar_async(password_hash: str, password: str) -> bool:
+    return await pool_hash.ejecutar_async(check_password_hash, password_hash, password)
+
+
+def _prefijo(password_hash: str) -> str:
+    return password_hash.split("$", 1)[0]
+
+
+# werkzeug escribe los parametros resueltos en el prefijo ("scrypt" queda como
+# "scrypt:32768:8:1"), asi que se compara contra un hash real del metodo configurado
+PREFIJO_HASH = _prefijo(_hashear("", PASSWORD_HASH_METODO, PASSWORD_SALT_LENGTH))
+
+
+def necesita_rehash(password_hash: str) -> bool:
+    """
+    True si el hash guardado se hizo con un metodo o costo distinto al configurado.
+    """
+    return _prefijo(password_hash) != PREFIJO_HASH
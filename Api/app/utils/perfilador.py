@@ -0,0 +1,221 @@
+# app/utils/perfilador.py
+# Perfilador por muestreo para ver en que se va el tiempo de un worker vivo.
+#
+# Un hilo aparte toma cada INTERVALO_MS la pila de todos los hilos con
+# sys._current_frames() y cuenta las pilas repetidas. No instrumenta llamadas,
+# asi que el costo es el del muestreo y solo mientras dura la sesion. El
+# resultado sale en formato "collapsed" (una linea "hilo;f1;f2;f3 N" por pila)
+# que entienden flamegraph.pl, speedscope e inferno.
+#
+# Dos formas de usarlo, ambas con el header X-Admin-Token = PERFILADOR_TOKEN:
+# - GET /lanaapp/admin/perfil?segundos=10: todo el worker durante la ventana.
+# - ?profile=1 (o header X-Profile: 1) en cualquier request: se perfila solo
+#   ese request y en lugar de su respuesta se regresan las pilas. Del hilo del
+#   event loop solo cuentan las muestras donde corre este request; de los
+#   demas hilos las que no estan esperando trabajo (un handler sync de otro
+#   request que corra al mismo tiempo tambien puede aparecer).
+#   Limitacion: en el loop solo se ve lo que corre dentro de la pila de este
+#   middleware. Lo que corre en tareas hijas no pasa por ella y no aparece; en
+#   StreamingResponse Starlette manda el cuerpo desde un task group, asi que
+#   el export de transacciones y el stream SSE salen casi sin muestras. Para
+#   esos se usa /lanaapp/admin/perfil.
+#
+# El middleware y el endpoint siempre estan instalados, asi se puede perfilar un
+# worker vivo sin reiniciarlo. Sin PERFILADOR_TOKEN ningun token es valido: el
+# endpoint responde 403 y el middleware deja pasar el request sin tocarlo.
+import os
+import secrets
+import sys
+import threading
+from collections import Counter
+from typing import Callable, Optional
+from urllib.parse import parse_qs
+
+PERFILADOR_TOKEN = os.getenv("PERFILADOR_TOKEN") or None
+PERFILADOR_INTERVALO_MS = float(os.getenv("PERFILADOR_INTERVALO_MS", "5"))
+# Un solo request dura pocos milisegundos: se muestrea mas seguido
+PERFILADOR_INTERVALO_REQUEST_MS = float(os.getenv("PERFILADOR_INTERVALO_REQUEST_MS", "1"))
+PERFILADOR_MAX_SEGUNDOS = float(os.getenv("PERFILADOR_MAX_SEGUNDOS", "60"))
+
+TIPO_CONTENIDO = "text/plain; charset=utf-8"
+
+# Donde se quedan los hilos sin trabajo (threadpool, selector del loop, colas)
+_ESPERAS = {"wait", "select", "poll", "_worker", "get", "sleep", "_recv", "accept"}
+
+# Una sesion a la vez por worker: dos muestreadores se medirian entre si
+_sesion = threading.Lock()
+
+
+class PerfiladorOcupado(Exception):
+    pass
+
+
+def token_valido(token: Optional[str]) -> bool:
+    return PERFILADOR_TOKEN is not None and token is not None and secrets.compare_digest(token, PERFILADOR_TOKEN)
+
+
+class Muestreador:
+    def __init__(self, intervalo_ms: float = PERFILADOR_INTERVALO_MS,
+                 filtro: Optional[Callable[[int, object], bool]] = None):
+        self.intervalo = intervalo_ms / 1000
+        # filtro(ident del hilo, frame actual) -> True si la muestra cuenta
+        self.filtro = filtro
+        self.pilas = Counter()
+        self.muestras = 0
+        self._etiquetas = {}
+        self._detener = threading.Event()
+        self._hilo = None
+
+    def _etiqueta(self, codigo) -> str:
+        etiqueta = self._etiquetas.get(codigo)
+        if etiqueta is None:
+            archivo = codigo.co_filename
+            # Rutas relativas al proyecto o al paquete para que la grafica se lea
+            for marca in ("/app/", "/site-packages/", "/lib/python"):
+                indice = archivo.rfind(marca)
+                if indice >= 0:
+                    archivo = archivo[indice + 1:]
+                    break
+            etiqueta = f"{codigo.co_qualname} ({archivo}:{codigo.co_firstlineno})"
+            self._etiquetas[codigo] = etiqueta
+        return etiqueta
+
+    def _muestrear(self):
+        propio = threading.get_ident()
+        nombres = {hilo.ident: hilo.name for hilo in threading.enumerate()}
+        for ident, frame in sys._current_frames().items():
+            if ident == propio:
+                continue
+            if self.filtro is not None and not self.filtro(ident, frame):
+                continue
+            codigos = []
+            while frame is not None:
+                codigos.append(frame.f_code)
+                frame = frame.f_back
+            codigos.reverse()
+            self.pilas[(nombres.get(ident, str(ident)), tuple(codigos))] += 1
+        self.muestras += 1
+
+    def _ciclo(self):
+        while not self._detener.wait(self.intervalo):
+            self._muestrear()
+
+    def iniciar(self):
+        if not _sesion.acquire(blocking=False):
+            raise PerfiladorOcupado("Ya hay una sesion del perfilador en este worker")
+        self._hilo = threading.Thread(target=self._ciclo, name="perfilador", daemon=True)
+        self._hilo.start()
+
+    def detener(self):
+        self._detener.set()
+        if self._hilo is not None:
+            self._hilo.join()
+            self._hilo = None
+            _sesion.release()
+
+    def collapsed(self) -> str:
+        lineas = []
+        for (hilo, codigos), veces in self.pilas.most_common():
+            marcos = ";".join(self._etiqueta(codigo) for codigo in codigos)
+            lineas.append(f"{hilo};{marcos} {veces}")
+        return "\n".join(lineas) + "\n"
+
+
+def _esperando(frame) -> bool:
+    codigo = frame.f_code
+    return codigo.co_name in _ESPERAS and (
+        "threading" in codigo.co_filename
+        or "selectors" in codigo.co_filename
+        or "queue" in codigo.co_filename
+        or "concurrent" in codigo.co_filename
+        or "socket" in codigo.co_filename
+    )
+
+
+def perfilar_ventana(segundos: float, intervalo_ms: float = PERFILADOR_INTERVALO_MS) -> Muestreador:
+    """
+    Bloquea `segundos` muestreando todo el worker (llamar con asyncio.to_thread).
+    Los hilos que solo esperan trabajo no se cuentan.
+    """
+    muestreador = Muestreador(intervalo_ms, filtro=lambda ident, frame: not _esperando(frame))
+    muestreador.iniciar()
+    try:
+        muestreador._detener.wait(min(segundos, PERFILADOR_MAX_SEGUNDOS))
+    finally:
+        muestreador.detener()
+    return muestreador
+
+
+def _pedido(scope) -> bool:
+    consulta = scope.get("query_string", b"")
+    if b"profile=" in consulta and parse_qs(consulta.decode("latin-1")).get("profile", [""])[0] in ("1", "true"):
+        return True
+    for nombre, valor in scope["headers"]:
+        if nombre == b"x-profile":
+            return valor in (b"1", b"true")
+    return False
+
+
+def _token(scope) -> Optional[str]:
+    for nombre, valor in scope["headers"]:
+        if nombre == b"x-admin-token":
+            return valor.decode("latin-1")
+    return None
+
+
+class PerfiladorMiddleware:
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        # Sin ?profile=1 el costo es revisar la query y los headers
+        if scope["type"] != "http" or not _pedido(scope) or not token_valido(_token(scope)):
+            await self.app(scope, receive, send)
+            return
+
+        marca = sys._getframe()
+        hilo_loop = threading.get_ident()
+
+        def filtro(ident, frame):
+            if ident != hilo_loop:
+                return not _esperando(frame)
+            # En el loop solo cuenta si la pila pasa por este middleware (este request);
+            # las tareas hijas (cuerpo de StreamingResponse) tienen su propia pila y no cuentan
+            while frame is not None:
+                if frame is marca:
+                    return True
+                frame = frame.f_back
+            return False
+
+        muestreador = Muestreador(PERFILADOR_INTERVALO_REQUEST_MS, filtro=filtro)
+        try:
+            muestreador.iniciar()
+        except PerfiladorOcupado:
+            await self.app(scope, receive, send)
+            return
+
+        estado = 500
+
+        async def descartar(mensaje):
+            nonlocal estado
+            # La respuesta original se descarta; solo se guarda el estado
+            if mensaje["type"] == "http.response.start":
+                estado = mensaje["status"]
+
+        try:
+            await self.app(scope, receive, descartar)
+        finally:
+            muestreador.detener()
+
+        cuerpo = muestreador.collapsed().encode()
+        await send({
+            "type": "http.response.start",
+            "status": 200,
+            "headers": [
+                (b"content-type", TIPO_CONTENIDO.encode()),
+                (b"content-length", str(len(cuerpo)).encode()),
+                (b"x-perfil-muestras", str(muestreador.muestras).encode()),
+                (b"x-perfil-estado-original", str(estado).encode()),
+            ],
+        })
+        await send({"type": "http.response.body", "body": cuerpo})
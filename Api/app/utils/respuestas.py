@@ -0,0 +1,149 @@
+# app/utils/respuestas.py
+# Camino rapido para respuestas JSON.
+#
+# Por defecto FastAPI valida lo que regresa el handler contra response_model,
+# lo pasa por jsonable_encoder y lo codifica con json de la libreria estandar.
+# Para listas grandes eso es convertir cada Decimal/fecha tres veces.
+#
+# - RespuestaJSON: clase de respuesta de la app, codifica con orjson.
+# - SerializadorFilas: se construye una vez por schema y convierte Rows de
+#   SQLAlchemy directo a dicts con solo los campos del schema (en su orden),
+#   listos para orjson.
+# - responder(): con RESPUESTA_RAPIDA regresa los bytes ya hechos (FastAPI no
+#   vuelve a validar ni a codificar); sin ella regresa el contenido tal cual y
+#   se usa el camino normal con response_model.
+#
+# - fields=: SerializadorFilas.parcial() arma (y guarda) un schema recortado
+#   con solo los campos pedidos; sus columnas_sql() van al select() para no
+#   leer de la base lo que no se va a mandar.
+#
+# Si orjson no esta instalado todo cae al json estandar.
+import json
+import os
+import typing
+from decimal import Decimal
+from typing import Any, Dict, Iterable, Optional
+from fastapi import HTTPException, Response
+from fastapi.responses import JSONResponse
+from pydantic import create_model
+from starlette.status import HTTP_400_BAD_REQUEST
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+RESPUESTA_RAPIDA = os.getenv("RESPUESTA_RAPIDA", "1") == "1"
+# Combinaciones de fields= que se guardan por schema
+MAX_PARCIALES = 256
+
+
+def _default(valor):
+    # Lo que orjson no sabe codificar; los montos son float en los schemas
+    if isinstance(valor, Decimal):
+        return float(valor)
+    if orjson is None and hasattr(valor, "isoformat"):
+        return valor.isoformat()
+    raise TypeError(f"No se puede convertir {type(valor).__name__} a JSON")
+
+
+def a_json(contenido: Any) -> bytes:
+    if orjson is not None:
+        return orjson.dumps(contenido, default=_default, option=orjson.OPT_NON_STR_KEYS)
+    return json.dumps(contenido, default=_default, ensure_ascii=False, separators=(",", ":")).encode()
+
+
+class RespuestaJSON(JSONResponse):
+    def render(self, content: Any) -> bytes:
+        return a_json(content)
+
+
+def _es_float(anotacion) -> bool:
+    if anotacion is float:
+        return True
+    return typing.get_origin(anotacion) is typing.Union and float in typing.get_args(anotacion)
+
+
+class SerializadorFilas:
+    """
+    Convierte Rows al formato de `schema` sin pasar por pydantic.
+    columnas: {campo del schema: columna de la tabla} cuando no se llaman igual.
+    """
+
+    def __init__(self, schema, columnas: Optional[Dict[str, str]] = None, parcial: bool = False):
+        self._columnas = columnas or {}
+        self.schema = schema
+        # True cuando es un recorte de fields=; su salida ya no cumple el response_model completo
+        self.es_parcial = parcial
+        self._parciales = {}
+        self._campos = []
+        for campo, info in schema.model_fields.items():
+            self._campos.append((campo, self._columnas.get(campo, campo), _es_float(info.annotation)))
+
+    def parcial(self, campos: frozenset) -> "SerializadorFilas":
+        """
+        Serializador con solo `campos` (en el orden del schema original).
+        """
+        serializador = self._parciales.get(campos)
+        if serializador is None:
+            definicion = {
+                campo: (info.annotation, info)
+                for campo, info in self.schema.model_fields.items() if campo in campos
+            }
+            nombre = f"{self.schema.__name__}Parcial_{'_'.join(sorted(campos))}"
+            serializador = SerializadorFilas(create_model(nombre, **definicion), self._columnas, parcial=True)
+            if len(self._parciales) < MAX_PARCIALES:
+                self._parciales[campos] = serializador
+        return serializador
+
+    def seleccionar(self, fields: Optional[str]) -> "SerializadorFilas":
+        """
+        Interpreta el parametro fields= ("id,monto,fecha_transaccion").
+        Sin fields regresa el serializador completo.
+        """
+        if fields is None:
+            return self
+        campos = frozenset(campo.strip() for campo in fields.split(",") if campo.strip())
+        validos = self.schema.model_fields.keys()
+        desconocidos = campos - validos
+        if not campos or desconocidos:
+            raise HTTPException(
+                status_code=HTTP_400_BAD_REQUEST,
+                detail=f"Campos inválidos: {', '.join(sorted(desconocidos)) or 'ninguno'}. Disponibles: {', '.join(validos)}",
+            )
+        if campos == validos:
+            return self
+        return self.parcial(campos)
+
+    def columnas_sql(self, tabla, *extra: str) -> list:
+        """
+        Columnas de `tabla` para el select(): las del schema mas las que el
+        handler necesita internamente (por ejemplo las del cursor).
+        """
+        nombres = [columna for _, columna, _ in self._campos]
+        nombres += [nombre for nombre in extra if nombre not in nombres]
+        return [tabla.c[nombre] for nombre in nombres]
+
+    def fila(self, row) -> dict:
+        mapping = row._mapping
+        resultado = {}
+        for campo, columna, es_float in self._campos:
+            valor = mapping[columna]
+            if es_float and valor is not None:
+                valor = float(valor)
+            resultado[campo] = valor
+        return resultado
+
+    def lista(self, rows: Iterable) -> list:
+        fila = self.fila
+        return [fila(row) for row in rows]
+
+
+def responder(contenido: Any, status_code: int = 200, directo: bool = False):
+    """
+    directo=True obliga a mandar los bytes (respuestas con fields=, que no
+    pasarian la validacion del response_model completo).
+    """
+    if RESPUESTA_RAPIDA or directo:
+        return Response(content=a_json(contenido), status_code=status_code, media_type="application/json")
+    return contenido
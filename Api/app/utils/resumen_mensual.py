@@ -0,0 +1,167 @@
+# app/utils/resumen_mensual.py
+# Mantenimiento incremental de la tabla resumen_mensual.
+# Cada escritura de transacciones manda aqui sus deltas (+monto/+1 al crear,
+# -monto/-1 al borrar, ambos al actualizar) y se aplican con un upsert nativo
+# del motor, asi los resumenes cuestan O(categorias) en lugar de O(transacciones).
+# En motores sin upsert nativo soportado aqui se hace UPDATE y, si no habia fila,
+# INSERT (dos escrituras que compiten contra otra transaccion que inserte la
+# misma llave; la llave unica hace fallar a la segunda en lugar de duplicar).
+#
+# Reconstruccion completa (backfill): python -m app.utils.resumen_mensual [--usuario-id N]
+import argparse
+from decimal import Decimal
+from typing import Iterable, Mapping, Optional
+from sqlalchemy import select, func, extract, insert, and_
+from sqlalchemy.engine import Connection
+from app.database.connection import al_confirmar
+from app.model.resumenMensual import resumen_mensual
+from app.model.transaccion import transacciones
+from app.utils import budget_checker
+
+COLUMNAS_LLAVE = ["usuario_id", "año", "mes", "categoria_id"]
+
+
+def _llave(fila: Mapping) -> tuple:
+    fecha = fila["fecha_transaccion"]
+    return (fila["usuario_id"], fecha.year, fecha.month, fila["categoria_id"])
+
+
+def _monto(fila: Mapping) -> Decimal:
+    # El schema usa float, se pasa por str para no arrastrar errores de redondeo
+    return Decimal(str(fila["monto"]))
+
+
+def _upsert(connection: Connection):
+    """
+    Regresa el INSERT ... ON DUPLICATE KEY UPDATE (MySQL) o ON CONFLICT (SQLite)
+    que suma los deltas sobre la fila existente, o None si el motor no tiene uno.
+    """
+    dialecto = connection.dialect.name
+    if dialecto == "mysql":
+        from sqlalchemy.dialects.mysql import insert as mysql_insert
+        stmt = mysql_insert(resumen_mensual)
+        return stmt.on_duplicate_key_update(
+            total=resumen_mensual.c.total + stmt.inserted.total,
+            cantidad=resumen_mensual.c.cantidad + stmt.inserted.cantidad,
+        )
+    if dialecto == "sqlite":
+        from sqlalchemy.dialects.sqlite import insert as sqlite_insert
+        stmt = sqlite_insert(resumen_mensual)
+        return stmt.on_conflict_do_update(
+            index_elements=COLUMNAS_LLAVE,
+            set_={
+                "total": resumen_mensual.c.total + stmt.excluded.total,
+                "cantidad": resumen_mensual.c.cantidad + stmt.excluded.cantidad,
+            },
+        )
+    return None
+
+
+def _actualizar_o_insertar(connection: Connection, parametros: list):
+    """
+    Upsert portable, fila por fila: UPDATE sumando el delta y INSERT si no existia.
+    """
+    for fila in parametros:
+        resultado = connection.execute(
+            resumen_mensual.update()
+            .where(and_(*(resumen_mensual.c[columna] == fila[columna] for columna in COLUMNAS_LLAVE)))
+            .values(total=resumen_mensual.c.total + fila["total"],
+                    cantidad=resumen_mensual.c.cantidad + fila["cantidad"])
+        )
+        if resultado.rowcount == 0:
+            connection.execute(insert(resumen_mensual).values(fila))
+
+
+def aplicar_deltas(connection: Connection, deltas: dict):
+    """
+    deltas: {(usuario_id, año, mes, categoria_id): (total, cantidad)}
+    Todos los deltas se mandan en un solo executemany.
+    """
+    parametros = [
+        dict(zip(COLUMNAS_LLAVE, llave), total=total, cantidad=cantidad)
+        for llave, (total, cantidad) in deltas.items()
+        if total or cantidad
+    ]
+    if parametros:
+        upsert = _upsert(connection)
+        if upsert is None:
+            _actualizar_o_insertar(connection, parametros)
+        else:
+            connection.execute(upsert, parametros)
+        budget_checker.verificar_excesos(connection, deltas)
+    # El consumo de presupuesto de esos meses ya no es valido
+    for usuario_id, anio, mes in {llave[:3] for llave in deltas}:
+        budget_checker.invalidar_consumo(connection, usuario_id, anio, mes)
+
+
+def _acumular(deltas: dict, fila: Mapping, signo: int):
+    llave = _llave(fila)
+    total, cantidad = deltas.get(llave, (Decimal("0"), 0))
+    deltas[llave] = (total + signo * _monto(fila), cantidad + signo)
+
+
+def registrar_cambio(connection: Connection, anterior: Optional[Mapping] = None, nueva: Optional[Mapping] = None):
+    """
+    Actualiza el resumen por una transaccion creada (solo nueva), borrada
+    (solo anterior) o actualizada (ambas). Las filas necesitan usuario_id,
+    categoria_id, fecha_transaccion y monto.
+    """
+    deltas = {}
+    if anterior is not None:
+        _acumular(deltas, anterior, -1)
+    if nueva is not None:
+        _acumular(deltas, nueva, 1)
+    aplicar_deltas(connection, deltas)
+
+
+def registrar_lote(connection: Connection, filas: Iterable[Mapping]):
+    """
+    Version para la carga masiva: agrupa en memoria y hace un upsert por grupo.
+    """
+    deltas = {}
+    for fila in filas:
+        _acumular(deltas, fila, 1)
+    aplicar_deltas(connection, deltas)
+
+
+def reconstruir(connection: Connection, usuario_id: Optional[int] = None):
+    """
+    Vuelve a calcular el resumen desde cero con un INSERT ... SELECT agrupado.
+    """
+    borrar = resumen_mensual.delete()
+    origen = select(
+        transacciones.c.usuario_id,
+        extract("year", transacciones.c.fecha_transaccion).label("año"),
+        extract("month", transacciones.c.fecha_transaccion).label("mes"),
+        transacciones.c.categoria_id,
+        func.sum(transacciones.c.monto).label("total"),
+        func.count().label("cantidad"),
+    )
+    if usuario_id is not None:
+        borrar = borrar.where(resumen_mensual.c.usuario_id == usuario_id)
+        origen = origen.where(transacciones.c.usuario_id == usuario_id)
+    origen = origen.group_by(
+        transacciones.c.usuario_id,
+        extract("year", transacciones.c.fecha_transaccion),
+        extract("month", transacciones.c.fecha_transaccion),
+        transacciones.c.categoria_id,
+    )
+    connection.execute(borrar)
+    connection.execute(
+        insert(resumen_mensual).from_select(COLUMNAS_LLAVE + ["total", "cantidad"], origen)
+    )
+    if usuario_id is None:
+        al_confirmar(connection, budget_checker.cache_consumo.limpiar)
+    else:
+        budget_checker.invalidar_usuario(connection, usuario_id)
+
+
+if __name__ == "__main__":
+    from app.config.db import engine
+
+    parser = argparse.ArgumentParser(description="Reconstruye la tabla resumen_mensual")
+    parser.add_argument("--usuario-id", type=int, default=None)
+    args = parser.parse_args()
+    with engine.begin() as connection:
+        reconstruir(connection, args.usuario_id)
+    print("Resumen mensual reconstruido")
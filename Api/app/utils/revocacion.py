@@ -0,0 +1,181 @@
+# app/utils/revocacion.py
+# Revocacion de JWT (logout) sin una consulta a la base en cada request.
+#
+# Cada token lleva un jti. Al hacer logout el jti se guarda en
+# tokensjwtinvalidados (columna token_jwt) con la expiracion del token.
+# Cada worker mantiene un filtro de Bloom con los jti revocados que aun no
+# expiran: si el filtro dice "no esta" (el caso normal) el token es valido sin
+# tocar la base; si dice "puede estar" se confirma con una busqueda por indice.
+#
+# El filtro se reconstruye cada RECARGA_SEGUNDOS para ver los logout hechos en
+# otros workers; los del propio worker se agregan al momento. La misma tarea
+# borra las filas cuyo token ya expiro (ya no hace falta revocarlas).
+# Purga manual: python -m app.utils.revocacion
+import asyncio
+import hashlib
+import math
+import os
+import threading
+from datetime import datetime
+from sqlalchemy import select
+from sqlalchemy.engine import Connection
+from app.config.db import engine
+from app.database.connection import al_confirmar, abrir_conexion
+from app.model.tokensJWTInvalido import tokens_invalidos
+
+RECARGA_SEGUNDOS = float(os.getenv("REVOCACION_RECARGA_SEGUNDOS", "15"))
+PURGA_SEGUNDOS = float(os.getenv("REVOCACION_PURGA_SEGUNDOS", "3600"))
+# Tokens revocados que caben en el filtro con la tasa de falsos positivos indicada
+CAPACIDAD_FILTRO = int(os.getenv("REVOCACION_CAPACIDAD", "100000"))
+TASA_FALSOS_POSITIVOS = float(os.getenv("REVOCACION_TASA_ERROR", "0.001"))
+
+
+class FiltroBloom:
+    def __init__(self, capacidad: int, tasa_error: float = TASA_FALSOS_POSITIVOS):
+        capacidad = max(1, capacidad)
+        self.bits = max(64, int(-capacidad * math.log(tasa_error) / (math.log(2) ** 2)))
+        self.hashes = max(1, round(self.bits / capacidad * math.log(2)))
+        self._arreglo = bytearray((self.bits + 7) // 8)
+        self.elementos = 0
+
+    def _posiciones(self, valor: str):
+        # Doble hashing: k posiciones a partir de dos hashes de 64 bits
+        digest = hashlib.blake2b(valor.encode(), digest_size=16).digest()
+        h1 = int.from_bytes(digest[:8], "little")
+        h2 = int.from_bytes(digest[8:], "little") | 1
+        return [(h1 + i * h2) % self.bits for i in range(self.hashes)]
+
+    def agregar(self, valor: str):
+        for posicion in self._posiciones(valor):
+            self._arreglo[posicion >> 3] |= 1 << (posicion & 7)
+        self.elementos += 1
+
+    def puede_contener(self, valor: str) -> bool:
+        arreglo = self._arreglo
+        for posicion in self._posiciones(valor):
+            if not arreglo[posicion >> 3] & (1 << (posicion & 7)):
+                return False
+        return True
+
+
+def revocar(connection: Connection, jti: str, expiracion: datetime):
+    connection.execute(tokens_invalidos.insert().values(token_jwt=jti, fecha_expiracion_original=expiracion))
+    al_confirmar(connection, lambda: revocaciones.agregar(jti))
+
+
+def esta_revocado_en_base(connection: Connection, jti: str) -> bool:
+    return connection.execute(
+        select(tokens_invalidos.c.id).where(tokens_invalidos.c.token_jwt == jti).limit(1)
+    ).first() is not None
+
+
+def purgar_expirados(connection: Connection, ahora: datetime = None) -> int:
+    """
+    Borra los tokens revocados que ya expiraron por si solos.
+    """
+    ahora = ahora or datetime.utcnow()
+    return connection.execute(
+        tokens_invalidos.delete().where(tokens_invalidos.c.fecha_expiracion_original < ahora)
+    ).rowcount
+
+
+class RevocacionTokens:
+    def __init__(self, engine):
+        self.engine = engine
+        self._filtro = FiltroBloom(CAPACIDAD_FILTRO)
+        self._lock = threading.Lock()
+        # jti agregados mientras se reconstruye el filtro (se copian al nuevo)
+        self._durante_recarga = None
+        self._tarea = None
+        self.consultas_base = 0
+        self.falsos_positivos = 0
+        self.purgados = 0
+
+    def agregar(self, jti: str):
+        with self._lock:
+            self._filtro.agregar(jti)
+            if self._durante_recarga is not None:
+                self._durante_recarga.append(jti)
+
+    def recargar(self):
+        with self._lock:
+            self._durante_recarga = []
+        try:
+            with self.engine.connect() as connection:
+                jtis = connection.execute(
+                    select(tokens_invalidos.c.token_jwt)
+                    .where(tokens_invalidos.c.fecha_expiracion_original >= datetime.utcnow())
+                ).scalars().all()
+            nuevo = FiltroBloom(max(CAPACIDAD_FILTRO, 2 * len(jtis)))
+            for jti in jtis:
+                nuevo.agregar(jti)
+        finally:
+            with self._lock:
+                agregados, self._durante_recarga = self._durante_recarga, None
+        with self._lock:
+            for jti in agregados:
+                nuevo.agregar(jti)
+            self._filtro = nuevo
+
+    def esta_revocado(self, jti: str) -> bool:
+        # Camino comun: solo el filtro en memoria
+        if not self._filtro.puede_contener(jti):
+            return False
+        self.consultas_base += 1
+        with abrir_conexion() as connection:
+            revocado = esta_revocado_en_base(connection, jti)
+        if not revocado:
+            self.falsos_positivos += 1
+        return revocado
+
+    def purgar(self) -> int:
+        with self.engine.begin() as connection:
+            borrados = purgar_expirados(connection)
+        self.purgados += borrados
+        return borrados
+
+    async def _ciclo(self):
+        desde_purga = 0.0
+        while True:
+            await asyncio.sleep(RECARGA_SEGUNDOS)
+            try:
+                desde_purga += RECARGA_SEGUNDOS
+                if desde_purga >= PURGA_SEGUNDOS:
+                    await asyncio.to_thread(self.purgar)
+                    desde_purga = 0.0
+                await asyncio.to_thread(self.recargar)
+            except Exception as e:
+                print("Error recargando los tokens revocados", e)
+
+    async def iniciar(self):
+        await asyncio.to_thread(self.recargar)
+        self._tarea = asyncio.create_task(self._ciclo())
+
+    async def detener(self):
+        if self._tarea is not None:
+            self._tarea.cancel()
+            try:
+                await self._tarea
+            except asyncio.CancelledError:
+                pass
+            self._tarea = None
+
+    def estado(self) -> dict:
+        with self._lock:
+            filtro = self._filtro
+        return {
+            "revocados_en_filtro": filtro.elementos,
+            "bits": filtro.bits,
+            "hashes": filtro.hashes,
+            "consultas_base": self.consultas_base,
+            "falsos_positivos": self.falsos_positivos,
+            "purgados": self.purgados,
+        }
+
+
+revocaciones = RevocacionTokens(engine)
+
+
+if __name__ == "__main__":
+    with engine.begin() as connection:
+        print(f"Se borraron {purgar_expirados(connection)} tokens expirados")
@@ -0,0 +1,108 @@
+# app/utils/tiempo_real.py
+# Hub de publicacion/suscripcion para mandar notificaciones nuevas a los
+# dispositivos conectados por WebSocket o SSE (app/router/router_stream.py).
+#
+# Cada conexion abierta es una cola en memoria suscrita al usuario. El hub no
+# reparte directo: publica en un broker y el broker le regresa los mensajes
+# con `entregar`. BrokerLocal solo reparte dentro del proceso; con varios
+# workers se reemplaza por un broker compartido (Redis pub/sub, etc.) que
+# implemente los mismos tres metodos, asi cada worker entrega a sus conexiones.
+import asyncio
+import os
+from collections import defaultdict
+from typing import Callable, Optional
+
+# Mensajes que se guardan por conexion si el cliente no los lee a tiempo;
+# al llenarse se descarta el mas viejo para no frenar a los demas
+MAX_PENDIENTES_CONEXION = int(os.getenv("TIEMPO_REAL_MAX_PENDIENTES", "100"))
+
+
+class BrokerLocal:
+    """
+    Broker de un solo proceso. Interfaz que debe cumplir cualquier broker:
+    iniciar(entregar), publicar(usuario_id, mensaje) y detener().
+    """
+
+    def __init__(self):
+        self._entregar: Optional[Callable[[int, dict], None]] = None
+
+    async def iniciar(self, entregar: Callable[[int, dict], None]):
+        self._entregar = entregar
+
+    async def publicar(self, usuario_id: int, mensaje: dict):
+        if self._entregar is not None:
+            self._entregar(usuario_id, mensaje)
+
+    async def detener(self):
+        self._entregar = None
+
+
+class HubNotificaciones:
+    def __init__(self, broker=None, max_pendientes: int = MAX_PENDIENTES_CONEXION):
+        self.broker = broker or BrokerLocal()
+        self.max_pendientes = max_pendientes
+        # usuario_id -> colas de sus conexiones abiertas
+        self._suscriptores = defaultdict(set)
+        # Loop donde viven las colas; lo usa publicar_desde_hilo
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self.entregados = 0
+        self.descartados = 0
+
+    def usar_broker(self, broker):
+        """
+        Cambia el broker (llamar antes de iniciar).
+        """
+        self.broker = broker
+
+    def suscribir(self, usuario_id: int) -> asyncio.Queue:
+        cola = asyncio.Queue(maxsize=self.max_pendientes)
+        self._suscriptores[usuario_id].add(cola)
+        return cola
+
+    def desuscribir(self, usuario_id: int, cola: asyncio.Queue):
+        colas = self._suscriptores.get(usuario_id)
+        if colas is None:
+            return
+        colas.discard(cola)
+        if not colas:
+            del self._suscriptores[usuario_id]
+
+    def _entregar(self, usuario_id: int, mensaje: dict):
+        # Corre en el event loop; put_nowait nunca espera a un cliente lento
+        for cola in self._suscriptores.get(usuario_id, ()):
+            if cola.full():
+                cola.get_nowait()
+                self.descartados += 1
+            cola.put_nowait(mensaje)
+            self.entregados += 1
+
+    async def publicar(self, usuario_id: int, mensaje: dict):
+        await self.broker.publicar(usuario_id, mensaje)
+
+    def publicar_desde_hilo(self, usuario_id: int, mensaje: dict):
+        """
+        Version para codigo sincrono (callbacks de al_confirmar, que en modo sync
+        corren en el threadpool): agenda publicar en el loop del hub sin esperarlo.
+        Si el hub no se ha iniciado no hay conexiones a quien entregar.
+        """
+        if self._loop is not None:
+            asyncio.run_coroutine_threadsafe(self.publicar(usuario_id, mensaje), self._loop)
+
+    async def iniciar(self):
+        self._loop = asyncio.get_running_loop()
+        await self.broker.iniciar(self._entregar)
+
+    async def detener(self):
+        self._loop = None
+        await self.broker.detener()
+
+    def estado(self) -> dict:
+        return {
+            "usuarios_conectados": len(self._suscriptores),
+            "conexiones": sum(len(colas) for colas in self._suscriptores.values()),
+            "entregados": self.entregados,
+            "descartados": self.descartados,
+        }
+
+
+hub_notificaciones = HubNotificaciones()
@@ -0,0 +1,378 @@
+# benchmarks/bench_carga.py
+# Prueba de carga de punta a punta: siembra una base con app/database/seed.py,
+# levanta app.main con uvicorn y la recorre con usuarios virtuales que hacen
+# lo mismo que la app movil (login, listar y crear transacciones, resumen,
+# presupuestos, notificaciones, categorias) en una mezcla con pesos.
+#
+# Cada usuario virtual hace una peticion a la vez (carga cerrada) durante
+# --duracion segundos despues de --calentamiento segundos que no se cuentan.
+# El resultado (req/s, p50/p95/p99 y tasa de error, total y por escenario)
+# se guarda en JSON con las llaves ordenadas para poder hacer diff entre commits.
+#
+# Uso (desde la carpeta Api/):
+#     python benchmarks/bench_carga.py --concurrencia 32 --duracion 30 --salida base.json
+#     python benchmarks/bench_carga.py --salida nuevo.json --comparar base.json --tolerancia 10
+#
+# Con --comparar termina con codigo 1 si algun escenario empeora mas de
+# --tolerancia por ciento en p95 o en req/s, o si sube su tasa de error.
+#
+# Los usuarios virtuales entran con los ids que el seed dejo en su marca
+# (tabla semillas), no con 1..N. Solo se siembra una base vacia; una base con
+# usuarios se usa si su ultima marca tiene los mismos --usuarios, --anios,
+# --semilla y --hasta, si no se aborta. Con --base el archivo SQLite se siembra
+# una vez y cada corrida trabaja sobre una copia, asi las transacciones que
+# crea una corrida no cambian la siguiente.
+# Para MySQL pasar --database-url (la base debe existir). Las corridas si
+# escriben en ella: restaurarla entre corridas que se vayan a comparar.
+import argparse
+import asyncio
+import json
+import os
+import platform
+import random
+import shutil
+import subprocess
+import sys
+import tempfile
+import time
+from datetime import date
+
+import httpx
+
+from bench_sync_async import API_DIR, levantar_servidor
+
+PASSWORD = "password123"
+DOMINIO_EMAIL = "seed.lanaapp.mx"
+
+
+class UsuarioVirtual:
+    def __init__(self, client: httpx.AsyncClient, usuario_id: int, rng: random.Random, hasta: date):
+        self.client = client
+        self.usuario_id = usuario_id
+        self.rng = rng
+        self.hasta = hasta
+        self.headers = {}
+        self.cursor = None
+        self.etag_categorias = None
+        self.ids_categorias = []
+
+    async def login(self):
+        respuesta = await self.client.post("/login", json={
+            "email": f"usuario{self.usuario_id}@{DOMINIO_EMAIL}", "password": PASSWORD,
+        })
+        if respuesta.status_code == 200:
+            self.headers = {"Authorization": f"Bearer {respuesta.json()['access_token']}"}
+        return respuesta
+
+    async def iniciar(self):
+        await self.login()
+        respuesta = await self.client.get("/lanaapp/categorias", headers=self.headers)
+        self.ids_categorias = [categoria["id"] for categoria in respuesta.json()]
+
+    async def listar_transacciones(self):
+        respuesta = await self.client.get("/lanaapp/transacciones", headers=self.headers, params={
+            "usuario_id": self.usuario_id, "limit": 50,
+        })
+        if respuesta.status_code == 200:
+            self.cursor = respuesta.json()["siguiente_cursor"]
+        return respuesta
+
+    async def siguiente_pagina(self):
+        if self.cursor is None:
+            return await self.listar_transacciones()
+        respuesta = await self.client.get("/lanaapp/transacciones", headers=self.headers, params={
+            "usuario_id": self.usuario_id, "limit": 50, "cursor": self.cursor,
+        })
+        if respuesta.status_code == 200:
+            self.cursor = respuesta.json()["siguiente_cursor"]
+        return respuesta
+
+    async def crear_transaccion(self):
+        return await self.client.post("/lanaapp/transactions/", headers=self.headers, json={
+            "usuario_id": self.usuario_id,
+            "categoria_id": self.rng.choice(self.ids_categorias),
+            "monto": round(self.rng.lognormvariate(5.5, 0.8), 2),
+            "fecha_transaccion": self.hasta.isoformat(),
+            "descripcion": "benchmark",
+        })
+
+    async def resumen_mensual(self):
+        return await self.client.get("/lanaapp/transacciones/resumen", headers=self.headers, params={
+            "usuario_id": self.usuario_id, "anio": self.hasta.year,
+        })
+
+    async def estado_presupuesto(self):
+        return await self.client.get("/lanaapp/presupuesto/estado", headers=self.headers, params={
+            "usuario_id": self.usuario_id, "anio": self.hasta.year, "mes": self.hasta.month,
+        })
+
+    async def crear_presupuesto(self):
+        return await self.client.post("/lanaapp/presupuesto", headers=self.headers, json={
+            "usuario_id": self.usuario_id,
+            "categoria_id": self.rng.choice(self.ids_categorias),
+            "monto_presupuestado": self.rng.choice((500, 1000, 2000, 5000)),
+            "mes": self.hasta.month,
+            "anio": self.hasta.year,
+        })
+
+    async def notificaciones(self):
+        return await self.client.get(f"/lanaapp/notificaciones/usuario/{self.usuario_id}", headers=self.headers)
+
+    async def no_leidas(self):
+        return await self.client.get(
+            f"/lanaapp/notificaciones/usuario/{self.usuario_id}/no-leidas/count", headers=self.headers)
+
+    async def crear_notificacion(self):
+        return await self.client.post("/lanaapp/notificaciones", headers=self.headers, json={
+            "usuario_id": self.usuario_id,
+            "tipo_notificacion_canal": "push",
+            "destino": f"dispositivo-{self.usuario_id}",
+            "asunto": "Benchmark",
+            "mensaje": "Notificacion de prueba",
+            "estado_envio": "pendiente",
+        })
+
+    async def categorias(self):
+        headers = dict(self.headers)
+        if self.etag_categorias:
+            headers["If-None-Match"] = self.etag_categorias
+        respuesta = await self.client.get("/lanaapp/categorias", headers=headers)
+        self.etag_categorias = respuesta.headers.get("etag", self.etag_categorias)
+        return respuesta
+
+    async def pagos_proximos(self):
+        return await self.client.get("/lanaapp/pagos-fijos/upcoming", headers=self.headers, params={
+            "usuario_id": self.usuario_id,
+        })
+
+
+# escenario: peso en la mezcla (aproximadamente una sesion de la app)
+MEZCLA = {
+    "login": 1,
+    "listar_transacciones": 20,
+    "siguiente_pagina": 8,
+    "crear_transaccion": 8,
+    "resumen_mensual": 8,
+    "estado_presupuesto": 10,
+    "crear_presupuesto": 2,
+    "notificaciones": 8,
+    "no_leidas": 15,
+    "crear_notificacion": 3,
+    "categorias": 12,
+    "pagos_proximos": 5,
+}
+
+# Escenarios con menos requests se muestran al comparar pero no cuentan como regresion
+MIN_REQUESTS_COMPARAR = 50
+
+
+def percentil(ordenados: list, p: float) -> float:
+    # Interpolacion lineal entre los dos valores mas cercanos
+    if not ordenados:
+        return 0.0
+    posicion = (len(ordenados) - 1) * p / 100
+    abajo = int(posicion)
+    arriba = min(abajo + 1, len(ordenados) - 1)
+    return ordenados[abajo] + (ordenados[arriba] - ordenados[abajo]) * (posicion - abajo)
+
+
+def resumir(latencias: list, errores: int, segundos: float) -> dict:
+    latencias = sorted(latencias)
+    total = len(latencias)
+    return {
+        "requests": total,
+        "errores": errores,
+        "tasa_error": round(errores / total, 4) if total else 0.0,
+        "req_por_segundo": round(total / segundos, 1) if segundos else 0.0,
+        "p50_ms": round(percentil(latencias, 50) * 1000, 2),
+        "p95_ms": round(percentil(latencias, 95) * 1000, 2),
+        "p99_ms": round(percentil(latencias, 99) * 1000, 2),
+        "max_ms": round(latencias[-1] * 1000, 2) if latencias else 0.0,
+    }
+
+
+async def correr_carga(url: str, ids: range, concurrencia: int, duracion: float, calentamiento: float,
+                       semilla: int, hasta: date) -> dict:
+    nombres = list(MEZCLA)
+    pesos = [MEZCLA[nombre] for nombre in nombres]
+    latencias = {nombre: [] for nombre in nombres}
+    errores = {nombre: 0 for nombre in nombres}
+    limites = httpx.Limits(max_connections=concurrencia, max_keepalive_connections=concurrencia)
+    inicio_medicion = time.perf_counter() + calentamiento
+    fin = inicio_medicion + duracion
+
+    async with httpx.AsyncClient(base_url=url, limits=limites, timeout=60) as client:
+        async def usuario_virtual(numero: int):
+            rng = random.Random(semilla * 7919 + numero)
+            usuario = UsuarioVirtual(client, ids[numero % len(ids)], rng, hasta)
+            await usuario.iniciar()
+            while True:
+                nombre = rng.choices(nombres, weights=pesos)[0]
+                inicio = time.perf_counter()
+                if inicio >= fin:
+                    return
+                try:
+                    respuesta = await getattr(usuario, nombre)()
+                    fallo = respuesta.status_code >= 400
+                except httpx.HTTPError:
+                    fallo = True
+                terminado = time.perf_counter()
+                # Solo cuentan las que empiezan dentro de la ventana de medicion
+                if inicio >= inicio_medicion:
+                    latencias[nombre].append(terminado - inicio)
+                    if fallo:
+                        errores[nombre] += 1
+
+        await asyncio.gather(*(usuario_virtual(numero) for numero in range(concurrencia)))
+
+    todas = [latencia for lista in latencias.values() for latencia in lista]
+    return {
+        "total": resumir(todas, sum(errores.values()), duracion),
+        "escenarios": {nombre: resumir(latencias[nombre], errores[nombre], duracion) for nombre in nombres},
+    }
+
+
+def comparar(actual: dict, base: dict, tolerancia: float) -> bool:
+    """
+    Imprime la diferencia contra una corrida anterior. Regresa False si hay una regresion.
+    """
+    ok = True
+    print(f"\n{'escenario':22} {'req/s':>16} {'p95 ms':>18} {'error':>14}")
+    filas = [("total", actual["total"], base["total"])]
+    filas += [(nombre, datos, base["escenarios"].get(nombre)) for nombre, datos in actual["escenarios"].items()]
+    for nombre, nuevo, anterior in filas:
+        if not anterior or not anterior["requests"] or not nuevo["requests"]:
+            continue
+        cambio_rps = (nuevo["req_por_segundo"] / anterior["req_por_segundo"] - 1) * 100 if anterior["req_por_segundo"] else 0.0
+        cambio_p95 = (nuevo["p95_ms"] / anterior["p95_ms"] - 1) * 100 if anterior["p95_ms"] else 0.0
+        regresion = min(nuevo["requests"], anterior["requests"]) >= MIN_REQUESTS_COMPARAR and (
+            cambio_rps < -tolerancia
+            or cambio_p95 > tolerancia
+            or nuevo["tasa_error"] > anterior["tasa_error"]
+        )
+        ok = ok and not regresion
+        print(
+            f"{nombre:22} {nuevo['req_por_segundo']:>8} ({cambio_rps:+5.1f}%) {nuevo['p95_ms']:>9} ({cambio_p95:+5.1f}%)"
+            f" {anterior['tasa_error']:.3f}->{nuevo['tasa_error']:.3f}{'  REGRESION' if regresion else ''}"
+        )
+    return ok
+
+
+def commit_actual() -> str:
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"], cwd=API_DIR, capture_output=True, text=True, check=True,
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return "desconocido"
+
+
+def _seed(database_url: str, *argumentos: str, stdout=None) -> subprocess.CompletedProcess:
+    return subprocess.run(
+        [sys.executable, "-m", "app.database.seed", *argumentos],
+        cwd=API_DIR, env=dict(os.environ, DATABASE_URL=database_url), check=True, stdout=stdout, text=True,
+    )
+
+
+def preparar_base(database_url: str, args, carpeta: str) -> dict:
+    """
+    Regresa la marca de la siembra que usara la corrida. Siembra solo si la base
+    no tiene usuarios; si ya tiene, exige una marca con los mismos parametros.
+    """
+    esperado = {"usuarios": args.usuarios, "anios": args.anios, "semilla": args.semilla,
+                "hasta": args.hasta.isoformat()}
+    estado = json.loads(_seed(database_url, "--estado", stdout=subprocess.PIPE).stdout)
+    marca = estado["marca"]
+    if estado["usuarios"]:
+        if marca is None or {llave: marca[llave] for llave in esperado} != esperado:
+            sys.exit(f"La base ya tiene {estado['usuarios']} usuarios y su ultima marca de siembra ({marca}) "
+                     f"no corresponde a {esperado}; usa una base vacia o los parametros de la marca")
+        print(f"Usando la siembra existente: usuarios {marca['primer_id']} a {marca['ultimo_id']}")
+        return marca
+
+    print(f"Sembrando {args.usuarios} usuarios con {args.anios} años de historia...")
+    reporte = os.path.join(carpeta, "semilla.json")
+    _seed(database_url, "--usuarios", str(args.usuarios), "--anios", str(args.anios), "--semilla", str(args.semilla),
+          "--hasta", args.hasta.isoformat(), "--reporte", reporte, stdout=subprocess.DEVNULL)
+    with open(reporte) as archivo:
+        return json.load(archivo)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Prueba de carga de punta a punta de la API de LanaApp")
+    parser.add_argument("--usuarios", type=int, default=200, help="Usuarios sembrados")
+    parser.add_argument("--anios", type=int, default=2, help="Años de historia por usuario")
+    parser.add_argument("--semilla", type=int, default=42)
+    parser.add_argument("--hasta", type=date.fromisoformat, default=date(2025, 12, 31),
+                        help="Ultima fecha de los datos sembrados (fija para comparar corridas)")
+    parser.add_argument("--concurrencia", type=int, default=32, help="Usuarios virtuales simultaneos")
+    parser.add_argument("--duracion", type=float, default=30, help="Segundos medidos")
+    parser.add_argument("--calentamiento", type=float, default=5, help="Segundos iniciales que no se cuentan")
+    parser.add_argument("--modo", choices=("sync", "async"), default="sync")
+    parser.add_argument("--workers", type=int, default=1, help="Workers de uvicorn")
+    parser.add_argument("--puerto", type=int, default=8767)
+    parser.add_argument("--database-url", default=None, help="Por defecto una base SQLite temporal")
+    parser.add_argument("--base", default=None,
+                        help="Archivo SQLite sembrado a reutilizar; cada corrida usa una copia")
+    parser.add_argument("--salida", default="resultados_carga.json", help="Archivo JSON de resultados")
+    parser.add_argument("--comparar", default=None, help="JSON de una corrida anterior")
+    parser.add_argument("--tolerancia", type=float, default=10, help="Por ciento permitido al comparar")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as carpeta:
+        if args.database_url:
+            database_url = args.database_url
+            marca = preparar_base(database_url, args, carpeta)
+        elif args.base:
+            marca = preparar_base(f"sqlite:///{os.path.abspath(args.base)}", args, carpeta)
+            copia = os.path.join(carpeta, "carga.db")
+            shutil.copyfile(args.base, copia)
+            database_url = f"sqlite:///{copia}"
+        else:
+            database_url = f"sqlite:///{os.path.join(carpeta, 'carga.db')}"
+            marca = preparar_base(database_url, args, carpeta)
+        ids = range(marca["primer_id"], marca["ultimo_id"] + 1)
+
+        with open(os.path.join(carpeta, "servidor.log"), "w") as log:
+            proceso, url = levantar_servidor(args.modo, database_url, args.puerto, args.workers, salida=log)
+            try:
+                print(f"Carga: {args.concurrencia} usuarios virtuales, {args.calentamiento}s de calentamiento "
+                      f"+ {args.duracion}s medidos ({args.modo}, {args.workers} worker(s))")
+                resultados = asyncio.run(correr_carga(
+                    url, ids, args.concurrencia, args.duracion, args.calentamiento, args.semilla, args.hasta,
+                ))
+            finally:
+                proceso.terminate()
+                proceso.wait()
+
+    resultados["meta"] = {
+        "commit": commit_actual(),
+        "fecha": time.strftime("%Y-%m-%dT%H:%M:%S"),
+        "python": platform.python_version(),
+        "plataforma": platform.platform(),
+        "base_de_datos": database_url.split("://")[0],
+        "parametros": {
+            "usuarios": args.usuarios, "anios": args.anios, "semilla": args.semilla, "hasta": args.hasta.isoformat(),
+            "concurrencia": args.concurrencia, "duracion": args.duracion, "calentamiento": args.calentamiento,
+            "modo": args.modo, "workers": args.workers,
+            "primer_id": marca["primer_id"], "ultimo_id": marca["ultimo_id"],
+        },
+    }
+    with open(args.salida, "w") as archivo:
+        json.dump(resultados, archivo, indent=2, sort_keys=True)
+
+    print(f"\n{'escenario':22} {'req/s':>9} {'p50 ms':>9} {'p95 ms':>9} {'p99 ms':>9} {'errores':>8}")
+    for nombre, r in [("total", resultados["total"])] + list(resultados["escenarios"].items()):
+        print(f"{nombre:22} {r['req_por_segundo']:>9} {r['p50_ms']:>9} {r['p95_ms']:>9} {r['p99_ms']:>9} {r['errores']:>8}")
+    print(f"\nResultados en {args.salida}")
+
+    if args.comparar:
+        with open(args.comparar) as archivo:
+            base = json.load(archivo)
+        if not comparar(resultados, base, args.tolerancia):
+            print(f"\nHay escenarios que empeoraron mas de {args.tolerancia}%")
+            sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,46 @@
+# tests/conftest.py
+# Las pruebas corren contra un archivo SQLite temporal y con DB_MODO=async
+# (aiosqlite en lugar de aiomysql). Las variables se ponen antes de importar
+# la app porque los engines y los flags se leen al importar los modulos.
+import os
+import tempfile
+
+_directorio = tempfile.mkdtemp(prefix="lanaapp-pruebas-")
+os.environ["DATABASE_URL"] = f"sqlite:///{os.path.join(_directorio, 'lanaapp.db')}"
+os.environ["DB_MODO"] = "async"
+# Los procesos de fondo se prueban por separado, no deben correr junto con la app
+os.environ["PROGRAMADOR_PAGOS"] = "0"
+os.environ["NOTIFICACIONES_DESPACHADOR"] = "0"
+
+import pytest
+from fastapi.testclient import TestClient
+
+
+@pytest.fixture(scope="session")
+def app():
+    from app.main import app as aplicacion
+    return aplicacion
+
+
+@pytest.fixture
+def client(app):
+    with TestClient(app) as cliente:
+        yield cliente
+
+
+@pytest.fixture
+def crear_usuario(client):
+    """
+    Da de alta un usuario por la API y regresa su fila (con id).
+    """
+    from app.config.db import engine
+    from app.router.router_login import get_user_by_email
+
+    def crear(email: str, password: str = "secreta123"):
+        respuesta = client.post("/lanaapp/user", json={
+            "nombre_usuario": email.split("@")[0], "email": email, "password": password, "telefono": "5550000000",
+        })
+        assert respuesta.status_code == 201, respuesta.text
+        with engine.connect() as connection:
+            return get_user_by_email(connection, email)
+    return crear
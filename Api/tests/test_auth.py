@@ -0,0 +1,28 @@
+# tests/test_auth.py
+from app.utils import cache_usuarios
+
+
+def iniciar_sesion(client, email, password="secreta123"):
+    return client.post("/login", json={"email": email, "password": password})
+
+
+def test_cache_de_usuarios_no_guarda_el_hash(client, crear_usuario):
+    usuario = crear_usuario("cache@example.com")
+    token = iniciar_sesion(client, "cache@example.com").json()["access_token"]
+
+    respuesta = client.get("/verify-token", headers={"Authorization": f"Bearer {token}"})
+    assert respuesta.status_code == 200
+    en_cache = cache_usuarios.usuario_por_email("cache@example.com")
+    assert en_cache.id == usuario.id
+    assert "password_hash" not in en_cache._mapping
+
+
+def test_cambio_de_password_no_depende_del_cache(client, crear_usuario):
+    usuario = crear_usuario("cambio@example.com")
+    token = iniciar_sesion(client, "cambio@example.com").json()["access_token"]
+    client.get("/verify-token", headers={"Authorization": f"Bearer {token}"})
+
+    datos = {"nombre_usuario": "cambio", "email": "cambio@example.com", "password": "nueva456", "telefono": "5550000000"}
+    assert client.put(f"/lanaapp/user/{usuario.id}", json=datos).status_code == 200
+    assert iniciar_sesion(client, "cambio@example.com").status_code == 401
+    assert iniciar_sesion(client, "cambio@example.com", "nueva456").status_code == 200
@@ -0,0 +1,34 @@
+# tests/test_compresion.py
+from starlette.applications import Starlette
+from starlette.responses import Response
+from starlette.routing import Route
+from starlette.testclient import TestClient
+
+from app.utils.compresion import CompresionMiddleware
+
+CUERPO = b'{"datos": "' + b"x" * 4096 + b'"}'
+
+
+def _aplicacion():
+    async def catalogo(request):
+        return Response(CUERPO, media_type="application/json", headers={"ETag": '"abc123"'})
+    aplicacion = Starlette(routes=[Route("/catalogo", catalogo)])
+    aplicacion.add_middleware(CompresionMiddleware)
+    return aplicacion
+
+
+def test_etag_fuerte_se_vuelve_debil_al_comprimir():
+    with TestClient(_aplicacion()) as cliente:
+        comprimida = cliente.get("/catalogo", headers={"Accept-Encoding": "gzip"})
+        identidad = cliente.get("/catalogo", headers={"Accept-Encoding": "identity"})
+    assert comprimida.headers["content-encoding"] == "gzip"
+    assert comprimida.headers["etag"] == 'W/"abc123"'
+    assert comprimida.content == CUERPO
+    assert "content-encoding" not in identidad.headers
+    assert identidad.headers["etag"] == '"abc123"'
+
+
+def test_catalogo_acepta_el_etag_debilitado(client):
+    etag = client.get("/lanaapp/categorias").headers["etag"]
+    respuesta = client.get("/lanaapp/categorias", headers={"If-None-Match": f"W/{etag}"})
+    assert respuesta.status_code == 304
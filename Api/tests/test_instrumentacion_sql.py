@@ -0,0 +1,50 @@
+# tests/test_instrumentacion_sql.py
+from types import SimpleNamespace
+
+from sqlalchemy import create_engine, text
+
+from app.utils.instrumentacion_sql import (
+    MetricasSQL, _actual, _filas_escritas, estadisticas_rutas, instrumentar_engine,
+)
+
+
+def test_filas_escritas_ignora_selects_y_rowcount_sin_signo():
+    assert _filas_escritas(SimpleNamespace(description=None, rowcount=3)) == 3
+    # sqlite3 en un SELECT
+    assert _filas_escritas(SimpleNamespace(description=[("id",)], rowcount=-1)) == 0
+    # SSCursor de pymysql con stream_results
+    assert _filas_escritas(SimpleNamespace(description=[("id",)], rowcount=2 ** 64 - 1)) == 0
+    assert _filas_escritas(SimpleNamespace(description=None, rowcount=2 ** 64 - 1)) == 0
+    assert _filas_escritas(SimpleNamespace(description=None, rowcount=-1)) == 0
+
+
+def test_reporte_por_ruta_separa_lecturas_y_escrituras(client):
+    estadisticas_rutas.limpiar()
+    transaccion = {"usuario_id": 930001, "categoria_id": 1, "monto": 5, "fecha_transaccion": "2026-02-01"}
+    assert client.post("/lanaapp/transactions/", json=transaccion).status_code == 201
+    lista = client.get("/lanaapp/transacciones", params={"usuario_id": 930001})
+    assert "filas leidas" in lista.headers["server-timing"]
+    reporte = {datos["ruta"]: datos for datos in client.get("/lanaapp/db/consultas").json()}
+    assert reporte["GET /lanaapp/transacciones"]["filas_escritas"] == 0
+    assert reporte["GET /lanaapp/transacciones"]["filas_leidas"] >= 1
+    assert reporte["POST /lanaapp/transactions/"]["filas_escritas"] >= 2
+
+
+def test_filas_leidas_cuenta_solo_lo_que_se_saca_del_cursor():
+    engine = create_engine("sqlite://")
+    instrumentar_engine(engine)
+    metricas = MetricasSQL()
+    token = _actual.set(metricas)
+    try:
+        with engine.connect() as connection:
+            connection.execute(text("CREATE TABLE t (x INTEGER)"))
+            connection.execute(text("INSERT INTO t VALUES (1), (2), (3), (4), (5)"))
+            assert len(connection.execute(text("SELECT x FROM t")).fetchall()) == 5
+            resultado = connection.execute(text("SELECT x FROM t"))
+            resultado.fetchmany(2)
+            resultado.close()
+            assert connection.execute(text("SELECT x FROM t WHERE x = 3")).first() is not None
+    finally:
+        _actual.reset(token)
+    assert metricas.filas_escritas == 5
+    assert metricas.filas_leidas == 5 + 2 + 1
@@ -0,0 +1,47 @@
+# tests/test_metricas.py
+# Snapshots de varios workers en METRICAS_DIR cuando los pid se repiten.
+import time
+
+from app.utils import metricas
+from app.utils.metricas import RegistroMetricas, _combinar
+
+
+def _snapshot(pid, arranque, inicio, escrito, requests, conexiones, terminado=False):
+    return {
+        "pid": pid, "arranque": arranque, "inicio": inicio, "escrito": escrito, "terminado": terminado,
+        "familias": {
+            "requests_total": {"tipo": "counter", "ayuda": "r", "muestras": [["", [], requests]]},
+            "conexiones": {"tipo": "gauge", "ayuda": "c", "muestras": [["", [], conexiones]]},
+        },
+    }
+
+
+def _valores(familias):
+    return {nombre: familia["muestras"][0][2] for nombre, familia in familias.items()}
+
+
+def test_pid_repetido_no_pisa_ni_duplica(tmp_path):
+    registro = RegistroMetricas(str(tmp_path))
+    ahora = time.time()
+    # El pid 7 de un arranque anterior y el pid 7 actual (otro proceso)
+    registro.escribir(_snapshot(7, "viejo", ahora - 3600, ahora - 3500, requests=100, conexiones=5))
+    registro.escribir(_snapshot(7, "nuevo", ahora - 10, ahora, requests=3, conexiones=2))
+    snapshots = registro._leer_todos()
+    assert len(snapshots) == 2
+
+    valores = _valores(_combinar(snapshots, ahora))
+    assert valores["requests_total"] == 103
+    assert valores["conexiones"] == 2
+
+
+def test_gauges_de_workers_sin_escribir_o_apagados_no_cuentan(tmp_path):
+    ahora = time.time()
+    vencido = ahora - (metricas.METRICAS_VIGENCIA + 1) * metricas.METRICAS_INTERVALO
+    snapshots = [
+        _snapshot(8, "colgado", ahora - 100, vencido, requests=1, conexiones=4),
+        _snapshot(9, "apagado", ahora - 100, ahora, requests=1, conexiones=6, terminado=True),
+        _snapshot(10, "vivo", ahora - 100, ahora, requests=1, conexiones=1),
+    ]
+    valores = _valores(_combinar(snapshots, ahora))
+    assert valores["requests_total"] == 3
+    assert valores["conexiones"] == 1
@@ -0,0 +1,59 @@
+# tests/test_modo_async.py
+# DB_MODO=async montado sobre sqlite+aiosqlite: los handlers de app/api
+# leen y escriben a traves de ejecutar_async.
+import asyncio
+import uuid
+
+from sqlalchemy import select
+from app.database.connection import DB_MODO, url_async, obtener_async_engine, crear_engine_async, ejecutar_async
+from app.model.categorias import categorias
+from app.router import router_categoria
+
+
+def test_url_async_usa_aiosqlite():
+    assert DB_MODO == "async"
+    assert url_async("sqlite:///./lanaapp.db") == "sqlite+aiosqlite:///./lanaapp.db"
+    assert obtener_async_engine().dialect.driver == "aiosqlite"
+
+
+def test_se_montan_los_handlers_async(app):
+    rutas = {(ruta.path, metodo): ruta.endpoint for ruta in app.routes for metodo in getattr(ruta, "methods", ())}
+    endpoint = rutas[("/lanaapp/categorias/{categoria_id}", "GET")]
+    assert endpoint.__module__ == "app.api.categorias"
+    assert asyncio.iscoroutinefunction(endpoint)
+
+
+def test_escritura_y_lectura_por_http(client):
+    nombre = f"categoria-{uuid.uuid4().hex[:8]}"
+    respuesta = client.post("/lanaapp/categorias", json={"nombre_categoria": nombre, "tipo": "gasto"})
+    assert respuesta.status_code == 201
+
+    catalogo = client.get("/lanaapp/categorias").json()
+    creada = next(c for c in catalogo if c["nombre_categoria"] == nombre)
+
+    respuesta = client.get(f"/lanaapp/categorias/{creada['id']}")
+    assert respuesta.status_code == 200
+    assert respuesta.json()["nombre_categoria"] == nombre
+    assert client.get("/lanaapp/categorias/999999").status_code == 404
+
+
+def test_ejecutar_async_confirma_y_lee(app):
+    nombre = f"categoria-{uuid.uuid4().hex[:8]}"
+
+    async def escribir_y_leer():
+        # Engine propio: el de la app queda atado al event loop del TestClient
+        engine_async = crear_engine_async()
+        try:
+            async with engine_async.connect() as connection:
+                datos = router_categoria.CategoriaSchema(nombre_categoria=nombre, tipo="ingreso")
+                await ejecutar_async(connection, router_categoria.crear_categoria, datos)
+                await connection.commit()
+            async with engine_async.connect() as connection:
+                fila = (await connection.execute(select(categorias.c.id).where(categorias.c.nombre_categoria == nombre))).first()
+                return await ejecutar_async(connection, router_categoria.obtener_categoria, fila.id)
+        finally:
+            await engine_async.dispose()
+
+    leida = asyncio.run(escribir_y_leer())
+    assert leida["nombre_categoria"] == nombre
+    assert leida["tipo"] == "ingreso"
@@ -0,0 +1,156 @@
+# tests/test_notifier.py
+# Despachador de notificaciones contra una base SQLite propia de cada prueba.
+import asyncio
+from collections import deque
+from datetime import datetime, timedelta
+from typing import Callable, Optional
+
+import pytest
+from sqlalchemy import create_engine, select
+from sqlalchemy.dialects import mysql
+
+from app.model.notificaciones import notificaciones
+from app.utils.notifier import DespachadorNotificaciones, reclamar_lote, RECLAMO_SEGUNDOS
+
+CANALES = ("email", "sms", "push")
+
+
+class EnviadorFalso:
+    """
+    Enviador de pruebas: no sale a ningun proveedor, solo guarda las ultimas
+    notificaciones y cuantos envios hubo al mismo tiempo. `fallar` decide que
+    notificaciones fallan.
+    """
+
+    def __init__(self, latencia: float = 0.0, fallar: Optional[Callable[[dict], bool]] = None, maximo: int = 1000):
+        self.latencia = latencia
+        self.fallar = fallar
+        self.enviados = deque(maxlen=maximo)
+        self.total = 0
+        self.en_curso = 0
+        self.maximo_simultaneos = 0
+
+    async def enviar(self, notificacion: dict) -> bool:
+        self.en_curso += 1
+        self.maximo_simultaneos = max(self.maximo_simultaneos, self.en_curso)
+        try:
+            if self.latencia:
+                await asyncio.sleep(self.latencia)
+            if self.fallar is not None and self.fallar(notificacion):
+                return False
+            self.enviados.append(notificacion)
+            self.total += 1
+            return True
+        finally:
+            self.en_curso -= 1
+
+
+@pytest.fixture
+def base(tmp_path):
+    engine = create_engine(f"sqlite:///{tmp_path / 'notificaciones.db'}")
+    notificaciones.create(engine)
+    yield engine
+    engine.dispose()
+
+
+def encolar(engine, canal: str, cantidad: int):
+    with engine.begin() as connection:
+        connection.execute(notificaciones.insert(), [
+            {
+                "usuario_id": 1, "tipo_notificacion_canal": canal, "destino": f"{canal}-{i}",
+                "asunto": "Prueba", "mensaje": "Hola", "estado_envio": "pendiente", "leida": 0,
+            }
+            for i in range(cantidad)
+        ])
+
+
+def estados(engine) -> dict:
+    with engine.connect() as connection:
+        filas = connection.execute(select(notificaciones.c.tipo_notificacion_canal, notificaciones.c.estado_envio))
+        resultado = {}
+        for canal, estado in filas:
+            resultado.setdefault(canal, []).append(estado)
+        return resultado
+
+
+def test_reclamo_en_mysql_usa_skip_locked():
+    sentencias = []
+
+    class ConexionMySQL:
+        dialect = mysql.dialect()
+
+        def execute(self, sentencia):
+            sentencias.append(sentencia)
+
+            class Resultado:
+                def fetchall(self):
+                    return []
+            return Resultado()
+
+    reclamar_lote(ConexionMySQL(), 10, datetime.now(), ["email"])
+    sql = str(sentencias[0].compile(dialect=mysql.dialect()))
+    assert "FOR UPDATE SKIP LOCKED" in sql
+    assert "tipo_notificacion_canal IN" in sql
+
+
+def test_dos_reclamos_no_toman_las_mismas_filas(base):
+    encolar(base, "email", 5)
+    ahora = datetime.now()
+    with base.begin() as connection:
+        primero = reclamar_lote(connection, 3, ahora, CANALES)
+    with base.begin() as connection:
+        segundo = reclamar_lote(connection, 3, ahora, CANALES)
+    assert len(primero) == 3
+    assert len(segundo) == 2
+    assert not {fila.id for fila in primero} & {fila.id for fila in segundo}
+
+
+def test_reclamo_vencido_se_vuelve_a_tomar(base):
+    encolar(base, "sms", 2)
+    ahora = datetime.now()
+    with base.begin() as connection:
+        reclamadas = {fila.id for fila in reclamar_lote(connection, 10, ahora, CANALES)}
+    with base.begin() as connection:
+        assert reclamar_lote(connection, 10, ahora + timedelta(seconds=RECLAMO_SEGUNDOS - 1), CANALES) == []
+    with base.begin() as connection:
+        vencidas = reclamar_lote(connection, 10, ahora + timedelta(seconds=RECLAMO_SEGUNDOS + 1), CANALES)
+    assert {fila.id for fila in vencidas} == reclamadas
+
+
+def test_concurrencia_limitada_por_canal(base):
+    encolar(base, "email", 12)
+    encolar(base, "sms", 12)
+    despachador = DespachadorNotificaciones(base, lote=100, concurrencia=3)
+    email = EnviadorFalso(latencia=0.01)
+    sms = EnviadorFalso(latencia=0.01, fallar=lambda n: n["destino"] == "sms-0")
+    despachador.registrar_enviador("email", email)
+    despachador.registrar_enviador("sms", sms)
+
+    assert asyncio.run(despachador.despachar_lote()) == 24
+    assert email.maximo_simultaneos == 3
+    assert sms.maximo_simultaneos == 3
+    assert email.total == 12 and sms.total == 11
+    resultado = estados(base)
+    assert resultado["email"] == ["enviado"] * 12
+    assert sorted(resultado["sms"]) == ["enviado"] * 11 + ["fallido"]
+
+
+def test_canal_sin_enviador_se_queda_pendiente(base):
+    encolar(base, "email", 2)
+    encolar(base, "push", 2)
+    despachador = DespachadorNotificaciones(base)
+    # Sin enviadores no se reclama nada
+    assert despachador.enviadores == {}
+    assert asyncio.run(despachador.despachar_lote()) == 0
+
+    despachador.registrar_enviador("email", EnviadorFalso())
+    assert asyncio.run(despachador.despachar_lote()) == 2
+    resultado = estados(base)
+    assert resultado["email"] == ["enviado", "enviado"]
+    assert resultado["push"] == ["pendiente", "pendiente"]
+    with base.connect() as connection:
+        fechas = connection.execute(
+            select(notificaciones.c.fecha_envio).where(notificaciones.c.tipo_notificacion_canal == "push")
+        ).scalars().all()
+    assert fechas == [None, None]
+
@@ -0,0 +1,68 @@
+# tests/test_passwords.py
+import asyncio
+import inspect
+
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+from sqlalchemy import select
+from werkzeug.security import generate_password_hash
+
+from app.config.db import engine
+from app.model.users import users
+from app.router import router_login, router_user
+from app.utils import passwords
+
+
+def test_necesita_rehash_compara_parametros_resueltos():
+    actual = generate_password_hash("x", passwords.PASSWORD_HASH_METODO, passwords.PASSWORD_SALT_LENGTH)
+    assert not passwords.necesita_rehash(actual)
+    assert passwords.necesita_rehash(generate_password_hash("x", "pbkdf2:sha256:1000"))
+    # "scrypt" sin parametros se guarda como "scrypt:32768:8:1"
+    assert generate_password_hash("x", "scrypt").split("$", 1)[0] != "scrypt"
+
+
+def test_handlers_con_hash_no_ocupan_el_threadpool():
+    for handler in (router_login.login, router_user.create_user, router_user.update_user):
+        assert asyncio.iscoroutinefunction(handler)
+
+
+def test_login_sync_rehace_hashes_viejos(app):
+    # Los routers de app/router (modo sync) montados aparte de la app en modo async
+    aplicacion = FastAPI()
+    aplicacion.include_router(router_login.login_router)
+    email = "rehash@example.com"
+    with engine.begin() as connection:
+        connection.execute(users.insert().values(
+            nombre_usuario="rehash", email=email, telefono="5550000000",
+            password_hash=generate_password_hash("secreta123", "pbkdf2:sha256:1000"),
+        ))
+
+    with TestClient(aplicacion) as cliente:
+        assert cliente.post("/login", json={"email": email, "password": "mala"}).status_code == 401
+        assert cliente.post("/login", json={"email": email, "password": "secreta123"}).status_code == 200
+
+    with engine.connect() as connection:
+        guardado = connection.execute(select(users.c.password_hash).where(users.c.email == email)).scalar()
+    assert not passwords.necesita_rehash(guardado)
+
+
+def test_handlers_async_con_hash_no_apartan_conexion():
+    from app.api import auth
+    for handler in (auth.login, auth.create_user, auth.update_user):
+        assert "connection" not in inspect.signature(handler).parameters
+
+
+def test_login_async_rehace_hashes_viejos(client):
+    email = "rehash-async@example.com"
+    with engine.begin() as connection:
+        connection.execute(users.insert().values(
+            nombre_usuario="rehash-async", email=email, telefono="5550000000",
+            password_hash=generate_password_hash("secreta123", "pbkdf2:sha256:1000"),
+        ))
+
+    assert client.post("/login", json={"email": email, "password": "mala"}).status_code == 401
+    assert client.post("/login", json={"email": email, "password": "secreta123"}).status_code == 200
+
+    with engine.connect() as connection:
+        guardado = connection.execute(select(users.c.password_hash).where(users.c.email == email)).scalar()
+    assert not passwords.necesita_rehash(guardado)
@@ -0,0 +1,15 @@
+# tests/test_perfilador.py
+# Sin PERFILADOR_TOKEN el endpoint y el middleware existen pero no hacen nada.
+
+
+def test_perfil_sin_token_responde_403(client):
+    assert client.get("/lanaapp/admin/perfil", params={"segundos": 1}).status_code == 403
+    assert client.get("/lanaapp/admin/perfil", params={"segundos": 1},
+                      headers={"X-Admin-Token": "cualquiera"}).status_code == 403
+
+
+def test_profile_sin_token_deja_pasar_el_request(client):
+    normal = client.get("/lanaapp/categorias")
+    perfilado = client.get("/lanaapp/categorias", params={"profile": 1}, headers={"X-Admin-Token": "cualquiera"})
+    assert perfilado.status_code == 200
+    assert perfilado.json() == normal.json()
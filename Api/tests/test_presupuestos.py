@@ -0,0 +1,64 @@
+# tests/test_presupuestos.py
+from sqlalchemy import select
+from app.config.db import engine
+from app.model.notificaciones import notificaciones
+from app.utils import budget_checker
+from app.utils.budget_checker import cache_consumo
+
+
+def test_consumo_se_invalida_despues_del_commit(client):
+    usuario_id, anio, mes = 920001, 2026, 3
+    presupuesto = {"usuario_id": usuario_id, "categoria_id": 1, "monto_presupuestado": 100, "mes": mes, "anio": anio}
+    assert client.post("/lanaapp/presupuesto", json=presupuesto).status_code == 201
+    estado = client.get("/lanaapp/presupuesto/estado", params={"usuario_id": usuario_id, "anio": anio, "mes": mes}).json()
+    assert estado["total_gastado"] == 0
+    assert cache_consumo.obtener((usuario_id, anio, mes)) is not None
+
+    transaccion = {"usuario_id": usuario_id, "categoria_id": 1, "monto": 40, "fecha_transaccion": f"{anio}-{mes:02d}-10"}
+    assert client.post("/lanaapp/transactions/", json=transaccion).status_code == 201
+    assert cache_consumo.obtener((usuario_id, anio, mes)) is None
+    estado = client.get("/lanaapp/presupuesto/estado", params={"usuario_id": usuario_id, "anio": anio, "mes": mes}).json()
+    assert estado["total_gastado"] == 40
+
+
+def test_invalidacion_espera_al_commit(app):
+    llave = (920002, 2026, 4)
+    cache_consumo.guardar(llave, {"categorias": []})
+    with engine.connect() as connection:
+        # Como en get_connection: los callbacks corren solo despues del commit
+        connection.info["al_confirmar"] = []
+        budget_checker.invalidar_consumo(connection, *llave)
+        assert cache_consumo.obtener(llave) is not None
+        connection.rollback()
+        connection.info.pop("al_confirmar")
+    assert cache_consumo.obtener(llave) is not None
+
+
+def test_exceso_se_detecta_sin_calcular_el_mes(client, crear_usuario, monkeypatch):
+    usuario = crear_usuario("excesos@example.com")
+    anio, mes = 2026, 5
+    presupuesto = {"usuario_id": usuario.id, "categoria_id": 1, "monto_presupuestado": 100, "mes": mes, "anio": anio}
+    assert client.post("/lanaapp/presupuesto", json=presupuesto).status_code == 201
+
+    def no_usar(*args, **kwargs):
+        raise AssertionError("verificar_excesos no debe calcular el consumo de todo el mes")
+    monkeypatch.setattr(budget_checker, "calcular_consumo", no_usar)
+
+    def gastar(monto):
+        transaccion = {"usuario_id": usuario.id, "categoria_id": 1, "monto": monto, "fecha_transaccion": f"{anio}-{mes:02d}-10"}
+        assert client.post("/lanaapp/transactions/", json=transaccion).status_code == 201
+
+    def avisos():
+        with engine.connect() as connection:
+            return connection.execute(
+                select(notificaciones.c.tipo_notificacion_canal)
+                .where(notificaciones.c.usuario_id == usuario.id, notificaciones.c.notificable_type == "presupuesto")
+            ).scalars().all()
+
+    gastar(60)
+    assert avisos() == []
+    gastar(50)
+    assert sorted(avisos()) == ["email", "push"]
+    # Ya estaba excedido, no se vuelve a avisar
+    gastar(10)
+    assert len(avisos()) == 2
@@ -0,0 +1,20 @@
+# tests/test_resumen_mensual.py
+from decimal import Decimal
+from sqlalchemy import select
+from app.config.db import engine
+from app.model.resumenMensual import resumen_mensual
+from app.utils import resumen_mensual as modulo_resumen
+
+
+def test_motor_sin_upsert_usa_update_e_insert(client, monkeypatch):
+    monkeypatch.setattr(modulo_resumen, "_upsert", lambda connection: None)
+    llave = (940001, 2026, 6, 1)
+    with engine.connect() as connection:
+        modulo_resumen.aplicar_deltas(connection, {llave: (Decimal("40.50"), 1)})
+        modulo_resumen.aplicar_deltas(connection, {llave: (Decimal("9.50"), 1)})
+        fila = connection.execute(
+            select(resumen_mensual.c.total, resumen_mensual.c.cantidad)
+            .where(resumen_mensual.c.usuario_id == llave[0], resumen_mensual.c.mes == llave[2])
+        ).one()
+        connection.rollback()
+    assert (Decimal(str(fila.total)), fila.cantidad) == (Decimal("50.00"), 2)
@@ -0,0 +1,22 @@
+# tests/test_sync.py
+from datetime import datetime
+
+from app.router.router_sync import SYNC_MARGEN_SEGUNDOS
+
+
+def test_watermark_deja_margen_para_commits_tardios(client):
+    usuario_id = 910001
+    cambio = {
+        "operacion": "crear",
+        "id_cliente": "local-1",
+        "datos": {"usuario_id": usuario_id, "categoria_id": 1, "monto": 10.5, "fecha_transaccion": "2026-01-15"},
+    }
+    primero = client.post("/lanaapp/sync", json={"usuario_id": usuario_id, "cambios": [cambio]}).json()
+    watermark = datetime.fromisoformat(primero["watermark"])
+    # SQLite guarda CURRENT_TIMESTAMP en UTC
+    assert (datetime.utcnow() - watermark).total_seconds() >= SYNC_MARGEN_SEGUNDOS - 5
+
+    # Lo escrito dentro del margen vuelve a llegar; el cliente lo deduplica por id
+    segundo = client.post("/lanaapp/sync", json={"usuario_id": usuario_id, "desde": primero["watermark"]}).json()
+    ids = [t["id"] for t in segundo["transacciones"]]
+    assert ids == [primero["resultados_cambios"][0]["id"]]
@@ -0,0 +1,21 @@
+# tests/test_tiempo_real.py
+# Las notificaciones nuevas llegan por /lanaapp/notificaciones/stream aunque el
+# despachador este apagado (conftest pone NOTIFICACIONES_DESPACHADOR=0).
+
+
+def test_notificacion_nueva_llega_por_websocket(client, crear_usuario):
+    usuario = crear_usuario("websocket@example.com")
+    token = client.post("/login", json={"email": usuario.email, "password": "secreta123"}).json()["access_token"]
+
+    with client.websocket_connect(f"/lanaapp/notificaciones/stream?token={token}") as websocket:
+        respuesta = client.post("/lanaapp/notificaciones", json={
+            "usuario_id": usuario.id, "tipo_notificacion_canal": "push", "destino": "dispositivo-1",
+            "asunto": "Pago próximo", "mensaje": "Tu pago vence mañana", "estado_envio": "pendiente",
+        })
+        assert respuesta.status_code == 201
+        mensaje = websocket.receive_json()
+
+    assert mensaje["usuario_id"] == usuario.id
+    assert mensaje["asunto"] == "Pago próximo"
+    assert mensaje["estado_envio"] == "pendiente"
+    assert isinstance(mensaje["id"], int)